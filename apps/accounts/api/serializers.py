@@ -1,6 +1,8 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth.password_validation import validate_password
 
+from apps.accounts.bulk import ACTIONS as FOLLOW_ACTIONS
 from apps.accounts.models import User
 from apps.core.api.serializers import UserBaseSerializer
 
@@ -47,6 +49,19 @@ class UserDetailSerializer(UserBaseSerializer):
         )
 
 
+class UserSuggestionSerializer(UserBaseSerializer):
+    """
+    Serializer for "who to follow" suggestions.
+    Includes how many of the viewer's follows already follow the user.
+    """
+
+    mutual_count = serializers.IntegerField(read_only=True)
+
+    class Meta(UserBaseSerializer.Meta):
+        model = User
+        fields = UserBaseSerializer.Meta.fields + ("mutual_count",)
+
+
 class UserUpdateSerializer(serializers.ModelSerializer):
     """
     Serializer for updating user profile information.
@@ -206,3 +221,23 @@ class UserDeactivateSerializer(serializers.Serializer):
         user.is_active = False
         user.save()
         return user
+
+
+class FollowOperationSerializer(serializers.Serializer):
+    """A single follow/unfollow operation in a batch."""
+
+    action = serializers.ChoiceField(choices=sorted(FOLLOW_ACTIONS))
+    username = serializers.CharField(max_length=150)
+
+
+class FollowBatchSerializer(serializers.Serializer):
+    """
+    Input of ``POST /api/users/follow/batch/``: up to
+    ``API_BATCH_MAX_OPERATIONS`` operations, applied in one transaction.
+    """
+
+    operations = FollowOperationSerializer(
+        many=True,
+        allow_empty=False,
+        max_length=settings.API_BATCH_MAX_OPERATIONS,
+    )
@@ -1,14 +1,19 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
-from rest_framework.filters import SearchFilter
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from apps.accounts.bulk import apply_follows
+from apps.accounts.conditional import profile_etag
 from apps.accounts.models import Follow, User
-from apps.core.api.pagination import QwitterPagination
+from apps.accounts.search import UserSearchPaginator
+from apps.accounts.suggestions import get_suggestions
+from apps.core.api.conditional import ConditionalGetMixin
+from apps.core.api.pagination import QwitterCursorPagination
 from apps.core.api.permissions import IsSelfOnly
 from apps.core.api.serializers import UserBaseSerializer, NoInputSerializer
+from apps.core.api.streaming import StreamingJSONResponse, serialized_chunks
 from apps.accounts.api.serializers import (
     UserListSerializer,
     UserDetailSerializer,
@@ -18,8 +23,12 @@ from apps.accounts.api.serializers import (
     ChangeEmailSerializer,
     ChangeUsernameSerializer,
     UserDeactivateSerializer,
+    UserSuggestionSerializer,
+    FollowBatchSerializer,
 )
 from apps.core.api.throttles import (
+    BatchedThrottleMixin,
+    count_batch_operations,
     AuthRegisterThrottle,
     ProfileEditThrottle,
     UsernameChangeThrottle,
@@ -30,7 +39,9 @@ from apps.core.api.throttles import (
 )
 
 
-class UserViewSet(viewsets.ReadOnlyModelViewSet):
+class UserViewSet(
+    ConditionalGetMixin, BatchedThrottleMixin, viewsets.ReadOnlyModelViewSet
+):
     """
     ViewSet for managing Qwitter users.
 
@@ -42,15 +53,14 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
           * view, update, change password/email/username, deactivate
       - Follow/Unfollow users
       - Retrieve followers and following lists
+
+    Profiles answer conditional GETs with 304.
     """
 
     serializer_class = UserDetailSerializer
     permission_classes = [AllowAny]
     lookup_field = "username"
 
-    filter_backends = [SearchFilter]
-    search_fields = ["username", "name"]
-
     def get_queryset(self):
         """Return optimized queryset with counts and follow status."""
         user = self.request.user if self.request.user.is_authenticated else None
@@ -83,6 +93,8 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
             "change_password": ChangePasswordSerializer,
             "deactivate": UserDeactivateSerializer,
             "follow": NoInputSerializer,
+            "search": UserDetailSerializer,
+            "suggestions": UserSuggestionSerializer,
             "followers": UserBaseSerializer,
             "following": UserBaseSerializer,
         }
@@ -102,17 +114,25 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
             "change_password": [PasswordChangeThrottle()],
             "deactivate": [AccountDeactivateThrottle()],
             "follow": [FollowActionThrottle()],
+            "follow_batch": [FollowActionThrottle()],
         }
         
         if self.action in throttle_map:
             return throttle_map[self.action]
         return super().get_throttles()
 
+    def get_throttle_cost(self, request, throttle):
+        """Charge batch follows one hit per operation."""
+        if self.action == "follow_batch":
+            return count_batch_operations(request.data)
+        return super().get_throttle_cost(request, throttle)
+
     def list(self, request, *args, **kwargs):
         """
         List users.
 
-        - Admins: See all users.
+        - Admins: See all users, streamed as JSON in chunks of
+          ``API_STREAM_CHUNK_SIZE`` rows.
         - Authenticated non-admins: See only their own details.
         """
         self.permission_classes = [IsAuthenticated]
@@ -120,6 +140,15 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
 
         if request.user.is_staff:
             queryset = self.filter_queryset(self.get_queryset())
+            if request.accepted_renderer.format == "json":
+                return StreamingJSONResponse(
+                    serialized_chunks(
+                        queryset,
+                        self.get_serializer_class(),
+                        self.get_serializer_context(),
+                    ),
+                    renderer=request.accepted_renderer,
+                )
         else:
             queryset = self.filter_queryset(
                 self.get_queryset().filter(id=request.user.id)
@@ -130,6 +159,13 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
         )
         return Response(serializer.data)
 
+    def get_etag(self, request):
+        """ETag of a profile."""
+        if self.action == "retrieve":
+            user = request.user if request.user.is_authenticated else None
+            return profile_etag(self.kwargs.get(self.lookup_field), user)
+        return super().get_etag(request)
+
     def retrieve(self, request, *args, **kwargs):
         """
         Retrieve detailed profile information for a specific user by username.
@@ -310,11 +346,69 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
             status=status.HTTP_201_CREATED,
         )
 
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="follow/batch",
+        permission_classes=[IsAuthenticated],
+        serializer_class=FollowBatchSerializer,
+    )
+    def follow_batch(self, request):
+        """
+        Follow or unfollow up to ``API_BATCH_MAX_OPERATIONS`` users at once.
+        Body: {"operations": [{"action": "follow"|"unfollow", "username": "..."}]}
+        Returns one result per operation: created, deleted, unchanged or failed.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = apply_follows(request.user, serializer.validated_data["operations"])
+        return Response({"success": True, "results": results}, status=status.HTTP_200_OK)
+
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path="search",
+        pagination_class=QwitterCursorPagination,
+        permission_classes=[AllowAny],
+    )
+    def search(self, request):
+        """
+        Search users by username or name.
+        Best matches first, then most followed. Query: ?q=<text>.
+        """
+        paginator = UserSearchPaginator(
+            request.query_params.get("q", ""),
+            user=request.user,
+            per_page=self.paginator.get_page_size(request),
+        )
+        page = self.paginator.paginate(paginator, request)
+        serializer = self.get_serializer(page, many=True, context={"request": request})
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path="suggestions",
+        permission_classes=[IsAuthenticated],
+    )
+    def suggestions(self, request):
+        """
+        Retrieve precomputed "who to follow" suggestions for the current user.
+        Query: ?limit=<n> (default 10, max 20).
+        """
+        try:
+            limit = min(max(int(request.query_params.get("limit", 10)), 1), 20)
+        except ValueError:
+            limit = 10
+        users = get_suggestions(request.user, limit)
+        serializer = self.get_serializer(users, many=True, context={"request": request})
+        return Response(serializer.data)
+
     @action(
         detail=True,
         methods=["get"],
         url_path="followers",
-        pagination_class=QwitterPagination,
+        pagination_class=QwitterCursorPagination,
         permission_classes=[AllowAny],
     )
     def followers(self, request, username=None):
@@ -332,7 +426,7 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
         detail=True,
         methods=["get"],
         url_path="following",
-        pagination_class=QwitterPagination,
+        pagination_class=QwitterCursorPagination,
         permission_classes=[AllowAny],
     )
     def following(self, request, username=None):
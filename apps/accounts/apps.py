@@ -0,0 +1,20 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def restore_search_index(using, **kwargs):
+    from django.db import connections
+
+    from apps.accounts.search import ensure_search_index
+
+    ensure_search_index(connections[using])
+
+
+class AccountsConfig(AppConfig):
+    name = "apps.accounts"
+
+    def ready(self):
+        # Register signal handlers that keep follow suggestions in sync.
+        from apps.accounts import signals  # noqa: F401
+
+        post_migrate.connect(restore_search_index, sender=self)
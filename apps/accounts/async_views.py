@@ -0,0 +1,57 @@
+"""
+Async version of the profile page, served when ``ASYNC_VIEWS`` is enabled
+and the project runs under ASGI (see ``apps.core.aio``).
+"""
+
+from apps.accounts.models import User
+from apps.core.aio import aresolve_user, arender, gather
+from apps.core.conditional import conditional_page
+from apps.core.page_cache import USER_PAGES, cache_anonymous_page
+from apps.core.pagination import KeysetPaginator
+from apps.feed.models import Post
+
+
+@conditional_page
+@cache_anonymous_page(USER_PAGES)
+async def profile(request, username):
+    user = await aresolve_user(request)
+    current_user = user if user.is_authenticated else None
+
+    def get_profile():
+        try:
+            return User.objects.get_profile(username, current_user)
+        except User.DoesNotExist:
+            return None
+
+    # Usernames are stored lowercased, so the posts page can filter on the
+    # author's username and load alongside the profile header; the pinned
+    # post comes first in the page.
+    posts = (
+        Post.objects.filter(author__username=username.lower())
+        .with_full_details(user=user)
+        .order_by("-is_pinned", "-created_date")
+    )
+    paginator = KeysetPaginator(posts, 10)
+    profile_user, page_obj = await gather(
+        get_profile, lambda: paginator.get_page(request.GET.get("cursor"))
+    )
+
+    if profile_user is None:
+        return await arender(
+            request,
+            "errors/404.html",
+            {
+                "title": "User Not Found",
+                "message": f"The user @{username} doesn't exist.",
+            },
+            status=404,
+        )
+
+    return await arender(
+        request,
+        "accounts/profile.html",
+        {
+            "profile_user": profile_user,
+            "posts_page": page_obj,
+        },
+    )
@@ -0,0 +1,94 @@
+"""
+Batched follows and unfollows (``POST /api/users/follow/batch/``).
+
+Targets are resolved in one query and existing follows in another. New
+follows are inserted with one ``bulk_create()`` (see
+``apps.core.utils.bulk_create_new``) and removed ones with one queryset
+``delete()``, in one transaction. A follow that a concurrent request
+inserted first is reported as unchanged.
+
+``bulk_create`` sends no ``post_save`` signals, so the follows actually
+inserted are passed, once per batch, to ``follows_created()``, which the
+follow handlers in ``apps.accounts.signals`` call for single follows.
+Unfollows still go through the regular ``post_delete`` handlers.
+"""
+
+from django.db import transaction
+
+from apps.accounts.models import Follow, User
+from apps.accounts.signals import follows_created
+from apps.core.utils import bulk_create_new
+
+CREATED = "created"
+DELETED = "deleted"
+UNCHANGED = "unchanged"
+FAILED = "failed"
+
+# action -> whether the follow should exist afterwards
+ACTIONS = {"follow": True, "unfollow": False}
+
+
+def _fail(result, detail):
+    result.update(status=FAILED, detail=detail)
+
+
+def apply_follows(user, operations):
+    """
+    Apply ``operations`` (dicts with ``action`` and ``username``) for ``user``.
+    Returns one result dict per operation, in order.
+    """
+    results = [
+        {"action": op["action"], "username": op["username"]} for op in operations
+    ]
+
+    targets = {
+        target.username: target
+        for target in User.objects.filter(
+            username__in={op["username"].lower() for op in operations}
+        ).only("username")
+    }
+
+    # followed_id -> (result, should_exist)
+    wanted = {}
+    for op, result in zip(operations, results):
+        target = targets.get(op["username"].lower())
+        if target is None:
+            _fail(result, "User not found.")
+        elif target.pk == user.pk:
+            _fail(result, "You cannot follow yourself.")
+        elif target.pk in wanted:
+            _fail(result, "Duplicate operation for this user in the batch.")
+        else:
+            wanted[target.pk] = (result, ACTIONS[op["action"]])
+
+    with transaction.atomic():
+        existing = set(
+            Follow.objects.filter(follower=user, followed_id__in=wanted).values_list(
+                "followed_id", flat=True
+            )
+        )
+        create, delete = [], []
+        for followed_id, (result, should_exist) in wanted.items():
+            if should_exist and followed_id not in existing:
+                create.append(followed_id)
+                result["status"] = CREATED
+            elif not should_exist and followed_id in existing:
+                delete.append(followed_id)
+                result["status"] = DELETED
+            else:
+                result["status"] = UNCHANGED
+
+        inserted = bulk_create_new(
+            Follow,
+            [Follow(follower=user, followed_id=followed_id) for followed_id in create],
+        )
+        created = [follow.followed_id for follow in inserted]
+        for followed_id in set(create).difference(created):
+            # Inserted concurrently by a single follow.
+            wanted[followed_id][0]["status"] = UNCHANGED
+        if delete:
+            Follow.objects.filter(follower=user, followed_id__in=delete).delete()
+        by_id = {target.pk: target for target in targets.values()}
+        follows_created(user, [by_id[followed_id] for followed_id in created])
+
+    return results
@@ -0,0 +1,37 @@
+"""
+ETags for conditional GETs of user profiles.
+
+A profile's ETag is computed from its public fields and stored stats in one
+narrow query, plus the viewer version for ``is_following``. The profile
+itself is not loaded or serialized.
+"""
+
+from apps.accounts.models import User
+from apps.core.versions import get_versions, make_etag
+
+PROFILE_VERSION_FIELDS = (
+    "pk",
+    "username",
+    "name",
+    "image",
+    "bio",
+    "dob",
+    "is_active",
+    "is_staff",
+    "stats__followers_count",
+    "stats__following_count",
+    "stats__posts_count",
+)
+
+
+def profile_etag(username, user=None):
+    """Return the ETag of a profile, or None."""
+    row = (
+        User.objects.filter(username=username)
+        .values_list(*PROFILE_VERSION_FIELDS)
+        .first()
+    )
+    if row is None:
+        return None
+    viewer = get_versions(user)[1]
+    return make_etag("profile", row, getattr(user, "pk", None), viewer)
@@ -0,0 +1,438 @@
+"""
+In-memory index of the follow graph.
+
+``FollowGraph`` keeps every ``Follow`` edge twice, once per direction, as
+compressed sparse rows. Each direction has three ``array('q')`` buffers:
+
+- ``ids``: the sorted IDs of users with at least one edge;
+- ``offsets``: where each user's row starts in ``neighbors``;
+- ``neighbors``: every row back to back, each sorted.
+
+That costs 8 bytes per edge and direction plus 16 bytes per user, with no
+Python object per edge. Every lookup is a binary search:
+
+    graph = get_graph()
+    graph.is_following(alice.pk, bob.pk)
+    graph.following_ids(alice.pk)        # frozenset
+    graph.follower_count(bob.pk)
+    graph.mutual_count(alice.pk, bob.pk)
+
+Rows are immutable. Follows and unfollows made after loading go into a small
+per-user overlay of added and removed IDs, which lookups check first. Once
+the overlay grows past ``COMPACT_THRESHOLD`` entries, it is folded back into
+new arrays.
+
+Every process has its own copy. Committed changes are published to the
+shared cache as a numbered log: ``follow-graph:version`` plus one key per
+change. A process replays the entries it has not seen yet, at most once
+every ``FOLLOW_GRAPH_SYNC_INTERVAL`` seconds, and reloads from the database
+if the log has expired. Its own changes apply immediately.
+
+The graph is off unless ``FOLLOW_GRAPH_ENABLED`` is set, since every worker
+holds a full copy. Budget about 17 bytes per follow, and a process start-up
+that loads the whole Follow table on first use. ``bench_follow_graph`` on a
+synthetic graph of 1M users and 49.6M follows (one core, CPython 3.11):
+
+    arrays        787 MiB (16.6 bytes per follow), peak RSS 995 MiB
+    built in      84 s from in-memory rows (43 s more to generate them)
+
+    operation         p50 µs    p99 µs
+    is_following         4.0       6.7
+    follower_count       3.0       4.8
+    following_count      2.8       4.5
+    following_ids        8.1      31.0
+    mutual_count        19.5      59.8
+
+Loading from the database (``--database``, SQLite, 5M follows) took 9.7 s,
+so a worker needs one to two minutes to load 50M follows.
+"""
+
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+
+FOLLOW = "follow"
+UNFOLLOW = "unfollow"
+
+VERSION_KEY = "follow-graph:version"
+EVENT_KEY = "follow-graph:event:{}"
+EVENT_TIMEOUT = 60 * 60 * 24
+
+# How long a gap in the change log may last before the graph is reloaded.
+# A writer bumps the version just before it stores the event.
+GAP_GRACE = 5.0
+
+# Beyond this many unseen changes, reloading is cheaper than replaying.
+MAX_REPLAY = 10_000
+
+# Overlay entries tolerated before the arrays are rebuilt.
+COMPACT_THRESHOLD = 50_000
+
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def _empty():
+    return array("q")
+
+
+class Adjacency:
+    """Sorted neighbour IDs per user, as compressed sparse rows."""
+
+    __slots__ = ("ids", "offsets", "neighbors")
+
+    def __init__(self, ids=None, offsets=None, neighbors=None):
+        self.ids = ids if ids is not None else _empty()
+        self.offsets = offsets if offsets is not None else array("q", [0])
+        self.neighbors = neighbors if neighbors is not None else _empty()
+
+    @classmethod
+    def from_sorted_pairs(cls, pairs):
+        """Build from unique ``(user_id, neighbor_id)`` pairs sorted by both."""
+        ids, offsets, neighbors = _empty(), array("q", [0]), _empty()
+        current = None
+        for user_id, neighbor_id in pairs:
+            if user_id != current:
+                if current is not None:
+                    offsets.append(len(neighbors))
+                ids.append(user_id)
+                current = user_id
+            neighbors.append(neighbor_id)
+        if current is not None:
+            offsets.append(len(neighbors))
+        return cls(ids, offsets, neighbors)
+
+    def __len__(self):
+        return len(self.neighbors)
+
+    @property
+    def nbytes(self):
+        return sum(
+            len(buffer) * buffer.itemsize
+            for buffer in (self.ids, self.offsets, self.neighbors)
+        )
+
+    def bounds(self, user_id):
+        index = bisect_left(self.ids, user_id)
+        if index < len(self.ids) and self.ids[index] == user_id:
+            return self.offsets[index], self.offsets[index + 1]
+        return 0, 0
+
+    def row(self, user_id):
+        start, end = self.bounds(user_id)
+        return self.neighbors[start:end]
+
+    def degree(self, user_id):
+        start, end = self.bounds(user_id)
+        return end - start
+
+    def contains(self, user_id, neighbor_id):
+        start, end = self.bounds(user_id)
+        index = bisect_left(self.neighbors, neighbor_id, start, end)
+        return index < end and self.neighbors[index] == neighbor_id
+
+    def rows(self):
+        """Yield ``(user_id, row)`` in user ID order."""
+        for index, user_id in enumerate(self.ids):
+            yield user_id, self.neighbors[self.offsets[index] : self.offsets[index + 1]]
+
+    def transpose(self):
+        """Return the reverse adjacency (neighbour -> users), rows sorted."""
+        counts = Counter(self.neighbors)
+        ids = array("q", sorted(counts))
+        offsets = array("q", [0])
+        for user_id in ids:
+            offsets.append(offsets[-1] + counts[user_id])
+        del counts
+
+        # Counting sort: users are visited in ID order, so rows come out sorted.
+        slots = dict(zip(ids, offsets))
+        neighbors = array("q", bytes(len(self.neighbors) * 8))
+        for user_id, row in self.rows():
+            for neighbor_id in row:
+                slot = slots[neighbor_id]
+                neighbors[slot] = user_id
+                slots[neighbor_id] = slot + 1
+        return Adjacency(ids, offsets, neighbors)
+
+
+class _Direction:
+    """One direction of the graph: immutable rows plus pending changes."""
+
+    __slots__ = ("rows", "added", "removed")
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.added = {}
+        self.removed = {}
+
+    @property
+    def pending(self):
+        return sum(map(len, self.added.values())) + sum(
+            map(len, self.removed.values())
+        )
+
+    def link(self, user_id, neighbor_id):
+        removed = self.removed.get(user_id)
+        if removed and neighbor_id in removed:
+            removed.discard(neighbor_id)
+        elif not self.rows.contains(user_id, neighbor_id):
+            self.added.setdefault(user_id, set()).add(neighbor_id)
+
+    def unlink(self, user_id, neighbor_id):
+        added = self.added.get(user_id)
+        if added and neighbor_id in added:
+            added.discard(neighbor_id)
+        elif self.rows.contains(user_id, neighbor_id):
+            self.removed.setdefault(user_id, set()).add(neighbor_id)
+
+    def contains(self, user_id, neighbor_id):
+        if neighbor_id in self.added.get(user_id, ()):
+            return True
+        if neighbor_id in self.removed.get(user_id, ()):
+            return False
+        return self.rows.contains(user_id, neighbor_id)
+
+    def degree(self, user_id):
+        return (
+            self.rows.degree(user_id)
+            + len(self.added.get(user_id, ()))
+            - len(self.removed.get(user_id, ()))
+        )
+
+    def neighbors(self, user_id):
+        """Return the sorted neighbour IDs of ``user_id`` as an array."""
+        row = self.rows.row(user_id)
+        added = self.added.get(user_id)
+        removed = self.removed.get(user_id)
+        if not added and not removed:
+            return row
+        merged = set(row).difference(removed or ()).union(added or ())
+        return array("q", sorted(merged))
+
+    def compacted(self):
+        """Return a copy with the pending changes folded into the rows."""
+        user_ids = sorted(set(self.rows.ids).union(self.added))
+
+        def pairs():
+            for user_id in user_ids:
+                for neighbor_id in self.neighbors(user_id):
+                    yield user_id, neighbor_id
+
+        return _Direction(Adjacency.from_sorted_pairs(pairs()))
+
+
+def _intersection_size(left, right):
+    """Count the IDs shared by two sorted arrays."""
+    if len(left) > len(right):
+        left, right = right, left
+    total, start, end = 0, 0, len(right)
+    for value in left:
+        start = bisect_left(right, value, start, end)
+        if start == end:
+            break
+        if right[start] == value:
+            total += 1
+    return total
+
+
+class FollowGraph:
+    """
+    Who follows whom, held in memory. ``version`` is the last entry of the
+    shared change log reflected in the arrays.
+    """
+
+    def __init__(self, following=None, version=0):
+        following = following if following is not None else Adjacency()
+        self._out = _Direction(following)
+        self._in = _Direction(following.transpose())
+        self._lock = threading.RLock()
+        self.version = version
+        self.synced_at = time.monotonic()
+        self.gap_since = None
+
+    @classmethod
+    def load(cls):
+        """Load every follow from the database."""
+        from apps.accounts.models import Follow
+
+        # Read the version first: changes committed while loading are
+        # replayed on top, which is harmless since applying is idempotent.
+        version = cache.get(VERSION_KEY) or 0
+        pairs = (
+            Follow.objects.order_by("follower_id", "followed_id")
+            .values_list("follower_id", "followed_id")
+            .iterator(chunk_size=10_000)
+        )
+        return cls(Adjacency.from_sorted_pairs(pairs), version)
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def is_following(self, follower_id, followed_id):
+        return self._out.contains(follower_id, followed_id)
+
+    def following(self, user_id):
+        """Sorted IDs of the users ``user_id`` follows."""
+        with self._lock:
+            return self._out.neighbors(user_id)
+
+    def followers(self, user_id):
+        """Sorted IDs of the users following ``user_id``."""
+        with self._lock:
+            return self._in.neighbors(user_id)
+
+    def following_ids(self, user_id):
+        return frozenset(self.following(user_id))
+
+    def follower_ids(self, user_id):
+        return frozenset(self.followers(user_id))
+
+    def following_count(self, user_id):
+        return self._out.degree(user_id)
+
+    def follower_count(self, user_id):
+        return self._in.degree(user_id)
+
+    def mutual_count(self, user_id, other_id):
+        """How many of the users ``user_id`` follows also follow ``other_id``."""
+        return _intersection_size(self.following(user_id), self.followers(other_id))
+
+    def followed_by_following(self, user_id):
+        """
+        Count, for every account followed by someone ``user_id`` follows, how
+        many of those people follow it.
+        """
+        counts = Counter()
+        for followed_id in self.following(user_id):
+            counts.update(self.following(followed_id))
+        return counts
+
+    @property
+    def edge_count(self):
+        # The overlay only holds edges missing from (added) or present in
+        # (removed) the rows.
+        out = self._out
+        added = sum(map(len, out.added.values()))
+        return len(out.rows) + added - sum(map(len, out.removed.values()))
+
+    @property
+    def nbytes(self):
+        """Size of the adjacency arrays, both directions."""
+        return self._out.rows.nbytes + self._in.rows.nbytes
+
+    # ------------------------------------------------------------------
+    # Changes
+    # ------------------------------------------------------------------
+
+    def apply(self, action, follower_id, followed_id):
+        with self._lock:
+            if action == FOLLOW:
+                self._out.link(follower_id, followed_id)
+                self._in.link(followed_id, follower_id)
+            else:
+                self._out.unlink(follower_id, followed_id)
+                self._in.unlink(followed_id, follower_id)
+
+    def compact(self):
+        """Fold pending changes into the arrays, if there are enough of them."""
+        with self._lock:
+            if self._out.pending + self._in.pending < COMPACT_THRESHOLD:
+                return
+            self._out = self._out.compacted()
+            self._in = self._in.compacted()
+
+    def catch_up(self):
+        """
+        Replay changes published by other processes. Return False when the
+        log cannot be replayed and the graph must be reloaded.
+        """
+        self.synced_at = time.monotonic()
+        latest = cache.get(VERSION_KEY)
+        if latest is None or latest < self.version:
+            # The cache was cleared; only a reload is known to be complete.
+            return latest is None and self.version == 0
+        if latest - self.version > MAX_REPLAY:
+            return False
+
+        keys = [EVENT_KEY.format(n) for n in range(self.version + 1, latest + 1)]
+        events = cache.get_many(keys)
+        for key in keys:
+            if key not in events:
+                if self.gap_since is None:
+                    self.gap_since = self.synced_at
+                return self.synced_at - self.gap_since < GAP_GRACE
+            self.apply(*events[key])
+            self.version += 1
+            self.gap_since = None
+        self.compact()
+        return True
+
+
+# ============================================================================
+# PROCESS-WIDE GRAPH
+# ============================================================================
+
+
+def _enabled():
+    return getattr(settings, "FOLLOW_GRAPH_ENABLED", False)
+
+
+def _sync_interval():
+    return getattr(settings, "FOLLOW_GRAPH_SYNC_INTERVAL", 1.0)
+
+
+def get_graph():
+    """
+    Return this process's follow graph, loading it on first use and catching
+    up with other processes' changes. Returns None if the graph is disabled.
+    """
+    global _graph
+    if not _enabled():
+        return None
+
+    graph = _graph
+    if graph is not None and time.monotonic() - graph.synced_at < _sync_interval():
+        return graph
+
+    # One thread loads or syncs; the others keep using the current copy.
+    if graph is not None and not _graph_lock.acquire(blocking=False):
+        return graph
+    if graph is None:
+        _graph_lock.acquire()
+    try:
+        if _graph is None:
+            _graph = FollowGraph.load()
+        elif not _graph.catch_up():
+            _graph = FollowGraph.load()
+        return _graph
+    finally:
+        _graph_lock.release()
+
+
+def reset_graph():
+    """Drop this process's copy; the next ``get_graph()`` reloads it."""
+    global _graph
+    _graph = None
+
+
+def publish(action, follower_id, followed_id):
+    """
+    Record a committed follow or unfollow in the shared change log and apply
+    it to this process's graph.
+    """
+    if not _enabled():
+        return
+    cache.add(VERSION_KEY, 0, None)
+    version = cache.incr(VERSION_KEY)
+    cache.set(
+        EVENT_KEY.format(version), (action, follower_id, followed_id), EVENT_TIMEOUT
+    )
+    if _graph is not None:
+        _graph.apply(action, follower_id, followed_id)
@@ -0,0 +1,137 @@
+import random
+import resource
+import time
+from array import array
+
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+
+from apps.accounts.graph import Adjacency, FollowGraph
+from apps.accounts.models import User
+
+
+def _synthetic_following(users, edges, seed):
+    """
+    Build a random following adjacency with about ``edges`` edges. Out-degrees
+    are exponential and targets skew towards low IDs, so a few accounts have
+    very many followers, as on a real network.
+    """
+    rng = random.Random(seed)
+    mean_degree = edges / users
+    ids, offsets, neighbors = array("q"), array("q", [0]), array("q")
+    for user_id in range(1, users + 1):
+        degree = min(users - 1, int(rng.expovariate(1 / mean_degree)))
+        row = set()
+        while len(row) < degree:
+            target = int(users * rng.random() ** 2) + 1
+            if target != user_id:
+                row.add(target)
+        if row:
+            ids.append(user_id)
+            neighbors.extend(sorted(row))
+            offsets.append(len(neighbors))
+    return Adjacency(ids, offsets, neighbors)
+
+
+def _time(func, calls):
+    """Return per-call latencies of ``func(*args)`` in microseconds, sorted."""
+    timings = []
+    clock = time.perf_counter_ns
+    for args in calls:
+        began = clock()
+        func(*args)
+        timings.append((clock() - began) / 1000)
+    timings.sort()
+    return timings
+
+
+def _max_rss_mb():
+    # ru_maxrss is in kilobytes on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the memory and lookup latency of the in-memory follow graph, "
+        "on a synthetic graph (default) or on the follows in the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=100_000,
+            help="Users in the synthetic graph (default: 100000).",
+        )
+        parser.add_argument(
+            "--edges",
+            type=int,
+            default=5_000_000,
+            help="Approximate follows in the synthetic graph (default: 5000000).",
+        )
+        parser.add_argument(
+            "--lookups",
+            type=int,
+            default=100_000,
+            help="Calls timed per operation (default: 100000).",
+        )
+        parser.add_argument(
+            "--seed", type=int, default=0, help="Random seed (default: 0)."
+        )
+        parser.add_argument(
+            "--database",
+            action="store_true",
+            help="Load the graph from the Follow table instead.",
+        )
+
+    def handle(self, *args, **options):
+        rss_before = _max_rss_mb()
+        began = time.perf_counter()
+        if options["database"]:
+            graph = FollowGraph.load()
+            users = User.objects.aggregate(last=Max("pk"))["last"] or 0
+        else:
+            users = options["users"]
+            following = _synthetic_following(
+                options["users"], options["edges"], options["seed"]
+            )
+            built = time.perf_counter()
+            self.stdout.write(f"Generated in {built - began:.1f}s")
+            graph = FollowGraph(following)
+        elapsed = time.perf_counter() - began
+
+        edges = graph.edge_count
+        self.stdout.write(f"Graph:      {users:,} users, {edges:,} follows")
+        self.stdout.write(f"Built in:   {elapsed:.1f}s")
+        self.stdout.write(
+            f"Arrays:     {graph.nbytes / 2**20:,.1f} MiB "
+            f"({graph.nbytes / max(edges, 1):.1f} bytes per follow)"
+        )
+        self.stdout.write(
+            f"Peak RSS:   {_max_rss_mb():,.0f} MiB "
+            f"(+{_max_rss_mb() - rss_before:,.0f} MiB while building)"
+        )
+        if not edges:
+            return
+
+        rng = random.Random(options["seed"])
+        pairs = [
+            (rng.randint(1, users), rng.randint(1, users))
+            for _ in range(options["lookups"])
+        ]
+        singles = [(a,) for a, _b in pairs]
+        operations = [
+            ("is_following", graph.is_following, pairs),
+            ("follower_count", graph.follower_count, singles),
+            ("following_count", graph.following_count, singles),
+            ("following_ids", graph.following_ids, singles),
+            ("mutual_count", graph.mutual_count, pairs),
+        ]
+
+        self.stdout.write("")
+        self.stdout.write(f"{'operation':<18}{'p50 µs':>10}{'p99 µs':>10}{'max µs':>12}")
+        for name, func, calls in operations:
+            timings = _time(func, calls)
+            p50 = timings[len(timings) // 2]
+            p99 = timings[int(len(timings) * 0.99)]
+            self.stdout.write(f"{name:<18}{p50:>10.1f}{p99:>10.1f}{timings[-1]:>12.1f}")
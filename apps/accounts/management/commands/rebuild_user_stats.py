@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.accounts.models import User
+from apps.accounts.stats import rebuild_stats
+from apps.core.versions import bump_content_version
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconcile the stored follower, following, post and like counts of "
+        "every user with the underlying rows, creating missing stats rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Number of users to recount per transaction (default: 5000).",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        last_id = 0
+        total = 0
+
+        while True:
+            ids = list(
+                User.objects.filter(pk__gt=last_id)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+
+            with transaction.atomic():
+                total += rebuild_stats(ids)
+            last_id = ids[-1]
+
+        bump_content_version()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {total} users."))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from apps.accounts.models import User
+from apps.accounts.suggestions import refresh_suggestions
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the stored \"who to follow\" suggestions. Run periodically "
+        "(e.g. hourly from cron); follows and unfollows update lists in between."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "usernames",
+            nargs="*",
+            help="Only refresh these users (default: every active user).",
+        )
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options["usernames"]:
+            usernames = [u.lower() for u in options["usernames"]]
+            user_ids = list(
+                User.objects.filter(username__in=usernames).values_list("pk", flat=True)
+            )
+        total = refresh_suggestions(user_ids)
+        self.stdout.write(self.style.SUCCESS(f"Refreshed suggestions for {total} users."))
@@ -1,28 +1,31 @@
 from django.contrib.auth.models import UserManager as BaseUserManager
-from django.db import models
-from django.db.models import Count, Exists, OuterRef
+from django.db import connections, models
+from django.db.models import Exists, F, OuterRef
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
 
 
 class UserQuerySet(models.QuerySet):
+    def _stored_counts(self, *fields):
+        """Annotate ``fields`` from the user's ``UserStats`` row (one join)."""
+        return self.annotate(
+            **{field: Coalesce(F(f"stats__{field}"), 0) for field in fields}
+        )
+
     def with_follow_counts(self):
         """
         Annotate users with follower and following counts.
         """
-        return self.annotate(
-            followers_count=Count("followers", distinct=True),
-            following_count=Count("following", distinct=True),
-        )
+        return self._stored_counts("followers_count", "following_count")
 
     def with_post_count(self):
         """Annotate users with their post count."""
-        return self.annotate(posts_count=Count("posts", distinct=True))
+        return self._stored_counts("posts_count")
 
     def with_all_counts(self):
-        """Annotate with all counts: followers, following, posts."""
-        return self.annotate(
-            followers_count=Count("followers", distinct=True),
-            following_count=Count("following", distinct=True),
-            posts_count=Count("posts", distinct=True),
+        """Annotate with all counts: followers, following, posts, likes given."""
+        return self._stored_counts(
+            "followers_count", "following_count", "posts_count", "likes_count"
         )
 
     def with_follow_status(self, user):
@@ -65,14 +68,16 @@ class UserQuerySet(models.QuerySet):
 
     def search(self, query):
         """
-        Search users by username, name, or email.
-        Case-insensitive search.
+        Search users by username or name prefix through the search index
+        (see ``apps.accounts.search``), or by exact email address.
         """
-        return self.filter(
-            models.Q(username__icontains=query)
-            | models.Q(name__icontains=query)
-            | models.Q(email__icontains=query)
-        )
+        from apps.accounts.search import matching_ids_sql
+
+        condition = models.Q(email__iexact=query.strip())
+        matches = matching_ids_sql(query, connections[self.db])
+        if matches is not None:
+            condition |= models.Q(pk__in=RawSQL(*matches))
+        return self.filter(condition)
 
 
 class UserManager(BaseUserManager):
@@ -107,10 +112,10 @@ class UserManager(BaseUserManager):
 
     def search(self, query):
         """
-        Search for users with counts pre-annotated.
-        Useful for user discovery/search pages.
+        Search users through the search index. For ranked, paginated
+        discovery results use ``apps.accounts.search.UserSearchPaginator``.
         """
-        return self.get_queryset().search(query).with_all_counts()
+        return self.get_queryset().search(query)
 
     def get_profile(self, username, user=None):
         """
@@ -136,22 +141,15 @@ class UserManager(BaseUserManager):
 
     def suggested_users(self, user, limit=5):
         """
-        Get suggested users to follow.
-        Excludes: current user, users already followed, inactive users.
-        Orders by: most followers.
+        Get precomputed suggestions of users to follow, best first.
+        Reads the ``FollowSuggestion`` rows maintained by
+        ``apps.accounts.suggestions``; annotates ``mutual_count``.
         """
-
-        from apps.accounts.models import Follow
-
-        following_ids = Follow.objects.filter(follower=user).values_list(
-            "followed", flat=True
-        )
-
         return (
             self.get_queryset()
             .active()
-            .exclude(pk=user.pk)
-            .exclude(pk__in=following_ids)
-            .with_follow_counts()
-            .order_by("-followers_count")[:limit]
+            .filter(suggested_to__user=user)
+            .annotate(mutual_count=F("suggested_to__mutual_count"))
+            .only("username", "name", "image")
+            .order_by("-suggested_to__score")[:limit]
         )
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+def install(apps, schema_editor):
+    from apps.accounts.search import install_search_index
+
+    install_search_index(schema_editor.connection)
+
+
+def remove(apps, schema_editor):
+    from apps.accounts.search import remove_search_index
+
+    remove_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(install, remove),
+    ]
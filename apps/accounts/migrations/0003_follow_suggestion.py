@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-17 00:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FollowSuggestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+                ('score', models.FloatField(help_text='Ranking score from mutual follows and popularity.')),
+                ('mutual_count', models.PositiveIntegerField(default=0, help_text='Number of users followed by `user` who follow `suggested`.')),
+                ('suggested', models.ForeignKey(help_text='User being suggested.', on_delete=django.db.models.deletion.CASCADE, related_name='suggested_to', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(help_text='User the suggestion is shown to.', on_delete=django.db.models.deletion.CASCADE, related_name='follow_suggestions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Follow Suggestion',
+                'verbose_name_plural': 'Follow Suggestions',
+                'ordering': ['-score'],
+                'indexes': [models.Index(fields=['user', '-score'], name='accounts_fo_user_id_eb8e77_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'suggested'), name='unique_follow_suggestion')],
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.3 on 2026-10-17 00:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count(model, fk):
+    subquery = (
+        model.objects.filter(**{fk: OuterRef("pk")})
+        .order_by()
+        .values(fk)
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    return Coalesce(Subquery(subquery, output_field=IntegerField()), 0)
+
+
+def backfill_stats(apps, schema_editor):
+    User = apps.get_model("accounts", "User")
+    UserStats = apps.get_model("accounts", "UserStats")
+    Follow = apps.get_model("accounts", "Follow")
+    Post = apps.get_model("feed", "Post")
+    Reaction = apps.get_model("feed", "Reaction")
+
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=pk) for pk in User.objects.values_list("pk", flat=True)],
+        batch_size=1000,
+    )
+    UserStats.objects.update(
+        followers_count=_count(Follow, "followed"),
+        following_count=_count(Follow, "follower"),
+        posts_count=_count(Post, "author"),
+        likes_count=_count(Reaction, "user"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_follow_suggestion'),
+        ('feed', '0005_post_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(help_text='User the counts belong to.', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('followers_count', models.PositiveIntegerField(default=0, editable=False, help_text='Number of users following the user (maintained by signals).')),
+                ('following_count', models.PositiveIntegerField(default=0, editable=False, help_text='Number of users the user follows (maintained by signals).')),
+                ('posts_count', models.PositiveIntegerField(default=0, editable=False, help_text='Number of posts, reposts and quotes by the user (maintained by signals).')),
+                ('likes_count', models.PositiveIntegerField(default=0, editable=False, help_text='Number of reactions given by the user (maintained by signals).')),
+            ],
+            options={
+                'verbose_name': 'User Stats',
+                'verbose_name_plural': 'User Stats',
+                'indexes': [models.Index(fields=['-followers_count'], name='accounts_us_followe_7dbe89_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
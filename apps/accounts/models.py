@@ -1,6 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
 from django.utils.html import mark_safe
 
 from apps.accounts.managers.users import UserManager
@@ -99,4 +99,100 @@ class Follow(TimeStampedModel):
 
     def save(self, *args, **kwargs):
         self.full_clean()
-        super().save(*args, **kwargs)
+        # Keep the row write and the stats updates sent via post_save together.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class UserStats(models.Model):
+    """
+    Denormalized per-user counts, maintained by ``apps.accounts.stats``
+    inside the transaction of every follow, post and reaction write.
+    """
+
+    user = models.OneToOneField(
+        User,
+        related_name="stats",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        help_text="User the counts belong to.",
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Number of users following the user (maintained by signals).",
+    )
+    following_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Number of users the user follows (maintained by signals).",
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Number of posts, reposts and quotes by the user (maintained by signals).",
+    )
+    likes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Number of reactions given by the user (maintained by signals).",
+    )
+
+    COUNTER_FIELDS = (
+        "followers_count",
+        "following_count",
+        "posts_count",
+        "likes_count",
+    )
+
+    class Meta:
+        verbose_name = "User Stats"
+        verbose_name_plural = "User Stats"
+        indexes = [
+            models.Index(fields=["-followers_count"]),
+        ]
+
+    def __str__(self):
+        return f"Stats for @{self.user}"
+
+
+class FollowSuggestion(TimeStampedModel):
+    """
+    Precomputed "who to follow" entry, maintained by ``apps.accounts.suggestions``.
+    """
+
+    user = models.ForeignKey(
+        User,
+        related_name="follow_suggestions",
+        on_delete=models.CASCADE,
+        help_text="User the suggestion is shown to.",
+    )
+    suggested = models.ForeignKey(
+        User,
+        related_name="suggested_to",
+        on_delete=models.CASCADE,
+        help_text="User being suggested.",
+    )
+    score = models.FloatField(
+        help_text="Ranking score from mutual follows and popularity."
+    )
+    mutual_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of users followed by `user` who follow `suggested`.",
+    )
+
+    class Meta:
+        verbose_name = "Follow Suggestion"
+        verbose_name_plural = "Follow Suggestions"
+        ordering = ["-score"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "suggested"], name="unique_follow_suggestion"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["user", "-score"]),
+        ]
+
+    def __str__(self):
+        return f"Suggest @{self.suggested} to @{self.user}"
@@ -0,0 +1,310 @@
+"""
+Indexed user search for people discovery.
+
+Usernames and names are matched through an index instead of ``icontains``
+scans:
+
+- PostgreSQL: trigram GIN indexes (``pg_trgm``) on ``username`` and ``name``,
+  which serve ``ILIKE '%term%'``.
+- SQLite: an external-content FTS5 table, ``accounts_user_fts``, with prefix
+  indexes, kept in sync by triggers on ``accounts_user``; every word of the
+  query must prefix-match a word of the username or name.
+- Other databases: an unindexed ``icontains`` match on username or name.
+
+Matches are ranked by quality (exact username, username prefix, name prefix,
+anything else) and then by follower count, and paged by a
+``(quality, followers, id)`` keyset cursor. Counts are read from the stored
+``UserStats`` rows, not from ``COUNT(DISTINCT)`` joins over the whole result.
+"""
+
+import base64
+import json
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from apps.core.pagination import InvalidCursor, KeysetPage
+
+POSTGRES_INSTALL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS accounts_user_username_trgm "
+    "ON accounts_user USING GIN (username gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS accounts_user_name_trgm "
+    "ON accounts_user USING GIN (name gin_trgm_ops)",
+]
+POSTGRES_REMOVE = [
+    "DROP INDEX IF EXISTS accounts_user_username_trgm",
+    "DROP INDEX IF EXISTS accounts_user_name_trgm",
+]
+
+SQLITE_INSTALL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS accounts_user_fts USING fts5(
+        username, name, content='accounts_user', content_rowid='id',
+        tokenize="unicode61 remove_diacritics 2 tokenchars '_'", prefix='1 2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS accounts_user_fts_insert
+    AFTER INSERT ON accounts_user
+    BEGIN
+        INSERT INTO accounts_user_fts (rowid, username, name)
+        VALUES (new.id, new.username, new.name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS accounts_user_fts_delete
+    AFTER DELETE ON accounts_user
+    BEGIN
+        INSERT INTO accounts_user_fts (accounts_user_fts, rowid, username, name)
+        VALUES ('delete', old.id, old.username, old.name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS accounts_user_fts_update
+    AFTER UPDATE OF username, name ON accounts_user
+    BEGIN
+        INSERT INTO accounts_user_fts (accounts_user_fts, rowid, username, name)
+        VALUES ('delete', old.id, old.username, old.name);
+        INSERT INTO accounts_user_fts (rowid, username, name)
+        VALUES (new.id, new.username, new.name);
+    END
+    """,
+]
+SQLITE_TRIGGERS = (
+    "accounts_user_fts_insert",
+    "accounts_user_fts_delete",
+    "accounts_user_fts_update",
+)
+SQLITE_REBUILD = "INSERT INTO accounts_user_fts (accounts_user_fts) VALUES ('rebuild')"
+SQLITE_REMOVE = [
+    "DROP TRIGGER IF EXISTS accounts_user_fts_insert",
+    "DROP TRIGGER IF EXISTS accounts_user_fts_delete",
+    "DROP TRIGGER IF EXISTS accounts_user_fts_update",
+    "DROP TABLE IF EXISTS accounts_user_fts",
+]
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# Ranking keys of a result row and whether each sorts descending.
+ORDERING = (("quality", False), ("followers", True), ("id", False))
+
+
+# ============================================================================
+# INDEX MANAGEMENT
+# ============================================================================
+
+
+def _execute(conn, statements):
+    with conn.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def install_search_index(conn):
+    """Create the user search index for the connection's database and fill it."""
+    if conn.vendor == "postgresql":
+        _execute(conn, POSTGRES_INSTALL)
+    elif conn.vendor == "sqlite":
+        _execute(conn, SQLITE_INSTALL + [SQLITE_REBUILD])
+
+
+def remove_search_index(conn):
+    if conn.vendor == "postgresql":
+        _execute(conn, POSTGRES_REMOVE)
+    elif conn.vendor == "sqlite":
+        _execute(conn, SQLITE_REMOVE)
+
+
+def ensure_search_index(conn):
+    """Restore the SQLite triggers if a table rebuild dropped them."""
+    if conn.vendor != "sqlite":
+        return
+    names = ("accounts_user_fts",) + SQLITE_TRIGGERS
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name IN (%s, %s, %s, %s)", names
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+    if "accounts_user_fts" in existing and len(existing) < len(names):
+        _execute(conn, SQLITE_INSTALL + [SQLITE_REBUILD])
+
+
+# ============================================================================
+# QUERIES
+# ============================================================================
+
+
+def normalize_query(query):
+    return " ".join(WORD_RE.findall(query.lower()))
+
+
+def matching_ids_sql(query, conn=None):
+    """
+    Return ``(sql, params)`` selecting the IDs of users matching ``query``
+    through the index (a scan on other databases), or None when the query
+    has no searchable words.
+    """
+    conn = conn or connection
+    term = normalize_query(query)
+    if not term:
+        return None
+    if conn.vendor == "postgresql":
+        pattern = "%" + re.sub(r"([\\%_])", r"\\\1", term) + "%"
+        return (
+            "SELECT id FROM accounts_user WHERE username ILIKE %s OR name ILIKE %s",
+            [pattern, pattern],
+        )
+    if conn.vendor == "sqlite":
+        match = " ".join(f'"{word}"*' for word in term.split())
+        return (
+            "SELECT rowid FROM accounts_user_fts WHERE accounts_user_fts MATCH %s",
+            [match],
+        )
+
+    from apps.accounts.models import User
+
+    users = User.objects.filter(
+        Q(username__icontains=term) | Q(name__icontains=term)
+    ).order_by()
+    return users.values("id").query.get_compiler(connection=conn).as_sql()
+
+
+def _ranked_sql(query):
+    """SQL selecting ``id, quality, followers`` for active matching users."""
+    matches = matching_ids_sql(query)
+    if matches is None:
+        return None
+    match_sql, match_params = matches
+    term = normalize_query(query)
+    sql = (
+        "SELECT u.id AS id, "
+        "CASE WHEN lower(u.username) = %s THEN 0 "
+        "WHEN substr(lower(u.username), 1, length(%s)) = %s THEN 1 "
+        "WHEN substr(lower(u.name), 1, length(%s)) = %s THEN 2 "
+        "ELSE 3 END AS quality, "
+        "COALESCE(s.followers_count, 0) AS followers "
+        "FROM accounts_user u "
+        "LEFT JOIN accounts_userstats s ON s.user_id = u.id "
+        f"WHERE u.is_active AND u.id IN ({match_sql})"
+    )
+    return sql, [term, term, term, term, term, *match_params]
+
+
+def _after(values, reverse):
+    """Lexicographic "comes after ``values``" condition over ``ORDERING``."""
+    branches, params = [], []
+    for index, (column, descending) in enumerate(ORDERING):
+        op = "<" if descending != reverse else ">"
+        equal = [f"{name} = %s" for name, _ in ORDERING[:index]]
+        branches.append("(" + " AND ".join(equal + [f"{column} {op} %s"]) + ")")
+        params += [*values[:index], values[index]]
+    return " OR ".join(branches), params
+
+
+def _order_by(reverse):
+    return ", ".join(
+        f"{column} {'DESC' if descending != reverse else 'ASC'}"
+        for column, descending in ORDERING
+    )
+
+
+def attach_counts(users):
+    """Set ``following_count`` and ``posts_count`` on ``users`` in one query."""
+    from apps.accounts.models import UserStats
+
+    stats = {
+        user_id: (following, posts)
+        for user_id, following, posts in UserStats.objects.filter(
+            user_id__in=[user.pk for user in users]
+        ).values_list("user_id", "following_count", "posts_count")
+    }
+    for user in users:
+        user.following_count, user.posts_count = stats.get(user.pk, (0, 0))
+    return users
+
+
+class UserSearchPaginator:
+    """
+    Rank users matching ``query`` and paginate them by
+    ``(quality, followers, id)``. Same interface as ``KeysetPaginator``.
+    """
+
+    def __init__(self, query, user=None, per_page=10):
+        self.query = query.strip()
+        self.user = user
+        self.per_page = per_page
+
+    def _fetch(self, after=None, reverse=False):
+        ranked = _ranked_sql(self.query)
+        if ranked is None:
+            return []
+
+        sql, params = ranked
+        sql = f"SELECT id, quality, followers FROM ({sql}) matches"
+        if after is not None:
+            condition, condition_params = _after(after, reverse)
+            sql += f" WHERE {condition}"
+            params += condition_params
+        sql += f" ORDER BY {_order_by(reverse)} LIMIT %s"
+        params.append(self.per_page + 1)
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def _hydrate(self, rows):
+        from apps.accounts.models import User
+
+        ranks = {row[0]: row for row in rows}
+        queryset = User.objects.filter(pk__in=ranks).with_follow_status(self.user)
+        by_id = {user.pk: user for user in queryset}
+
+        users = [by_id[pk] for pk in ranks if pk in by_id]
+        for user in users:
+            _id, user.search_quality, user.followers_count = ranks[user.pk]
+        return attach_counts(users)
+
+    # ------------------------------------------------------------------
+    # Cursor encoding
+    # ------------------------------------------------------------------
+
+    def encode_cursor(self, user, reverse=False):
+        values = [user.search_quality, user.followers_count, user.pk]
+        payload = json.dumps({"v": values, "r": reverse})
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            values = [int(value) for value in payload["v"]]
+            if len(values) != len(ORDERING):
+                raise ValueError("Cursor does not match the ordering.")
+            return values, bool(payload["r"])
+        except Exception as exc:
+            raise InvalidCursor("Invalid cursor.") from exc
+
+    # ------------------------------------------------------------------
+    # Pages
+    # ------------------------------------------------------------------
+
+    def page(self, cursor=None):
+        """Return the page of results after (or before) ``cursor``."""
+        after, reverse = self.decode_cursor(cursor) if cursor else (None, False)
+        rows = self._fetch(after, reverse)
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+
+        if reverse:
+            rows.reverse()
+            return KeysetPage(self._hydrate(rows), self, True, has_more)
+        return KeysetPage(self._hydrate(rows), self, has_more, after is not None)
+
+    def get_page(self, cursor=None):
+        """Like ``page()``, but fall back to the first page on a bad cursor."""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
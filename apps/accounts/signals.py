@@ -0,0 +1,136 @@
+"""
+Signal handlers that keep stored user stats (see ``apps.accounts.stats``),
+precomputed follow suggestions (see ``apps.accounts.suggestions``), the
+in-memory follow graph (see ``apps.accounts.graph``), the Following
+timelines (see ``apps.feed.timeline``), the response versions (see
+``apps.core.versions``) and the anonymous page cache (see
+``apps.core.page_cache``) in sync.
+"""
+
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.accounts import graph
+from apps.accounts.models import Follow, FollowSuggestion, User, UserStats
+from apps.accounts.stats import bump_stats
+from apps.accounts.suggestions import compute_suggestions
+from apps.core.page_cache import USER_PAGES
+from apps.core.versions import pages_changed, versions_changed
+from apps.feed.timeline import backfill_follow, dispatch, remove_follow
+
+
+# ============================================================================
+# USER STATS
+# ============================================================================
+
+
+@receiver(post_save, sender=User, dispatch_uid="accounts_user_stats_created")
+def user_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+# ============================================================================
+# FOLLOWS
+# ============================================================================
+
+
+def follows_created(follower, followed):
+    """
+    Side effects of ``follower`` following each of the ``followed`` users:
+    stored stats, the follow graph, suggestions, timeline backfills and
+    response and page versions. Shared by the handlers below and by the
+    batch endpoint (see ``apps.accounts.bulk``), whose inserts send no
+    signals.
+    """
+    follower_id = follower.pk
+    followed_ids = [user.pk for user in followed]
+    if not followed_ids:
+        return
+    bump_stats(follower_id, "following_count", len(followed_ids))
+    bump_stats(followed_ids, "followers_count", 1)
+
+    # Published first, so the graph is current when suggestions are recomputed.
+    for followed_id in followed_ids:
+        transaction.on_commit(
+            partial(graph.publish, graph.FOLLOW, follower_id, followed_id)
+        )
+    # Drop the followed users right away; the rest of the list is rescored later.
+    FollowSuggestion.objects.filter(
+        user_id=follower_id, suggested_id__in=followed_ids
+    ).delete()
+    dispatch(compute_suggestions, follower_id)
+    for followed_id in followed_ids:
+        dispatch(backfill_follow, follower_id, followed_id)
+
+    versions_changed(follower_id)
+    _follow_pages_changed(follower, followed)
+
+
+def follows_deleted(follower, followed):
+    """Side effects of ``follower`` unfollowing each of the ``followed`` users."""
+    follower_id = follower.pk
+    followed_ids = [user.pk for user in followed]
+    if not followed_ids:
+        return
+    bump_stats(follower_id, "following_count", -len(followed_ids))
+    bump_stats(followed_ids, "followers_count", -1)
+
+    for followed_id in followed_ids:
+        transaction.on_commit(
+            partial(graph.publish, graph.UNFOLLOW, follower_id, followed_id)
+        )
+    dispatch(compute_suggestions, follower_id)
+    for followed_id in followed_ids:
+        dispatch(remove_follow, follower_id, followed_id)
+
+    versions_changed(follower_id)
+    _follow_pages_changed(follower, followed)
+
+
+def _follow_pages_changed(follower, followed):
+    pages_changed(
+        USER_PAGES.format(username=follower.username),
+        *(USER_PAGES.format(username=user.username) for user in followed),
+    )
+
+
+@receiver(post_save, sender=Follow, dispatch_uid="accounts_follow_created")
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        follows_created(instance.follower, [instance.followed])
+
+
+@receiver(post_delete, sender=Follow, dispatch_uid="accounts_follow_deleted")
+def follow_deleted(sender, instance, **kwargs):
+    follows_deleted(instance.follower, [instance.followed])
+
+
+# ============================================================================
+# RESPONSE VERSIONS
+# ============================================================================
+
+
+@receiver(post_save, sender=User, dispatch_uid="accounts_user_versions")
+def user_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        versions_changed(instance.pk)
+
+
+# ============================================================================
+# ANONYMOUS PAGES
+# ============================================================================
+
+
+@receiver(post_save, sender=User, dispatch_uid="accounts_user_pages")
+def user_pages_changed(
+    sender, instance, created, raw=False, update_fields=None, **kwargs
+):
+    # New users show on no cached page yet; logins only touch last_login.
+    if raw or created or update_fields == frozenset({"last_login"}):
+        return
+    # Names and avatars show next to posts and comments anywhere.
+    pages_changed(everywhere=True)
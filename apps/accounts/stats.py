@@ -0,0 +1,71 @@
+"""
+Stored per-user counts (``UserStats``): followers, following, posts and
+likes given.
+
+Follow, post and reaction writes adjust the counts of the users involved
+with ``F()`` updates. The updates run from ``post_save``/``post_delete``
+handlers (see ``apps.accounts.signals`` and ``apps.feed.signals``), or from
+the same functions called by the batch endpoints, inside the transaction of
+the write itself, so a count never drifts from a committed row. A user's
+stats row is created together with the user. The ``rebuild_user_stats``
+command recounts every row and creates any missing ones, e.g. for users
+inserted with ``bulk_create``.
+"""
+
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from apps.accounts.models import Follow, User, UserStats
+
+
+def bump_stats(user_ids, field, delta):
+    """
+    Atomically add ``delta`` to one count of a user (one ID or several),
+    never going below zero.
+    """
+    if isinstance(user_ids, int):
+        user_ids = [user_ids]
+    user_ids = [user_id for user_id in user_ids if user_id]
+    if not user_ids or not delta:
+        return
+    UserStats.objects.filter(user_id__in=user_ids).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
+
+
+def rebuild_stats(user_ids):
+    """
+    Recount the stats of ``user_ids`` from the underlying rows, creating
+    missing stats rows. Returns the number of users recounted.
+    """
+    from apps.feed.models import Post, Reaction
+
+    counts = {
+        user_id: dict.fromkeys(UserStats.COUNTER_FIELDS, 0)
+        for user_id in User.objects.filter(pk__in=user_ids).values_list(
+            "pk", flat=True
+        )
+    }
+    sources = (
+        ("followers_count", Follow, "followed_id"),
+        ("following_count", Follow, "follower_id"),
+        ("posts_count", Post, "author_id"),
+        ("likes_count", Reaction, "user_id"),
+    )
+    for field, model, column in sources:
+        totals = (
+            model.objects.filter(**{f"{column}__in": list(counts)})
+            .order_by()
+            .values_list(column)
+            .annotate(total=Count("pk"))
+        )
+        for user_id, total in totals:
+            counts[user_id][field] = total
+
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=user_id, **values) for user_id, values in counts.items()],
+        update_conflicts=True,
+        unique_fields=["user"],
+        update_fields=UserStats.COUNTER_FIELDS,
+    )
+    return len(counts)
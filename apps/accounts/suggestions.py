@@ -0,0 +1,178 @@
+"""
+Precomputed "who to follow" recommendations.
+
+Candidates for a user are the accounts followed by the people they follow
+(friends of friends), scored by how many of those people follow them and by
+their overall popularity:
+
+    score = mutual_count * MUTUAL_WEIGHT + log1p(followers) * POPULARITY_WEIGHT
+
+Users who follow few people are topped up with the most-followed accounts.
+Mutual and follower counts come from the in-memory follow graph
+(``apps.accounts.graph``) when it is enabled.
+The best ``FOLLOW_SUGGESTIONS_LIMIT`` candidates are stored as
+``FollowSuggestion`` rows, so reading them is one indexed range scan. Lists
+are rebuilt periodically by the ``refresh_follow_suggestions`` command and
+incrementally, in the background, whenever the user follows or unfollows.
+Users without a list yet are shown the most-followed accounts until theirs
+is built.
+"""
+
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from apps.accounts.graph import get_graph
+from apps.accounts.models import Follow, FollowSuggestion, User, UserStats
+from apps.core.versions import versions_changed
+from apps.feed.timeline import dispatch
+
+MUTUAL_WEIGHT = 1.0
+POPULARITY_WEIGHT = 0.25
+
+# Friends-of-friends candidates considered per user, by mutual count.
+CANDIDATE_LIMIT = 500
+
+POPULAR_CACHE_TIMEOUT = 600
+SEEDED_CACHE_TIMEOUT = 60 * 60
+
+
+def _limit():
+    return getattr(settings, "FOLLOW_SUGGESTIONS_LIMIT", 20)
+
+
+def popular_users(limit):
+    """Return ``(user_id, followers)`` for the most-followed active users."""
+
+    def compute():
+        return list(
+            UserStats.objects.filter(user__is_active=True, followers_count__gt=0)
+            .order_by("-followers_count", "user_id")
+            .values_list("user_id", "followers_count")[:limit]
+        )
+
+    return cache.get_or_set(
+        f"suggestions:popular:{limit}", compute, POPULAR_CACHE_TIMEOUT
+    )
+
+
+def compute_suggestions(user_id):
+    """Recompute and store the suggestion list of one user."""
+    if not User.objects.filter(pk=user_id, is_active=True).exists():
+        return
+
+    limit = _limit()
+    graph = get_graph()
+    if graph is not None:
+        excluded = graph.following_ids(user_id) | {user_id}
+        counts = graph.followed_by_following(user_id)
+        for followed_id in excluded:
+            counts.pop(followed_id, None)
+        mutual = dict(counts.most_common(CANDIDATE_LIMIT))
+    else:
+        followed = Follow.objects.filter(follower_id=user_id).values("followed_id")
+        excluded = set(followed.values_list("followed_id", flat=True)) | {user_id}
+        mutual = dict(
+            Follow.objects.filter(follower_id__in=followed)
+            .exclude(followed_id__in=followed)
+            .exclude(followed_id=user_id)
+            .order_by()
+            .values_list("followed_id")
+            .annotate(total=Count("pk"))
+            .order_by("-total")[:CANDIDATE_LIMIT]
+        )
+
+    candidates = dict.fromkeys(mutual)
+    for candidate_id, _followers in popular_users(limit * 2):
+        if candidate_id not in excluded:
+            candidates.setdefault(candidate_id)
+
+    active = set(
+        User.objects.filter(pk__in=candidates, is_active=True).values_list(
+            "pk", flat=True
+        )
+    )
+    if graph is not None:
+        followers = {pk: graph.follower_count(pk) for pk in active}
+    else:
+        followers = dict(
+            UserStats.objects.filter(user_id__in=active).values_list(
+                "user_id", "followers_count"
+            )
+        )
+
+    scored = sorted(
+        (
+            (
+                mutual.get(candidate_id, 0) * MUTUAL_WEIGHT
+                + math.log1p(followers.get(candidate_id, 0)) * POPULARITY_WEIGHT,
+                candidate_id,
+            )
+            for candidate_id in active
+        ),
+        key=lambda item: (-item[0], item[1]),
+    )[:limit]
+
+    with transaction.atomic():
+        FollowSuggestion.objects.filter(user_id=user_id).delete()
+        FollowSuggestion.objects.bulk_create(
+            FollowSuggestion(
+                user_id=user_id,
+                suggested_id=candidate_id,
+                score=score,
+                mutual_count=mutual.get(candidate_id, 0),
+            )
+            for score, candidate_id in scored
+        )
+        versions_changed(user_id, content=False)
+
+
+def refresh_suggestions(user_ids=None):
+    """Recompute suggestions for ``user_ids`` (all active users by default)."""
+    users = User.objects.filter(is_active=True)
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+
+    total = 0
+    for user_id in users.order_by("pk").values_list("pk", flat=True).iterator():
+        compute_suggestions(user_id)
+        total += 1
+    return total
+
+
+def get_suggestions(user, limit=5):
+    """
+    Return up to ``limit`` suggested users for ``user``, best first.
+    Runs while a page renders, so a user whose list was never built gets the
+    most-followed accounts instead while the list is computed in the
+    background.
+    """
+    if not user or not user.is_authenticated:
+        return []
+
+    suggestions = list(User.objects.suggested_users(user, limit))
+    if suggestions:
+        return suggestions
+    if cache.add(f"suggestions:seeded:{user.pk}", True, SEEDED_CACHE_TIMEOUT):
+        dispatch(compute_suggestions, user.pk)
+    return popular_suggestions(user, limit)
+
+
+def popular_suggestions(user, limit):
+    """Return up to ``limit`` of the most-followed users ``user`` does not follow."""
+    candidate_ids = [
+        candidate_id
+        for candidate_id, _followers in popular_users(limit * 2)
+        if candidate_id != user.pk
+    ]
+    followed = Follow.objects.filter(follower=user).values("followed_id")
+    users = (
+        User.objects.filter(pk__in=candidate_ids, is_active=True)
+        .exclude(pk__in=followed)
+        .only("username", "name", "image")
+    )
+    by_id = {candidate.pk: candidate for candidate in users}
+    return [by_id[pk] for pk in candidate_ids if pk in by_id][:limit]
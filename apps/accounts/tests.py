@@ -1,3 +1,398 @@
-from django.test import TestCase
+import json
+from collections import Counter
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+
+from apps.accounts import bulk
+from apps.accounts.api.serializers import UserListSerializer
+from apps.accounts.graph import FOLLOW, UNFOLLOW, FollowGraph, reset_graph
+from apps.accounts.models import Follow, FollowSuggestion, User, UserStats
+from apps.accounts.search import UserSearchPaginator
+from apps.accounts.stats import rebuild_stats
+from apps.accounts.suggestions import compute_suggestions, get_suggestions
+from apps.accounts.views import CONNECTIONS_PAGE_SIZE
+from apps.core.testing import TestCase, make_user
+from apps.feed.models import Post, Reaction, TimelineEntry, TimelineTask
+
+
+class FollowBatchTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user("reader")
+        self.alice = make_user("alice")
+        self.bob = make_user("bob")
+
+    def apply(self, *operations):
+        results = bulk.apply_follows(
+            self.user,
+            [{"action": action, "username": name} for action, name in operations],
+        )
+        return [result["status"] for result in results]
+
+    def counts(self, user):
+        stats = UserStats.objects.get(user=user)
+        return stats.following_count, stats.followers_count
+
+    def test_follow_and_unfollow(self):
+        statuses = self.apply(("follow", "alice"), ("follow", "BOB"))
+        self.assertEqual(statuses, [bulk.CREATED, bulk.CREATED])
+        self.assertEqual(self.counts(self.user), (2, 0))
+        self.assertEqual(self.counts(self.alice), (0, 1))
+
+        statuses = self.apply(("follow", "alice"), ("unfollow", "bob"))
+        self.assertEqual(statuses, [bulk.UNCHANGED, bulk.DELETED])
+        self.assertEqual(self.counts(self.user), (1, 0))
+        self.assertEqual(self.counts(self.bob), (0, 0))
+
+    def test_batch_has_the_same_effects_as_single_writes(self):
+        def state(follower, followed):
+            return [
+                UserStats.objects.values(*UserStats.COUNTER_FIELDS).get(user=user)
+                for user in (follower, *followed)
+            ] + [TimelineEntry.objects.filter(user=follower).count()]
+
+        single, carol, dave = (make_user(name) for name in ("single", "carol", "dave"))
+        for author in (self.alice, self.bob, carol, dave):
+            Post.objects.create(author=author, body="hello")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.create(follower=single, followed=carol)
+            Follow.objects.create(follower=single, followed=dave)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.apply(("follow", "alice"), ("follow", "bob"))
+
+        batched = state(self.user, [self.alice, self.bob])
+        self.assertEqual(batched, state(single, [carol, dave]))
+        self.assertEqual(batched[0]["following_count"], 2)
+        self.assertEqual(batched[-1], 2)
+
+    def test_invalid_operations_fail(self):
+        statuses = self.apply(
+            ("follow", "nobody"),
+            ("follow", "reader"),
+            ("follow", "alice"),
+            ("unfollow", "alice"),
+        )
+        self.assertEqual(
+            statuses, [bulk.FAILED, bulk.FAILED, bulk.CREATED, bulk.FAILED]
+        )
+
+    def test_concurrent_follow_is_not_counted_twice(self):
+        insert = bulk.bulk_create_new
+
+        def racing_insert(model, objs):
+            # A single follow lands between the existence check and the insert.
+            Follow.objects.create(follower=self.user, followed=self.alice)
+            return insert(model, objs)
+
+        with mock.patch.object(bulk, "bulk_create_new", racing_insert):
+            statuses = self.apply(("follow", "alice"), ("follow", "bob"))
+
+        self.assertEqual(statuses, [bulk.UNCHANGED, bulk.CREATED])
+        self.assertEqual(self.counts(self.user), (2, 0))
+        self.assertEqual(self.counts(self.alice), (0, 1))
+        self.assertEqual(self.counts(self.bob), (0, 1))
+
+    def test_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post(
+            "/api/users/follow/batch/",
+            {"operations": [{"action": "follow", "username": "alice"}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"][0]["status"], bulk.CREATED)
+        self.assertTrue(Follow.objects.filter(follower=self.user, followed=self.alice))
+
+
+class UserStatsTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.alice, self.bob, self.carol = (
+            make_user(name) for name in ("alice", "bob", "carol")
+        )
+
+    def stored(self):
+        return {
+            row["user_id"]: row
+            for row in UserStats.objects.values("user_id", *UserStats.COUNTER_FIELDS)
+        }
+
+    def assertConsistent(self):
+        stored = self.stored()
+        rebuild_stats(User.objects.values_list("pk", flat=True))
+        self.assertEqual(stored, self.stored())
+
+    def test_writes_keep_stats_consistent(self):
+        Follow.objects.create(follower=self.alice, followed=self.bob)
+        Follow.objects.create(follower=self.carol, followed=self.bob)
+        bulk.apply_follows(self.bob, [{"action": "follow", "username": "carol"}])
+        post = Post.objects.create(author=self.bob, body="hello")
+        Post.objects.create(author=self.alice, parent=post, body="")
+        Reaction.objects.create(user=self.alice, post=post)
+        Reaction.objects.create(user=self.carol, post=post)
+        self.assertConsistent()
+        self.assertEqual(
+            self.stored()[self.bob.pk],
+            {
+                "user_id": self.bob.pk,
+                "followers_count": 2,
+                "following_count": 1,
+                "posts_count": 1,
+                "likes_count": 0,
+            },
+        )
+
+        Follow.objects.filter(follower=self.alice).delete()
+        bulk.apply_follows(self.bob, [{"action": "unfollow", "username": "carol"}])
+        self.assertConsistent()
+
+        # Cascades: the post takes its reactions and repost along.
+        post.delete()
+        self.assertConsistent()
+        self.assertEqual(self.stored()[self.alice.pk]["likes_count"], 0)
+
+        self.carol.delete()
+        self.assertConsistent()
+        self.assertEqual(self.stored()[self.bob.pk]["followers_count"], 0)
+
+    def test_rebuild_creates_missing_rows_and_fixes_drift(self):
+        Follow.objects.create(follower=self.alice, followed=self.bob)
+        (bulk_user,) = User.objects.bulk_create([User(username="bulk")])
+        Post.objects.bulk_create([Post(author=bulk_user, body="no signals")])
+        UserStats.objects.filter(user=self.bob).update(followers_count=99)
+
+        call_command("rebuild_user_stats", batch_size=2, stdout=StringIO())
+        stored = self.stored()
+        self.assertEqual(stored[bulk_user.pk]["posts_count"], 1)
+        self.assertEqual(stored[self.bob.pk]["followers_count"], 1)
+        self.assertConsistent()
+
+    def test_profile_counts_are_read_from_stats(self):
+        Follow.objects.create(follower=self.alice, followed=self.bob)
+        Post.objects.create(author=self.bob, body="hello")
+        with self.assertNumQueries(1):
+            profile = User.objects.get_profile("BOB", self.alice)
+        self.assertEqual(
+            (profile.followers_count, profile.posts_count, profile.is_following),
+            (1, 1, True),
+        )
+
+
+class UserListStreamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user("admin")
+        cls.admin.is_staff = True
+        cls.admin.save()
+        for name in ("alice", "bob", "carol", "dave", "erin"):
+            Follow.objects.create(follower=cls.admin, followed=make_user(name))
+
+    @override_settings(API_STREAM_CHUNK_SIZE=2)
+    def test_admin_list_is_streamed_as_the_serialized_users(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.get("/api/users/")
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/json")
+        streamed = json.loads(b"".join(response.streaming_content))
+
+        request = APIRequestFactory().get("/api/users/")
+        request.user = self.admin
+        users = User.objects.with_all_counts().with_follow_status(self.admin)
+        expected = UserListSerializer(
+            users, many=True, context={"request": request}
+        ).data
+        self.assertEqual(streamed, json.loads(JSONRenderer().render(expected)))
+        self.assertEqual(len(streamed), 6)
+
+    def test_other_users_only_see_themselves(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.get(username="alice"))
+        response = client.get("/api/users/")
+        self.assertFalse(response.streaming)
+        self.assertEqual([user["username"] for user in response.json()], ["alice"])
+
+
+class UserSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.ada = make_user("ada")
+        cls.adam = make_user("adam")
+        make_user("grace")
+
+    def search(self, query):
+        return [user.pk for user in UserSearchPaginator(query).page()]
+
+    def test_prefix_match_ranks_exact_username_first(self):
+        self.assertEqual(self.search("ada"), [self.ada.pk, self.adam.pk])
+        self.assertEqual(self.search("  !! "), [])
+
+    def test_other_databases_fall_back_to_icontains(self):
+        with mock.patch.object(connection, "vendor", "other"):
+            self.assertEqual(self.search("ADA"), [self.ada.pk, self.adam.pk])
+            self.assertEqual(list(User.objects.search("dam")), [self.adam])
+
+
+class ConnectionListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.star = make_user("star")
+        cls.fans = [make_user(f"fan{i}") for i in range(CONNECTIONS_PAGE_SIZE + 5)]
+        Follow.objects.bulk_create(
+            Follow(follower=fan, followed=cls.star) for fan in cls.fans
+        )
+        # Followed from oldest to newest fan.
+        for i, fan in enumerate(cls.fans):
+            Follow.objects.filter(follower=fan).update(
+                created_date=timezone.now() + timedelta(seconds=i)
+            )
+
+    def walk(self, url):
+        pages, cursor = [], None
+        while True:
+            response = self.client.get(url, {"cursor": cursor} if cursor else {})
+            page = response.context["people_page"]
+            pages.append([person.username for person in page])
+            if not page.has_next():
+                return pages
+            cursor = page.next_cursor
+
+    def test_followers_are_paged_newest_first(self):
+        pages = self.walk(f"/profile/{self.star.username}/followers/")
+        self.assertEqual([len(page) for page in pages], [CONNECTIONS_PAGE_SIZE, 5])
+        self.assertEqual(sum(pages, []), [fan.username for fan in reversed(self.fans)])
+        following = self.walk(f"/profile/{self.fans[0].username}/following/")
+        self.assertEqual(following, [["star"]])
+
+    def test_profile_page_loads_no_list(self):
+        def profile(user):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(f"/profile/{user.username}/")
+            return response, len(queries)
+
+        response, star_queries = profile(self.star)
+        self.assertNotContains(response, "@fan0")
+        self.assertEqual(profile(make_user("nobody"))[1], star_queries)
+
+
+class SuggestionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.alice, cls.bob, cls.carol, cls.dave = (
+            make_user(name) for name in ("reader", "alice", "bob", "carol", "dave")
+        )
+        for follower, followed in (
+            (cls.reader, cls.alice),
+            (cls.reader, cls.bob),
+            (cls.alice, cls.carol),
+            (cls.alice, cls.dave),
+            (cls.bob, cls.carol),
+        ):
+            Follow.objects.create(follower=follower, followed=followed)
+
+    def test_friends_of_friends_rank_by_mutual_follows(self):
+        compute_suggestions(self.reader.pk)
+        suggestions = get_suggestions(self.reader)
+        self.assertEqual(suggestions, [self.carol, self.dave])
+        self.assertEqual([user.mutual_count for user in suggestions], [2, 1])
+
+    def test_missing_list_falls_back_to_popular_users(self):
+        newbie = make_user("newbie")
+        Follow.objects.create(follower=newbie, followed=self.alice)
+        FollowSuggestion.objects.filter(user=newbie).delete()
+        scheduled = TimelineTask.objects.filter(
+            task__endswith=".compute_suggestions", args=[newbie.pk]
+        )
+        scheduled.delete()
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            suggestions = get_suggestions(newbie, limit=2)
+        # Most followed first; alice is already followed.
+        self.assertEqual(suggestions, [self.carol, self.bob])
+        self.assertFalse(FollowSuggestion.objects.filter(user=newbie))
+        self.assertTrue(scheduled.exists())
+
+        # The computation is scheduled once, not on every page view.
+        get_suggestions(newbie, limit=2)
+        self.assertEqual(scheduled.count(), 1)
+
+        callbacks[0]()
+        self.assertFalse(scheduled.exists())
+        self.assertEqual(get_suggestions(newbie, limit=2), [self.carol, self.dave])
+
+
+class FollowGraphTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [make_user(f"user{i}") for i in range(6)]
+        for follower, followed in (
+            (0, 1), (0, 2), (0, 3), (1, 2), (1, 3), (2, 3), (3, 0), (4, 2), (5, 1),
+        ):
+            Follow.objects.create(
+                follower=cls.users[follower], followed=cls.users[followed]
+            )
+
+    def assertMatchesDatabase(self, graph):
+        ids = [user.pk for user in self.users]
+        follows = set(Follow.objects.values_list("follower_id", "followed_id"))
+        self.assertEqual(graph.edge_count, len(follows))
+        for user_id in ids:
+            following = {b for a, b in follows if a == user_id}
+            followers = {a for a, b in follows if b == user_id}
+            self.assertEqual(graph.following_ids(user_id), following)
+            self.assertEqual(graph.follower_ids(user_id), followers)
+            self.assertEqual(list(graph.following(user_id)), sorted(following))
+            self.assertEqual(graph.following_count(user_id), len(following))
+            self.assertEqual(graph.follower_count(user_id), len(followers))
+            for other_id in ids:
+                self.assertEqual(
+                    graph.is_following(user_id, other_id),
+                    (user_id, other_id) in follows,
+                )
+                self.assertEqual(
+                    graph.mutual_count(user_id, other_id),
+                    len(following & {a for a, b in follows if b == other_id}),
+                )
+            expected = Counter(b for a, b in follows if a in following)
+            self.assertEqual(graph.followed_by_following(user_id), expected)
+
+    def test_loaded_graph_matches_the_database(self):
+        self.assertMatchesDatabase(FollowGraph.load())
+
+    def test_changes_keep_matching_before_and_after_compaction(self):
+        graph = FollowGraph.load()
+        users = self.users
+        for follower, followed in ((4, 0), (5, 0), (2, 1)):
+            Follow.objects.create(follower=users[follower], followed=users[followed])
+            graph.apply(FOLLOW, users[follower].pk, users[followed].pk)
+        for follower, followed in ((0, 1), (4, 2), (4, 0)):
+            Follow.objects.filter(
+                follower=users[follower], followed=users[followed]
+            ).delete()
+            graph.apply(UNFOLLOW, users[follower].pk, users[followed].pk)
+        self.assertMatchesDatabase(graph)
+
+        with mock.patch("apps.accounts.graph.COMPACT_THRESHOLD", 0):
+            graph.compact()
+        self.assertMatchesDatabase(graph)
+
+    @override_settings(FOLLOW_GRAPH_ENABLED=True)
+    def test_processes_replay_each_others_changes(self):
+        reset_graph()
+        self.addCleanup(reset_graph)
+        other_process = FollowGraph.load()
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.create(follower=self.users[5], followed=self.users[3])
+        self.assertTrue(other_process.catch_up())
+        self.assertMatchesDatabase(other_process)
@@ -1,17 +1,34 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
 
 
 app_name = "accounts"
 
+# Read-only pages have async versions for ASGI deployments.
+pages = async_views if settings.ASYNC_VIEWS else views
+
 urlpatterns = [
     path("", views.index, name="index"),
     path("login/", views.login_view, name="login"),
     path("logout/", views.logout_view, name="logout"),
     path("register/", views.register, name="register"),
+    path("people/", views.people, name="people"),
     path("profile/edit/", views.edit_profile, name="edit_profile"),
-    path("profile/<str:username>/", views.profile, name="profile"),
+    path("profile/<str:username>/", pages.profile, name="profile"),
     path("profile/<str:username>/follow/", views.follow, name="follow"),
+    path(
+        "profile/<str:username>/followers/",
+        views.connections,
+        {"relation": "followers"},
+        name="followers",
+    ),
+    path(
+        "profile/<str:username>/following/",
+        views.connections,
+        {"relation": "following"},
+        name="following",
+    ),
     path("settings/", views.account_settings, name="settings"),
     path("settings/change-email", views.change_email, name="change-email"),
     path("settings/change-password", views.change_password, name="change-password"),
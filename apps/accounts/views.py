@@ -7,13 +7,19 @@ from django.core.exceptions import ValidationError
 from django.db import IntegrityError
 from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 
 from apps.accounts.models import Follow, User
+from apps.accounts.search import UserSearchPaginator
 from apps.feed.models import Post
+from apps.core.conditional import conditional_page
+from apps.core.page_cache import USER_PAGES, cache_anonymous_page
 from apps.core.utils import paginate_queryset
 
+CONNECTIONS_PAGE_SIZE = 20
+
 
 def index(request):
     return redirect("feed:index")
@@ -95,6 +101,8 @@ def register(request):
     return render(request, "accounts/register.html")
 
 
+@conditional_page
+@cache_anonymous_page(USER_PAGES)
 def profile(request, username):
     current_user = request.user if request.user.is_authenticated else None
 
@@ -123,13 +131,37 @@ def profile(request, username):
         "accounts/profile.html",
         {
             "profile_user": user,
-            "following_list": User.objects.following_of(user),
-            "followers_list": User.objects.followers_of(user),
             "posts_page": page_obj,
         },
     )
 
 
+@conditional_page
+def connections(request, username, relation):
+    """
+    One page of a user's followers or followings, as an HTML fragment.
+    Loaded by the profile page when its Followers/Following modal opens.
+    """
+    user = get_object_or_404(User.objects.only("username"), username__iexact=username)
+    if relation == "followers":
+        people = User.objects.followers_of(user)
+    else:
+        people = User.objects.following_of(user)
+    page_obj = paginate_queryset(request, people, per_page=CONNECTIONS_PAGE_SIZE)
+
+    return render(
+        request,
+        "components/connections.html",
+        {
+            "profile_user": user,
+            "people_page": page_obj,
+            "relation": relation,
+            "list_url": reverse(f"accounts:{relation}", args=[user.username]),
+            "first_page": not request.GET.get("cursor"),
+        },
+    )
+
+
 @require_POST
 @csrf_exempt
 def follow(request, username):
@@ -161,6 +193,19 @@ def follow(request, username):
     return JsonResponse({"status": "201", "response": "Followed"})
 
 
+def people(request):
+    query = request.GET.get("q", "").strip()
+    page_obj = None
+    if query:
+        paginator = UserSearchPaginator(query, user=request.user)
+        page_obj = paginator.get_page(request.GET.get("cursor"))
+    return render(
+        request,
+        "accounts/people.html",
+        {"people_page": page_obj, "search_query": query},
+    )
+
+
 @login_required
 def edit_profile(request):
     user = request.user
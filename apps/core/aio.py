@@ -0,0 +1,70 @@
+"""
+Helpers for async views.
+
+Django's async ORM methods (``aget()``, ``async for`` ...) hand every query
+to the request's single sync thread, so awaiting several of them with
+``asyncio.gather()`` still runs them one after the other. ``gather()`` below
+runs independent, read-only query functions in separate worker threads
+instead, each with its own database connection, so they really overlap:
+
+    user, page = await gather(
+        lambda: User.objects.get_profile(username),
+        lambda: list(posts[:10]),
+    )
+
+Functions run outside the request's transaction and only see committed
+data. They must not load ``request.user`` or the session lazily; resolve
+the user first with ``aresolve_user()``.
+
+The worker threads come from a pool of ``ASYNC_GATHER_WORKERS`` per
+process. Each keeps its database connection between calls and, like a
+request, only drops it once it is older than ``CONN_MAX_AGE`` or broken,
+so a process holds at most that many extra connections.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.shortcuts import render
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.ASYNC_GATHER_WORKERS,
+            thread_name_prefix="aio-gather",
+        )
+    return _executor
+
+
+def _run(func):
+    close_old_connections()
+    try:
+        return func()
+    finally:
+        close_old_connections()
+
+
+async def gather(*funcs):
+    """Call the sync functions ``funcs`` concurrently; return their results."""
+    run = sync_to_async(_run, thread_sensitive=False, executor=_get_executor())
+    return await asyncio.gather(*(run(func) for func in funcs))
+
+
+async def aresolve_user(request):
+    """
+    Load the request's user once with ``request.auser()`` and store it as
+    ``request.user``, so sync code run later (templates, validators) reads it
+    without another query.
+    """
+    request.user = await request.auser()
+    return request.user
+
+
+arender = sync_to_async(render)
@@ -0,0 +1,59 @@
+"""
+Conditional GET support for API viewsets.
+
+A viewset using ``ConditionalGetMixin`` returns a cheap ETag for an action
+from ``get_etag()``, computed from narrow queries and ``apps.core.versions``
+without loading or serializing the response. A request whose
+``If-None-Match`` still matches is answered with ``304 Not Modified`` right
+after authentication, permission and throttle checks.
+
+No ``Last-Modified`` header is sent: it has one-second resolution, so a
+write landing in the same second as a response would be answered with a
+false 304 on the next ``If-Modified-Since`` request.
+"""
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+
+class _NotModified(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """Answer conditional GET/HEAD requests before the view does any work."""
+
+    def get_etag(self, request):
+        """
+        Return the ETag of the current action, or None to build the response
+        unconditionally.
+        """
+        return None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._etag = None
+        if request.method not in ("GET", "HEAD"):
+            return
+
+        self._etag = self.get_etag(request)
+        if self._etag is None:
+            return
+        response = get_conditional_response(request, etag=quote_etag(self._etag))
+        if response is not None:
+            raise _NotModified(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, _NotModified):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        etag = getattr(self, "_etag", None)
+        if etag and response.status_code in (200, 304):
+            response.headers["ETag"] = quote_etag(etag)
+            # Responses differ per user; clients must revalidate every time.
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
@@ -0,0 +1,51 @@
+"""
+JSON renderer for the Qwitter API.
+
+``FastJSONRenderer`` encodes with orjson when it is installed and falls back
+to DRF's stdlib ``JSONRenderer`` otherwise. Types orjson does not handle the
+way DRF does (datetimes, Decimals, lazy strings, querysets, ...) are passed to
+DRF's ``JSONEncoder``, so both paths produce the same output. Indented output
+(``?format=json; indent=4``, the browsable API) always uses the stdlib path.
+"""
+
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """Compact JSON via orjson, with the stdlib renderer as fallback."""
+
+    def __init__(self):
+        super().__init__()
+        self._default = self.encoder_class().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self._default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+            )
+        except orjson.JSONEncodeError:
+            # e.g. integers wider than 64 bits
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Keep the output a strict JavaScript subset, like JSONRenderer.
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+                b"\xe2\x80\xa9", b"\\u2029"
+            )
+        return ret
@@ -0,0 +1,46 @@
+"""
+Streamed JSON arrays for large, unpaginated list responses.
+
+Instead of serializing every row and rendering one big bytestring, the rows
+are read from a server-side iterator, serialized ``chunk_size`` at a time and
+sent as they are rendered. Memory stays bounded by one chunk whatever the
+number of rows. The status code and headers are sent before the body, so an
+error while streaming cuts the response short instead of turning it into an
+error response.
+"""
+
+from itertools import islice
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+from apps.core.api.renderers import FastJSONRenderer
+
+
+def serialized_chunks(queryset, serializer_class, context=None, chunk_size=None):
+    """Yield lists of serialized rows of ``queryset``, ``chunk_size`` at a time."""
+    chunk_size = chunk_size or settings.API_STREAM_CHUNK_SIZE
+    rows = queryset.iterator(chunk_size=chunk_size)
+    while chunk := list(islice(rows, chunk_size)):
+        yield serializer_class(chunk, many=True, context=context or {}).data
+
+
+def iter_json_array(chunks, renderer=None):
+    """Render an iterable of lists as one JSON array, one chunk at a time."""
+    renderer = renderer or FastJSONRenderer()
+    yield b"["
+    separator = b""
+    for chunk in chunks:
+        if chunk:
+            # Strip the brackets of the chunk's own array.
+            yield separator + renderer.render(chunk)[1:-1]
+            separator = b","
+    yield b"]"
+
+
+class StreamingJSONResponse(StreamingHttpResponse):
+    """A JSON array streamed from an iterable of lists of items."""
+
+    def __init__(self, chunks, renderer=None, **kwargs):
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(iter_json_array(chunks, renderer), **kwargs)
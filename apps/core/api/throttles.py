@@ -5,7 +5,113 @@ This module provides comprehensive rate limiting for all API endpoints,
 with admin/staff exemptions and action-specific throttle rates.
 """
 
-from rest_framework.throttling import UserRateThrottle, AnonRateThrottle
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+from rest_framework import throttling
+
+
+class SlidingWindowRateThrottle(throttling.SimpleRateThrottle):
+    """
+    Sliding-window counter throttle with a constant cost per request.
+
+    ``SimpleRateThrottle`` stores the full list of request timestamps for each
+    client and rewrites it on every request. Here each client has one integer
+    counter per fixed window instead; the rate over the sliding window is
+    estimated from the current window's count plus the previous window's
+    count, weighted by how much of it still overlaps. Hits are recorded with
+    atomic ``cache.incr`` so concurrent workers never lose updates.
+
+    Counters are kept in the ``throttle`` cache, which never evicts them
+    before they expire.
+    """
+
+    cache = ConnectionProxy(caches, "throttle")
+
+    def is_exempt(self, request):
+        """Return True if the request bypasses this throttle entirely."""
+        return False
+
+    def prepare(self, request, view):
+        """
+        Resolve the counter keys for this request.
+
+        Returns:
+            list: The current and previous window keys, or None if the
+            request is not throttled by this class.
+        """
+        self.cost = 1
+        if self.rate is None or self.is_exempt(request):
+            return None
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return None
+
+        self.now = self.timer()
+        window, offset = divmod(self.now, self.duration)
+        self.elapsed = offset / self.duration
+        self.current_key = f"{self.key}:{int(window)}"
+        self.previous_key = f"{self.key}:{int(window) - 1}"
+        return [self.current_key, self.previous_key]
+
+    def evaluate(self, counters, cost=1):
+        """
+        Check the request against the counters fetched for ``prepare()`` keys.
+        A request with ``cost`` > 1 (a batch) is allowed only if all of its
+        hits fit under the limit.
+        """
+        self.cost = cost
+        self.current_count = counters.get(self.current_key, 0)
+        self.previous_count = counters.get(self.previous_key, 0)
+        estimate = self.current_count + self.previous_count * (1 - self.elapsed)
+        return estimate + cost - 1 < self.num_requests
+
+    def record(self, cost=1):
+        """Count the request (``cost`` hits) in the current window."""
+        try:
+            self.cache.incr(self.current_key, cost)
+        except ValueError:
+            # First hit in this window; keep it long enough to be the
+            # "previous" window of the next one.
+            if not self.cache.add(self.current_key, cost, self.duration * 2):
+                self.cache.incr(self.current_key, cost)
+
+    def allow_request(self, request, view):
+        keys = self.prepare(request, view)
+        if keys is None:
+            return True
+        if not self.evaluate(self.cache.get_many(keys)):
+            return False
+        self.record()
+        return True
+
+    def wait(self):
+        """
+        Return the number of seconds until the estimated rate drops below the
+        limit, either as the previous window slides out or at the next window.
+        """
+        remaining = self.duration * (1 - self.elapsed)
+        headroom = self.num_requests - self.current_count - (self.cost - 1)
+        if headroom > 0 and self.previous_count:
+            # Solve current + previous * (1 - elapsed) + cost - 1 < limit for elapsed.
+            free_at = 1 - headroom / self.previous_count
+            return max(0.0, (free_at - self.elapsed) * self.duration)
+        return remaining
+
+
+class AnonRateThrottle(SlidingWindowRateThrottle, throttling.AnonRateThrottle):
+    """
+    Limits the rate of API calls by anonymous users, keyed by client IP.
+    Scope: anon (100 requests/hour)
+    """
+
+
+class UserRateThrottle(SlidingWindowRateThrottle, throttling.UserRateThrottle):
+    """
+    Limits the rate of API calls by a given user (or IP when anonymous).
+    Scope: user (1000 requests/hour)
+    """
 
 
 class AdminExemptUserRateThrottle(UserRateThrottle):
@@ -17,27 +123,86 @@ class AdminExemptUserRateThrottle(UserRateThrottle):
     and administrative purposes.
     """
 
-    def allow_request(self, request, view):
+    def is_exempt(self, request):
         """
-        Check if the request should be allowed.
+        Check if the request bypasses throttling.
         
         Admin and staff users bypass all throttling. Regular users are subject
         to the configured rate limits.
         
         Args:
             request: The incoming HTTP request
-            view: The view being accessed
             
         Returns:
-            bool: True if request is allowed, False if throttled
+            bool: True if the user is staff or a superuser
         """
-        # Exempt authenticated staff and superusers from all throttling
-        if request.user and request.user.is_authenticated:
-            if request.user.is_staff or request.user.is_superuser:
-                return True
-        
-        # Apply normal throttling for non-admin users
-        return super().allow_request(request, view)
+        user = request.user
+        return bool(
+            user and user.is_authenticated and (user.is_staff or user.is_superuser)
+        )
+
+
+def count_batch_operations(data, actions=None):
+    """
+    Count the operations in a batch request body (``{"operations": [...]}``),
+    optionally only those whose ``action`` is in ``actions``. A malformed body
+    counts as a single request; an oversized one counts as the largest batch
+    accepted, since it is rejected without being applied.
+    """
+    operations = data.get("operations") if hasattr(data, "get") else None
+    if not isinstance(operations, list) or not operations:
+        return 1
+    if actions is not None:
+        operations = [
+            op for op in operations if isinstance(op, dict) and op.get("action") in actions
+        ]
+    return min(len(operations), getattr(settings, "API_BATCH_MAX_OPERATIONS", 100))
+
+
+class BatchedThrottleMixin:
+    """
+    View mixin that evaluates all applicable throttles in one cache round trip.
+
+    The counters of every sliding-window throttle returned by
+    ``get_throttles()`` are read with a single ``cache.get_many``; hits are
+    recorded only when every scope allows the request. Other throttle classes
+    fall back to their own ``allow_request``.
+
+    Views that accept batches override ``get_throttle_cost()`` so that each
+    item counts as one request against the scopes it touches.
+    """
+
+    def get_throttle_cost(self, request, throttle):
+        """Return how many hits ``request`` counts for under ``throttle``."""
+        return 1
+
+    def check_throttles(self, request):
+        throttles = self.get_throttles()
+        durations = []
+
+        sliding = []
+        keys = []
+        for throttle in throttles:
+            if isinstance(throttle, SlidingWindowRateThrottle):
+                cost = self.get_throttle_cost(request, throttle)
+                throttle_keys = throttle.prepare(request, self) if cost else None
+                if throttle_keys is not None:
+                    sliding.append((throttle, cost))
+                    keys.extend(throttle_keys)
+            elif not throttle.allow_request(request, self):
+                durations.append(throttle.wait())
+
+        if sliding:
+            counters = sliding[0][0].cache.get_many(keys)
+            denied = [t for t, cost in sliding if not t.evaluate(counters, cost)]
+            durations.extend(t.wait() for t in denied)
+            if not durations:
+                for throttle, cost in sliding:
+                    throttle.record(cost)
+
+        if durations:
+            durations = [duration for duration in durations if duration is not None]
+            self.throttled(request, max(durations, default=None))
 
 
 # ============================================================================
@@ -1,17 +1,17 @@
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView, TokenVerifyView
-from apps.core.api.throttles import AuthLoginThrottle, TokenRefreshThrottle, TokenVerifyThrottle
+from apps.core.api.throttles import BatchedThrottleMixin, AuthLoginThrottle, TokenRefreshThrottle, TokenVerifyThrottle
 
 
-class QwitterTokenObtainPairView(TokenObtainPairView):
+class QwitterTokenObtainPairView(BatchedThrottleMixin, TokenObtainPairView):
     """Obtain JWT access and refresh tokens."""
     throttle_classes = [AuthLoginThrottle]
 
 
-class QwitterTokenRefreshView(TokenRefreshView):
+class QwitterTokenRefreshView(BatchedThrottleMixin, TokenRefreshView):
     """Refresh JWT access token."""
     throttle_classes = [TokenRefreshThrottle]
 
 
-class QwitterTokenVerifyView(TokenVerifyView):
+class QwitterTokenVerifyView(BatchedThrottleMixin, TokenVerifyView):
     """Verify JWT token validity."""
     throttle_classes = [TokenVerifyThrottle]
@@ -0,0 +1,256 @@
+"""
+SQLite-backed cache shared by every worker process on a host.
+
+``LocMemCache`` keeps one store per process, so with N gunicorn workers each
+throttle effectively allows N times its rate and nothing cached is shared.
+This backend keeps entries in a single SQLite file in WAL mode instead:
+readers never block writers, every process sees the same data and ``incr``
+is a single atomic ``UPDATE``. It needs no external service.
+
+    CACHES = {
+        "default": {
+            "BACKEND": "apps.core.cache.SQLiteCache",
+            "LOCATION": "/var/tmp/qwitter-cache.sqlite3",
+        }
+    }
+
+Connections are opened per thread and per process (a forked worker never
+reuses its parent's handle). Integers are stored as SQL integers so they can
+be incremented in place; every other value is pickled.
+
+Like Django's database cache, the table is culled once it holds more than
+``OPTIONS["MAX_ENTRIES"]`` entries. ``MAX_ENTRIES: None`` only ever removes
+expired entries, for data that must not be evicted early (throttle counters).
+"""
+
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL
+) WITHOUT ROWID
+"""
+
+# Chance that a write also removes expired entries and culls the table.
+CULL_PROBABILITY = 0.01
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        options = params.get("OPTIONS", {})
+        unbounded = "MAX_ENTRIES" in options and options["MAX_ENTRIES"] is None
+        if unbounded:
+            options = {k: v for k, v in options.items() if k != "MAX_ENTRIES"}
+            params = {**params, "OPTIONS": options}
+        super().__init__(params)
+        if unbounded:
+            self._max_entries = None
+        self._path = os.path.abspath(location)
+        self._busy_timeout = options.get("BUSY_TIMEOUT", 5.0)
+        self._local = threading.local()
+
+    # ------------------------------------------------------------------
+    # Connections
+    # ------------------------------------------------------------------
+
+    @property
+    def _conn(self):
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            local.pid = os.getpid()
+            local.conn = self._connect()
+        return local.conn
+
+    def _connect(self):
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(
+            self._path,
+            timeout=self._busy_timeout,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(SCHEMA)
+        return conn
+
+    def close(self, **kwargs):
+        # Connections are cheap to keep and are reused across requests.
+        pass
+
+    # ------------------------------------------------------------------
+    # Serialization
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _encode(value):
+        if type(value) is int and -(2**63) <= value < 2**63:
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _decode(value):
+        if isinstance(value, int):
+            return value
+        return pickle.loads(value)
+
+    def _expires(self, timeout):
+        return self.get_backend_timeout(timeout)
+
+    # ------------------------------------------------------------------
+    # Cache API
+    # ------------------------------------------------------------------
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._conn.execute(
+            "SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return default if row is None else self._decode(row[0])
+
+    def get_many(self, keys, version=None):
+        key_map = {
+            self.make_and_validate_key(key, version=version): key for key in keys
+        }
+        if not key_map:
+            return {}
+        placeholders = ",".join("?" * len(key_map))
+        rows = self._conn.execute(
+            f"SELECT key, value FROM cache WHERE key IN ({placeholders}) "
+            "AND (expires IS NULL OR expires > ?)",
+            (*key_map, time.time()),
+        )
+        return {key_map[key]: self._decode(value) for key, value in rows}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+            (key, self._encode(value), self._expires(timeout)),
+        )
+        self._maybe_cull()
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self._expires(timeout)
+        rows = [
+            (
+                self.make_and_validate_key(key, version=version),
+                self._encode(value),
+                expires,
+            )
+            for key, value in data.items()
+        ]
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                rows,
+            )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        self._maybe_cull()
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        # Replace the row only if it is missing or expired, in one statement.
+        cursor = self._conn.execute(
+            "INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, "
+            "expires = excluded.expires "
+            "WHERE cache.expires IS NOT NULL AND cache.expires <= ?",
+            (key, self._encode(value), self._expires(timeout), time.time()),
+        )
+        return cursor.rowcount > 0
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._conn.execute(
+            "UPDATE cache SET expires = ? WHERE key = ? "
+            "AND (expires IS NULL OR expires > ?)",
+            (self._expires(timeout), key, time.time()),
+        )
+        return cursor.rowcount > 0
+
+    def incr(self, key, delta=1, version=None):
+        cache_key = self.make_and_validate_key(key, version=version)
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.execute(
+                "UPDATE cache SET value = value + ? WHERE key = ? "
+                "AND typeof(value) = 'integer' AND (expires IS NULL OR expires > ?)",
+                (delta, cache_key, time.time()),
+            )
+            if cursor.rowcount:
+                value = conn.execute(
+                    "SELECT value FROM cache WHERE key = ?", (cache_key,)
+                ).fetchone()[0]
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        if not cursor.rowcount:
+            raise ValueError("Key '%s' not found or not an integer." % key)
+        return value
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._conn.execute(
+            "SELECT 1 FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return row is not None
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+        return cursor.rowcount > 0
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        if keys:
+            placeholders = ",".join("?" * len(keys))
+            self._conn.execute(f"DELETE FROM cache WHERE key IN ({placeholders})", keys)
+
+    def clear(self):
+        self._conn.execute("DELETE FROM cache")
+
+    # ------------------------------------------------------------------
+    # Culling
+    # ------------------------------------------------------------------
+
+    def _maybe_cull(self):
+        if random.random() < CULL_PROBABILITY:
+            self._cull()
+
+    def _cull(self):
+        conn = self._conn
+        conn.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),))
+        if self._max_entries is None:
+            return
+        count = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        if count > self._max_entries:
+            # Same policy as Django's database cache: drop 1/CULL_FREQUENCY
+            # of the entries, soonest to expire first.
+            excess = count // self._cull_frequency if self._cull_frequency else count
+            conn.execute(
+                "DELETE FROM cache WHERE key IN ("
+                "SELECT key FROM cache ORDER BY expires IS NULL, expires LIMIT ?)",
+                (excess,),
+            )
@@ -0,0 +1,64 @@
+"""
+Conditional GET support for HTML pages.
+
+Pages include the navbar, suggestions and the viewer's interaction state
+besides their main content, so their ETags are built from the content
+and viewer versions (see ``apps.core.versions``) and the requested URL
+alone, without touching the database. Pages with pending flash messages are
+always rendered, so the messages are shown and consumed. No
+``Last-Modified`` is sent (see ``apps.core.api.conditional``).
+
+``conditional_page`` works on both sync and async views.
+
+    @login_required
+    @conditional_page
+    def following(request): ...
+"""
+
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib.messages import get_messages
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from apps.core.aio import aresolve_user
+from apps.core.versions import get_versions, make_etag
+
+
+def request_versions(request):
+    """
+    Return the ``(content, viewer)`` versions of a page request, read once per
+    request, or None when flash messages are pending and the page must be
+    rendered.
+    """
+    if not hasattr(request, "_page_versions"):
+        pending = len(get_messages(request))
+        request._page_versions = None if pending else get_versions(request.user)
+    return request._page_versions
+
+
+def page_etag(request, *args, **kwargs):
+    versions = request_versions(request)
+    if versions is None:
+        return None
+    return make_etag(request.get_full_path(), request.user.pk, *versions)
+
+
+def conditional_page(view):
+    """Answer conditional GETs of ``view`` with 304 while nothing has changed."""
+    decorated = cache_control(private=True, no_cache=True)(
+        condition(etag_func=page_etag)(view)
+    )
+    if not iscoroutinefunction(view):
+        return decorated
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        # The validators run synchronously; load the user, session and
+        # messages they need off the event loop first.
+        await aresolve_user(request)
+        await sync_to_async(request_versions)(request)
+        return await decorated(request, *args, **kwargs)
+
+    return wrapper
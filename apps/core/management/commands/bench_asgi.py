@@ -0,0 +1,273 @@
+import http.client
+import importlib.util
+import os
+import subprocess
+import sys
+import threading
+import time
+from importlib import import_module
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.accounts.models import User
+from apps.feed.models import Post
+
+DEFAULT_PATHS = "/feed/,/feed/following/,/feed/posts/{post}/,/profile/{username}/"
+
+
+def _children(pid):
+    found = []
+    for stat in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            fields = stat.read_text().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        if int(fields[1]) == pid:
+            child = int(stat.parent.name)
+            found += [child, *_children(child)]
+    return found
+
+
+def _rss(pids):
+    """Resident memory of ``pids`` in bytes, read from /proc."""
+    total = 0
+    for pid in pids:
+        try:
+            for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+                if line.startswith("VmRSS:"):
+                    total += int(line.split()[1]) * 1024
+        except OSError:
+            continue
+    return total
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0
+
+
+class Server:
+    """A server process started for one benchmark run."""
+
+    def __init__(self, argv, port, env):
+        self.port = port
+        self.process = subprocess.Popen(
+            argv,
+            env={**os.environ, **env},
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def wait_ready(self, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise CommandError(
+                    f"Server exited with code {self.process.returncode}."
+                )
+            try:
+                connection = http.client.HTTPConnection(
+                    "127.0.0.1", self.port, timeout=1
+                )
+                connection.request("GET", "/feed/")
+                connection.getresponse().read()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError("Server did not start in time.")
+
+    def rss(self):
+        return _rss([self.process.pid, *_children(self.process.pid)])
+
+    def workers(self):
+        return len(_children(self.process.pid))
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+def _load(port, paths, headers, concurrency, duration):
+    """Request ``paths`` round-robin from ``concurrency`` keep-alive clients."""
+    latencies, errors = [], []
+    stop = time.monotonic() + duration
+
+    def client(offset):
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        i = offset
+        while time.monotonic() < stop:
+            path = paths[i % len(paths)]
+            i += 1
+            began = time.perf_counter()
+            try:
+                connection.request("GET", path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    errors.append(response.status)
+                    continue
+            except (OSError, http.client.HTTPException):
+                errors.append(None)
+                connection.close()
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                continue
+            latencies.append(time.perf_counter() - began)
+        connection.close()
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - began
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the sync views under gunicorn with the async views under "
+        "uvicorn, at equal total worker memory, by load-testing the hot read "
+        "pages of a running copy of the project. The async views also run "
+        "with DATABASE_CONN_MAX_AGE=0, to show the effect of connection reuse."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="gunicorn sync workers; uvicorn gets as many as fit in the "
+            "same memory (default: 4).",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=32,
+            help="Concurrent keep-alive clients (default: 32).",
+        )
+        parser.add_argument(
+            "--duration",
+            type=float,
+            default=15,
+            help="Seconds of load per server (default: 15).",
+        )
+        parser.add_argument(
+            "--paths",
+            default=DEFAULT_PATHS,
+            help="Comma-separated paths to request; {post} and {username} are "
+            "filled in from the newest post (default: %(default)s).",
+        )
+        parser.add_argument(
+            "--username",
+            help="Send requests logged in as this user, so pages are rendered "
+            "rather than served from the anonymous page cache "
+            "(default: the newest post's author).",
+        )
+        parser.add_argument(
+            "--port", type=int, default=8765, help="Port to serve on (default: 8765)."
+        )
+
+    def handle(self, *args, **options):
+        for module in ("gunicorn", "uvicorn"):
+            if importlib.util.find_spec(module) is None:
+                raise CommandError(f"{module} is not installed.")
+
+        post = Post.objects.select_related("author").order_by("-pk").first()
+        if post is None:
+            raise CommandError("No posts to benchmark; create some data first.")
+        username = options["username"] or post.author.username
+        try:
+            user = User.objects.get(username=username.lower())
+        except User.DoesNotExist:
+            raise CommandError(f"User {username!r} does not exist.")
+
+        paths = [
+            path.format(post=post.pk, username=post.author.username)
+            for path in options["paths"].split(",")
+        ]
+        headers = {"Cookie": f"{settings.SESSION_COOKIE_NAME}={self._session(user)}"}
+        port = options["port"]
+
+        wsgi = f"-m gunicorn qwitter.wsgi --bind 127.0.0.1:{port} --workers"
+        asgi = f"-m uvicorn qwitter.asgi:application --port {port} --no-access-log"
+        wsgi = [sys.executable, *wsgi.split()]
+        asgi = [sys.executable, *asgi.split(), "--workers"]
+
+        memory = self._run(
+            "gunicorn (sync)",
+            [*wsgi, str(options["workers"])],
+            {"DJANGO_ASYNC_VIEWS": "0"},
+            paths,
+            headers,
+            options,
+        )
+
+        # Give uvicorn as many workers as fit in the memory gunicorn used,
+        # keeping one worker's worth for its supervisor process.
+        probe = Server([*asgi, "1"], port, {"DJANGO_ASYNC_VIEWS": "1"})
+        try:
+            probe.wait_ready()
+            _load(port, paths, headers, 4, 2)
+            per_worker = probe.rss()
+        finally:
+            probe.stop()
+        workers = max(1, int(memory // per_worker) - 1)
+
+        self._run(
+            "uvicorn (async)",
+            [*asgi, str(workers)],
+            {"DJANGO_ASYNC_VIEWS": "1"},
+            paths,
+            headers,
+            options,
+        )
+        # The same again with a new database connection per query batch, to
+        # show what reusing the gather() threads' connections saves.
+        self._run(
+            "uvicorn, no reuse",
+            [*asgi, str(workers)],
+            {"DJANGO_ASYNC_VIEWS": "1", "DATABASE_CONN_MAX_AGE": "0"},
+            paths,
+            headers,
+            options,
+        )
+
+    def _session(self, user):
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        return session.session_key
+
+    def _run(self, name, argv, env, paths, headers, options):
+        """Benchmark one server; return its total resident memory."""
+        server = Server(argv, options["port"], env)
+        try:
+            server.wait_ready()
+            _load(options["port"], paths, headers, options["concurrency"], 2)
+            latencies, errors, elapsed = _load(
+                options["port"],
+                paths,
+                headers,
+                options["concurrency"],
+                options["duration"],
+            )
+            rss, workers = server.rss(), server.workers()
+        finally:
+            server.stop()
+
+        self.stdout.write(
+            f"{name + ':':<19}{workers:>3} workers, {rss / 2**20:>7,.1f} MiB, "
+            f"{len(latencies) / elapsed:>8,.1f} req/s, "
+            f"p50 {_percentile(latencies, 0.5) * 1000:>7,.1f} ms, "
+            f"p99 {_percentile(latencies, 0.99) * 1000:>7,.1f} ms, "
+            f"{len(errors)} errors"
+        )
+        return rss
@@ -0,0 +1,109 @@
+import multiprocessing
+import time
+import uuid
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+
+
+def _worker(alias, prefix, operations, keyspace, start, results):
+    import django
+
+    django.setup()
+    cache = caches[alias]
+    start.wait()
+
+    began = time.perf_counter()
+    for i in range(operations):
+        key = f"{prefix}:{i % keyspace}"
+        step = i % 4
+        if step == 0:
+            cache.set(key, {"i": i, "payload": "x" * 64}, 60)
+        elif step == 1:
+            cache.get(key)
+        elif step == 2:
+            cache.add(f"{key}:lock", 1, 1)
+        else:
+            cache.incr(f"{prefix}:counter")
+    results.put(time.perf_counter() - began)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure cache throughput (ops/sec) with several processes sharing the "
+        "configured cache, and check that concurrent incr() loses no updates."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--alias", default="default", help="Cache alias to benchmark."
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Number of concurrent processes (default: 4).",
+        )
+        parser.add_argument(
+            "--operations",
+            type=int,
+            default=20000,
+            help="Operations per worker, a mix of set/get/add/incr (default: 20000).",
+        )
+        parser.add_argument(
+            "--keyspace",
+            type=int,
+            default=1000,
+            help="Number of distinct keys per run (default: 1000).",
+        )
+
+    def handle(self, *args, **options):
+        alias = options["alias"]
+        workers = options["workers"]
+        operations = options["operations"]
+        cache = caches[alias]
+        prefix = f"bench:{uuid.uuid4().hex}"
+        cache.set(f"{prefix}:counter", 0, None)
+
+        start = multiprocessing.Event()
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(
+                target=_worker,
+                args=(alias, prefix, operations, options["keyspace"], start, results),
+            )
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+
+        began = time.perf_counter()
+        start.set()
+        durations = [results.get() for _ in processes]
+        wall = time.perf_counter() - began
+        for process in processes:
+            process.join()
+
+        total = workers * operations
+        expected = sum(1 for i in range(operations) if i % 4 == 3) * workers
+        counter = cache.get(f"{prefix}:counter")
+        cache.delete(f"{prefix}:counter")
+
+        self.stdout.write(f"Backend:    {type(cache).__module__}.{type(cache).__name__}")
+        self.stdout.write(f"Workers:    {workers} x {operations} ops")
+        self.stdout.write(f"Throughput: {total / wall:,.0f} ops/sec overall")
+        self.stdout.write(
+            f"Per worker: {operations / max(durations):,.0f} - "
+            f"{operations / min(durations):,.0f} ops/sec"
+        )
+        if counter == expected:
+            self.stdout.write(
+                self.style.SUCCESS(f"incr() is consistent: {counter} == {expected}")
+            )
+        else:
+            self.stdout.write(
+                self.style.ERROR(
+                    f"incr() lost updates: {counter} != {expected}. "
+                    "This backend is not shared across processes."
+                )
+            )
@@ -0,0 +1,177 @@
+import time
+import tracemalloc
+from datetime import timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+
+from apps.core.api import renderers
+from apps.core.api.renderers import FastJSONRenderer
+from apps.core.api.streaming import iter_json_array
+
+
+def _post(i, now):
+    """
+    A post as the serializers hand it to the renderer: dates are already
+    strings, so orjson's native types cover everything.
+    """
+    return {
+        "id": i,
+        "author": {
+            "username": f"user{i % 97}",
+            "name": f"Üser {i % 97}",
+            "avatar": f"https://example.com/avatars/{i % 97}.png",
+        },
+        "body": f"post number {i} — with some unicode ✓",
+        "type": "original",
+        "created_date": (now - timedelta(seconds=i)).isoformat()[:-6] + "Z",
+        "parent": None,
+        "is_pinned": i % 50 == 0,
+        "reactions_count": i * 3,
+        "comments_count": i % 13,
+        "reposts_count": i % 5,
+        "quotes_count": 0,
+        "is_liked": i % 2 == 0,
+        "is_reposted": False,
+        "is_bookmarked": i % 3 == 0,
+    }
+
+
+def _special(i, now):
+    """Values that go through DRF's JSONEncoder."""
+    return {
+        "date": now - timedelta(seconds=i, microseconds=i),
+        "day": (now - timedelta(days=i)).date(),
+        "decimal": Decimal(i) / 7,
+        "lazy": gettext_lazy("original"),
+        "separators": "line\u2028paragraph\u2029",
+        i: "non-string key",
+    }
+
+
+def _user(i, now):
+    """A row of the admin user list."""
+    return {
+        "username": f"user{i}",
+        "name": f"User {i}",
+        "avatar": f"https://ui-avatars.com/api/?name=U{i}&background=random&bold=true",
+        "is_active": True,
+        "email": f"user{i}@example.com",
+        "date_joined": now - timedelta(minutes=i),
+        "is_staff": False,
+    }
+
+
+def _rows(count, now):
+    return (_user(i, now) for i in range(count))
+
+
+def _chunks(rows, size):
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+def _best(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        began = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - began)
+    return best
+
+
+def _traced(func):
+    """Run ``func`` under tracemalloc; return (seconds to first byte, total, peak)."""
+    tracemalloc.start()
+    began = time.perf_counter()
+    first = None
+    for part in func():
+        if first is None and len(part) > 1:
+            first = time.perf_counter() - began
+        del part
+    total = time.perf_counter() - began
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first or total, total, peak
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the throughput of FastJSONRenderer with DRF's JSONRenderer, "
+        "and the memory and time to first byte of streamed vs buffered lists."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--items",
+            type=int,
+            default=1000,
+            help="Posts per rendered response (default: 1000).",
+        )
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=100_000,
+            help="Rows in the streamed list (default: 100000).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Rows per streamed chunk (default: 500).",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Timed runs per renderer; the best is reported (default: 5).",
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        payload = [_post(i, now) for i in range(options["items"])]
+        stdlib, fast = JSONRenderer(), FastJSONRenderer()
+
+        special = [_special(i, now) for i in range(100)]
+        for data in (payload, special):
+            if fast.render(data) != stdlib.render(data):
+                raise CommandError(
+                    "FastJSONRenderer output differs from JSONRenderer."
+                )
+        backend = "orjson" if renderers.orjson is not None else "stdlib fallback"
+        self.stdout.write(f"Parity:    identical output ({backend})")
+
+        expected = stdlib.render(payload)
+
+        megabytes = len(expected) / 2**20
+        for name, renderer in (("stdlib", stdlib), ("fast", fast)):
+            best = _best(lambda: renderer.render(payload), options["repeat"])
+            self.stdout.write(
+                f"{name + ':':<11}{1 / best:>9,.0f} responses/sec "
+                f"{megabytes / best:>8,.1f} MiB/s "
+                f"({best * 1000:.2f} ms per {megabytes * 1024:,.0f} KiB)"
+            )
+
+        rows, size = options["rows"], options["chunk_size"]
+
+        def buffered():
+            yield fast.render(list(_rows(rows, now)))
+
+        def streamed():
+            return iter_json_array(_chunks(_rows(rows, now), size), fast)
+
+        if b"".join(buffered()) != b"".join(streamed()):
+            raise CommandError("Streamed output differs from the buffered response.")
+
+        self.stdout.write("")
+        self.stdout.write(f"List of {rows:,} rows, streamed in chunks of {size:,}:")
+        for name, func in (("buffered", buffered), ("streamed", streamed)):
+            first, total, peak = _traced(func)
+            self.stdout.write(
+                f"{name + ':':<11}first byte {first * 1000:>8,.1f} ms, "
+                f"total {total * 1000:>8,.1f} ms, peak memory {peak / 2**20:>7,.1f} MiB"
+            )
@@ -0,0 +1,192 @@
+"""
+Shared cache of fully rendered pages for anonymous visitors.
+
+Logged-out visitors all get the same HTML for a page: viewer flags are
+constants and there is no per-user state. ``cache_anonymous_page`` stores
+that HTML in the shared cache under the request path (page and cursor
+included) and the version of the page's scope (see ``apps.core.versions``),
+so a write only invalidates the pages it shows on:
+
+- ``FEED_PAGES``, the global feed: new posts;
+- ``POST_PAGES``, a post and its comments: new, edited or deleted comments;
+- ``USER_PAGES``, a profile: the user's new posts, follows and unfollows.
+
+    @cache_anonymous_page(POST_PAGES)
+    def post(request, post_id): ...
+
+Edits and deletes of posts and profile changes can show on any page (as a
+quoted post, a comment's author ...), so they bump every scope at once.
+Engagement counter changes (likes, comments, reposts, quotes) bump the
+feed, the post's own page and its author's profile. A post shown anywhere
+else, such as a repost on another user's profile, keeps its counters for
+up to ``ANONYMOUS_PAGE_CACHE_TIMEOUT`` seconds; open pages get them live
+(see ``apps.feed.live``).
+
+Concurrent misses for the same page are coalesced: the first request takes
+a lock with ``cache.add()`` and renders, the others poll the cache until the
+page appears or the lock is released, and render themselves only if it
+never does.
+
+Authenticated requests, non-GET requests and requests with pending flash
+messages always bypass the cache. The CSRF token embedded in the page is
+swapped for the visitor's own token on every hit. Async views are
+supported and wait for concurrent renders without blocking the event loop.
+"""
+
+import asyncio
+import re
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.cache import patch_vary_headers
+
+from apps.core.aio import aresolve_user
+from apps.core.conditional import request_versions
+from apps.core.versions import get_page_versions, make_etag
+
+CACHE_PREFIX = "page"
+
+# Page scopes, formatted with the view's URL arguments.
+FEED_PAGES = "feed"
+POST_PAGES = "post:{post_id}"
+USER_PAGES = "user:{username}"
+CSRF_PLACEHOLDER = "__csrf_token__"
+CSRF_INPUT = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+LOCK_TIMEOUT = 10
+POLL_INTERVAL = 0.05
+
+
+def _store(key, response):
+    """Cache a successful HTML response, with its CSRF token taken out."""
+    if response.status_code != 200 or response.streaming or response.cookies:
+        return
+    html = response.content.decode(response.charset)
+    match = CSRF_INPUT.search(html)
+    if match:
+        html = html.replace(match.group(1), CSRF_PLACEHOLDER)
+    cache.set(
+        key,
+        (response["Content-Type"], html),
+        getattr(settings, "ANONYMOUS_PAGE_CACHE_TIMEOUT", 300),
+    )
+
+
+def _load(request, cached):
+    content_type, html = cached
+    if CSRF_PLACEHOLDER in html:
+        html = html.replace(CSRF_PLACEHOLDER, get_token(request))
+    return HttpResponse(html, content_type=content_type)
+
+
+def _cache_key(request, scope):
+    """Return the cache key of an anonymous page request, or None to bypass."""
+    if request.method not in ("GET", "HEAD") or request.user.is_authenticated:
+        return None
+    # Pages with pending flash messages are always rendered.
+    if request_versions(request) is None:
+        return None
+    versions = get_page_versions(scope)
+    return f"{CACHE_PREFIX}:{make_etag(request.get_full_path(), *versions)}"
+
+
+def _claim(key):
+    """
+    Return ``(cached, locked)``: the cached page if any, else whether this
+    request took the render lock.
+    """
+    cached = cache.get(key)
+    return cached, cached is None and cache.add(f"{key}:lock", 1, LOCK_TIMEOUT)
+
+
+def _poll(key):
+    """Return ``(cached, done)`` while waiting for another request's render."""
+    cached = cache.get(key)
+    return cached, cached is not None or cache.get(f"{key}:lock") is None
+
+
+def _release(key, locked):
+    if locked:
+        cache.delete(f"{key}:lock")
+
+
+def cache_anonymous_page(scope):
+    """
+    Serve the decorated view to anonymous visitors from the shared page
+    cache, invalidated with the pages of ``scope``.
+    """
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            return _async_cache_anonymous_page(view, scope)
+        return _cache_anonymous_page(view, scope)
+
+    return decorator
+
+
+def _cache_anonymous_page(view, scope):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = _cache_key(request, scope.format(**kwargs).lower())
+        if key is None:
+            return view(request, *args, **kwargs)
+
+        cached, locked = _claim(key)
+        if cached is None and not locked:
+            # Another worker is rendering this page; wait for it.
+            deadline = time.monotonic() + LOCK_TIMEOUT
+            done = False
+            while not done and time.monotonic() < deadline:
+                time.sleep(POLL_INTERVAL)
+                cached, done = _poll(key)
+
+        if cached is not None:
+            response = _load(request, cached)
+        else:
+            try:
+                response = view(request, *args, **kwargs)
+                _store(key, response)
+            finally:
+                _release(key, locked)
+
+        patch_vary_headers(response, ("Cookie",))
+        return response
+
+    return wrapper
+
+
+def _async_cache_anonymous_page(view, scope):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        await aresolve_user(request)
+        key = await sync_to_async(_cache_key)(request, scope.format(**kwargs).lower())
+        if key is None:
+            return await view(request, *args, **kwargs)
+
+        cached, locked = await sync_to_async(_claim)(key)
+        if cached is None and not locked:
+            deadline = time.monotonic() + LOCK_TIMEOUT
+            done = False
+            while not done and time.monotonic() < deadline:
+                await asyncio.sleep(POLL_INTERVAL)
+                cached, done = await sync_to_async(_poll)(key)
+
+        if cached is not None:
+            response = _load(request, cached)
+        else:
+            try:
+                response = await view(request, *args, **kwargs)
+                await sync_to_async(_store)(key, response)
+            finally:
+                await sync_to_async(_release)(key, locked)
+
+        patch_vary_headers(response, ("Cookie",))
+        return response
+
+    return wrapper
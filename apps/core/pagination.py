@@ -0,0 +1,208 @@
+"""
+Keyset (cursor) pagination shared by the web views and the API.
+
+Pages are selected with ``WHERE (k1, k2, ..., pk) < (v1, v2, ..., id)``
+comparisons over the queryset's own ``order_by`` keys instead of
+``COUNT(*)`` + ``OFFSET``, so deep pages cost the same as the first one and
+pages do not shift when new rows arrive. Cursors are opaque, URL-safe tokens.
+
+Ordering keys must be plain (optionally ``-`` prefixed) field paths on
+non-nullable columns; the primary key is appended as a tie-breaker.
+"""
+
+import base64
+import datetime
+import json
+from collections.abc import Sequence
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+
+KEY_PREFIX = "_keyset_"
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """JSON encoder that keeps full microsecond precision for temporal keys."""
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.date, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor token cannot be decoded for the given ordering."""
+
+
+class KeysetPage(Sequence):
+    """A single page of results, iterable like a Django ``Page``."""
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f"<KeysetPage: {len(self.object_list)} items>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        return self.paginator.encode_cursor(self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        return self.paginator.encode_cursor(self.object_list[0], reverse=True)
+
+
+class KeysetPaginator:
+    """
+    Paginate an ordered queryset by the values of its ordering keys.
+
+    Example:
+        page = KeysetPaginator(Post.objects.order_by("-created_date")).page(cursor)
+    """
+
+    def __init__(self, queryset, per_page=10):
+        self.per_page = per_page
+        self.ordering = self._get_ordering(queryset)
+        self.queryset = queryset.annotate(
+            **{
+                f"{KEY_PREFIX}{index}": F(path)
+                for index, (path, _descending) in enumerate(self.ordering)
+            }
+        ).order_by(*self._order_by(reverse=False))
+
+    @staticmethod
+    def _get_ordering(queryset):
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        keys = []
+        for item in ordering:
+            if not isinstance(item, str) or item == "?":
+                raise ValueError(
+                    "Keyset pagination requires field-name ordering, got %r." % item
+                )
+            descending = item.startswith("-")
+            keys.append((item.lstrip("-+"), descending))
+
+        pk_names = {"pk", queryset.model._meta.pk.name}
+        if not keys or keys[-1][0] not in pk_names:
+            keys.append(("pk", keys[-1][1] if keys else True))
+        return keys
+
+    def _order_by(self, reverse):
+        return [
+            f"-{path}" if descending != reverse else path
+            for path, descending in self.ordering
+        ]
+
+    def _after(self, values, reverse):
+        """Build the lexicographic "comes after ``values``" condition."""
+        condition = Q()
+        for index, (_path, descending) in enumerate(self.ordering):
+            lookup = "lt" if descending != reverse else "gt"
+            branch = Q(**{f"{KEY_PREFIX}{i}": values[i] for i in range(index)})
+            branch &= Q(**{f"{KEY_PREFIX}{index}__{lookup}": values[index]})
+            condition |= branch
+        return condition
+
+    # ------------------------------------------------------------------
+    # Cursor encoding
+    # ------------------------------------------------------------------
+
+    def encode_cursor(self, obj, reverse=False):
+        values = [
+            getattr(obj, f"{KEY_PREFIX}{index}") for index in range(len(self.ordering))
+        ]
+        payload = json.dumps({"v": values, "r": reverse}, cls=CursorEncoder)
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            values, reverse = payload["v"], bool(payload.get("r", False))
+            if len(values) != len(self.ordering):
+                raise InvalidCursor("Cursor does not match the ordering.")
+
+            annotations = self.queryset.query.annotations
+            return [
+                annotations[f"{KEY_PREFIX}{index}"].output_field.to_python(value)
+                for index, value in enumerate(values)
+            ], reverse
+        except InvalidCursor:
+            raise
+        except Exception as exc:
+            raise InvalidCursor("Invalid cursor.") from exc
+
+    # ------------------------------------------------------------------
+    # Pages
+    # ------------------------------------------------------------------
+
+    def _select(self, cursor):
+        """
+        Return the queryset of the page following (or preceding) ``cursor``,
+        with one extra row to detect more results, and the direction:
+        None for the first page, else whether the cursor points backwards.
+        """
+        if not cursor:
+            return self.queryset[: self.per_page + 1], None
+
+        values, reverse = self.decode_cursor(cursor)
+        queryset = self.queryset.filter(self._after(values, reverse))
+        if reverse:
+            queryset = queryset.order_by(*self._order_by(reverse=True))
+        return queryset[: self.per_page + 1], reverse
+
+    def _build(self, rows, reverse):
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if reverse is None:
+            return KeysetPage(rows, self, has_more, False)
+        if reverse:
+            rows.reverse()
+            return KeysetPage(rows, self, True, has_more)
+        return KeysetPage(rows, self, has_more, True)
+
+    def page(self, cursor=None):
+        """Return the page following (or preceding) ``cursor``; raises InvalidCursor."""
+        queryset, reverse = self._select(cursor)
+        return self._build(list(queryset), reverse)
+
+    async def apage(self, cursor=None):
+        """Async version of ``page()``, fetching rows with ``async for``."""
+        queryset, reverse = self._select(cursor)
+        return self._build([row async for row in queryset], reverse)
+
+    def get_page(self, cursor=None):
+        """Like ``page()``, but fall back to the first page on a bad cursor."""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
+
+    async def aget_page(self, cursor=None):
+        """Async version of ``get_page()``."""
+        try:
+            return await self.apage(cursor)
+        except InvalidCursor:
+            return await self.apage()
@@ -1,21 +1,27 @@
 from django import template
+from django.conf import settings
+from django.utils.html import json_script
+
+from apps.accounts.suggestions import get_suggestions
+from apps.feed.interactions import get_interaction_context, resolve_viewer_flags
+from apps.feed.models import Post
 
 register = template.Library()
 
 
 @register.filter
 def has_liked(user, post):
-    return user.is_authenticated and user.reactions.filter(post=post).exists()
+    return user.is_authenticated and get_interaction_context(user).has_liked(post)
 
 
 @register.filter
 def has_reposted(user, post):
-    return user.is_authenticated and user.posts.filter(parent=post, body="").exists()
+    return user.is_authenticated and get_interaction_context(user).has_reposted(post)
 
 
 @register.filter
 def has_bookmarked(user, post):
-    return user.is_authenticated and user.bookmarks.filter(post=post).exists()
+    return user.is_authenticated and get_interaction_context(user).has_bookmarked(post)
 
 
 @register.filter
@@ -25,4 +31,69 @@ def is_following(user, target_user):
     """
     if not user.is_authenticated or user == target_user:
         return False
-    return user.following.filter(followed=target_user).exists()
+    return get_interaction_context(user).is_following(target_user)
+
+
+@register.simple_tag
+def post_card_version(post):
+    """
+    Build the cache version of a post card from everything it renders that
+    can change: the post and the posts it embeds (edits, pins, counters) and
+    their authors' public profile fields.
+    """
+    parts = []
+    while post is not None and len(parts) < 3:
+        author = post.author
+        parts.append(
+            ":".join(
+                str(value)
+                for value in (
+                    post.pk,
+                    post.created_date.timestamp(),
+                    post.edited_date.timestamp(),
+                    int(post.is_pinned),
+                    *(getattr(post, field) for field in Post.COUNTER_FIELDS),
+                    author.username,
+                    author.name,
+                    author.image or "",
+                )
+            )
+        )
+        post = post.parent if post.parent_id else None
+    return "|".join(parts)
+
+
+@register.simple_tag
+def post_card_timeout():
+    return getattr(settings, "POST_CARD_CACHE_TIMEOUT", 60 * 60)
+
+
+@register.simple_tag(takes_context=True)
+def viewer_state(context, posts):
+    """
+    Render the current user's interactions with ``posts`` as a JSON script.
+    Post cards are cached for all users, so this state is applied client-side.
+    """
+    user = context.get("user")
+    if isinstance(posts, Post):
+        posts = [posts]
+
+    state = {"userId": None, "liked": [], "bookmarked": [], "reposted": []}
+    if user is not None and user.is_authenticated:
+        state["userId"] = user.pk
+        for post in resolve_viewer_flags(list(posts), user):
+            for key, flag in (
+                ("liked", "is_liked"),
+                ("bookmarked", "is_bookmarked"),
+                ("reposted", "is_reposted"),
+            ):
+                if getattr(post, flag) and post.pk not in state[key]:
+                    state[key].append(post.pk)
+    return json_script(state, "viewer-state")
+
+
+@register.inclusion_tag("components/suggestions.html", takes_context=True)
+def follow_suggestions(context, limit=5):
+    """Render the precomputed "who to follow" list for the current user."""
+    user = context.get("user")
+    return {"user": user, "suggestions": get_suggestions(user, limit)}
@@ -0,0 +1,58 @@
+"""
+Shared helpers for the apps' test modules.
+"""
+
+from django import test
+from django.core.cache import caches
+from django.test import override_settings
+
+from apps.accounts.models import User
+
+# Tests must not share (or clear) the development cache, which also holds
+# throttle counters and versions.
+TEST_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "throttle": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "throttle",
+    },
+}
+
+
+@override_settings(CACHES=TEST_CACHES, TIMELINE_FANOUT_ASYNC=False)
+class TestCase(test.TestCase):
+    """
+    ``TestCase`` with a private cache, emptied before every test, and
+    timeline fan-out run inline.
+
+    Subclasses can still stack their own ``override_settings`` on top.
+    """
+
+    def setUp(self):
+        super().setUp()
+        # Versions and cached lookups must not leak from one test to the next.
+        for cache in caches.all():
+            cache.clear()
+
+
+@override_settings(CACHES=TEST_CACHES, TIMELINE_FANOUT_ASYNC=False)
+class TransactionTestCase(test.TransactionTestCase):
+    """
+    ``TransactionTestCase`` with the same caches and fan-out as ``TestCase``,
+    for code that reads the database from other threads (e.g.
+    ``apps.core.aio.gather()``) and so only sees committed rows.
+    """
+
+    def setUp(self):
+        super().setUp()
+        for cache in caches.all():
+            cache.clear()
+
+
+def make_user(username):
+    return User.objects.create_user(
+        username=username,
+        email=f"{username}@example.com",
+        password="password",
+        name=username.title(),
+    )
@@ -0,0 +1,304 @@
+import multiprocessing
+import tempfile
+import threading
+import time
+from datetime import date, datetime, time as dt_time, timezone
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
+from uuid import UUID
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from apps.core.aio import gather
+from apps.core.api import renderers
+from apps.core.api.renderers import FastJSONRenderer
+from apps.core.api.streaming import iter_json_array
+from apps.core.api.throttles import (
+    BatchedThrottleMixin,
+    SlidingWindowRateThrottle,
+    count_batch_operations,
+)
+from apps.core.cache import SQLiteCache
+from apps.core.testing import TEST_CACHES
+
+
+def _increment(location, times):
+    cache = SQLiteCache(location, {})
+    for _ in range(times):
+        cache.incr("hits")
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.location = str(Path(directory.name) / "cache.sqlite3")
+        self.cache = self.make_cache()
+        # Only cull when a test asks for it.
+        patcher = mock.patch("apps.core.cache.CULL_PROBABILITY", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.location, {"OPTIONS": options})
+
+    def test_incr_is_atomic_across_processes(self):
+        self.cache.set("hits", 0)
+        context = multiprocessing.get_context("fork")
+        workers = [
+            context.Process(target=_increment, args=(self.location, 200))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual([worker.exitcode for worker in workers], [0] * 4)
+        self.assertEqual(self.cache.get("hits"), 800)
+
+    def test_values_expire(self):
+        now = time.time()
+        with mock.patch("time.time", return_value=now):
+            self.cache.set("counter", 1, 10)
+            self.cache.set("value", {"a": 1}, 10)
+            self.assertEqual(self.cache.incr("counter", 2), 3)
+            self.assertFalse(self.cache.add("counter", 5))
+
+        with mock.patch("time.time", return_value=now + 11):
+            self.assertIsNone(self.cache.get("value"))
+            self.assertEqual(self.cache.get_many(["counter", "value"]), {})
+            with self.assertRaises(ValueError):
+                self.cache.incr("counter")
+            self.assertTrue(self.cache.add("counter", 5, 10))
+            self.assertEqual(self.cache.get("counter"), 5)
+
+    def test_cull_drops_expired_then_soonest_to_expire(self):
+        cache = self.make_cache(MAX_ENTRIES=4, CULL_FREQUENCY=2)
+        now = time.time()
+        with mock.patch("time.time", return_value=now):
+            cache.set("expired", 1, 1)
+            cache.set_many({f"short{i}": i for i in range(3)}, 100)
+            cache.set_many({f"long{i}": i for i in range(3)}, 1000)
+            cache.set("forever", 1, None)
+
+        with mock.patch("time.time", return_value=now + 10):
+            cache._cull()
+            kept = cache.get_many(
+                ["expired", "forever"]
+                + [f"short{i}" for i in range(3)]
+                + [f"long{i}" for i in range(3)]
+            )
+        # 7 live entries over the limit of 4: cull 7 // 2, soonest to expire first.
+        self.assertEqual(sorted(kept), ["forever", "long0", "long1", "long2"])
+
+    def test_unbounded_cache_only_drops_expired(self):
+        cache = self.make_cache(MAX_ENTRIES=None)
+        now = time.time()
+        with mock.patch("time.time", return_value=now):
+            cache.set("expired", 1, 1)
+            cache.set_many({f"key{i}": i for i in range(400)}, 100)
+
+        with mock.patch("time.time", return_value=now + 10):
+            cache._cull()
+            self.assertEqual(len(cache.get_many([f"key{i}" for i in range(400)])), 400)
+            self.assertFalse(cache.has_key("expired"))
+
+
+class FakeClock:
+    now = 600.0  # The start of a one-minute window.
+
+    def __call__(self):
+        return self.now
+
+
+class LikeThrottle(SlidingWindowRateThrottle):
+    scope = "likes"
+    rate = "10/min"
+    timer = FakeClock()
+
+    def get_cache_key(self, request, view):
+        return f"throttle_{self.scope}"
+
+
+class BookmarkThrottle(LikeThrottle):
+    scope = "bookmarks"
+    rate = "3/min"
+
+
+class BatchView(BatchedThrottleMixin, APIView):
+    authentication_classes = []
+    permission_classes = []
+    throttle_classes = [LikeThrottle, BookmarkThrottle]
+    scopes = {LikeThrottle: ("like",), BookmarkThrottle: ("bookmark",)}
+
+    def get_throttle_cost(self, request, throttle):
+        return count_batch_operations(request.data, self.scopes[type(throttle)])
+
+    def post(self, request):
+        return Response({})
+
+
+@override_settings(CACHES=TEST_CACHES)
+class SlidingWindowThrottleTests(SimpleTestCase):
+    def setUp(self):
+        caches["throttle"].clear()
+        self.request = APIRequestFactory().get("/")
+
+    def at(self, now):
+        LikeThrottle.timer.now = now
+        self.addCleanup(setattr, LikeThrottle.timer, "now", FakeClock.now)
+
+    def allowed(self, count):
+        """Return how many of ``count`` requests pass a fresh throttle."""
+        return sum(
+            LikeThrottle().allow_request(self.request, None) for _ in range(count)
+        )
+
+    def test_previous_window_is_weighted_by_its_overlap(self):
+        self.at(600.0)
+        self.assertEqual(self.allowed(11), 10)
+
+        # A quarter into the next window, 10 * 0.75 of the limit is still used.
+        self.at(675.0)
+        self.assertEqual(self.allowed(5), 3)
+
+        # A window later, only the 3 hits of the previous one count (as 2.25).
+        self.at(735.0)
+        self.assertEqual(self.allowed(11), 8)
+
+    def test_wait(self):
+        self.at(600.0)
+        self.allowed(10)
+        throttle = LikeThrottle()
+        self.assertFalse(throttle.allow_request(self.request, None))
+        # Nothing to slide out yet: wait for the next window.
+        self.assertEqual(throttle.wait(), 60.0)
+
+        self.at(675.0)
+        self.allowed(3)
+        throttle = LikeThrottle()
+        self.assertFalse(throttle.allow_request(self.request, None))
+        # 3 + 10 * (1 - elapsed) < 10 once elapsed passes 0.3, i.e. at 678s.
+        self.assertAlmostEqual(throttle.wait(), 3.0)
+
+        self.at(678.1)
+        self.assertTrue(LikeThrottle().allow_request(self.request, None))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class BatchedThrottleTests(SimpleTestCase):
+    def setUp(self):
+        caches["throttle"].clear()
+        self.factory = APIRequestFactory()
+
+    def post(self, *actions):
+        operations = [{"action": action} for action in actions]
+        request = self.factory.post("/", {"operations": operations}, format="json")
+        return BatchView.as_view()(request).status_code
+
+    def counters(self):
+        cache = caches["throttle"]
+        return cache.get("throttle_likes:10", 0), cache.get("throttle_bookmarks:10", 0)
+
+    def test_scopes_are_read_in_one_round_trip(self):
+        cache = caches["throttle"]
+        with mock.patch.object(cache, "get_many", wraps=cache.get_many) as get_many:
+            self.assertEqual(self.post("like", "like", "bookmark"), 200)
+        get_many.assert_called_once()
+        self.assertEqual(len(get_many.call_args.args[0]), 4)
+        self.assertEqual(self.counters(), (2, 1))
+
+    def test_each_operation_counts_against_its_scope(self):
+        self.assertEqual(self.post("like"), 200)
+        # A scope without operations in the batch is neither checked nor charged.
+        self.assertEqual(self.counters(), (1, 0))
+
+        self.assertEqual(self.post("bookmark", "bookmark", "bookmark"), 200)
+        self.assertEqual(self.counters(), (1, 3))
+
+    def test_a_denied_scope_records_no_hits(self):
+        self.assertEqual(self.post("bookmark", "bookmark"), 200)
+        # Two more bookmarks do not fit; the like in the same batch is not counted.
+        self.assertEqual(self.post("like", "bookmark", "bookmark"), 429)
+        self.assertEqual(self.counters(), (0, 2))
+
+
+class CountBatchOperationsTests(SimpleTestCase):
+    def test_count(self):
+        operations = [{"action": "like"}, {"action": "bookmark"}, "junk"]
+        self.assertEqual(count_batch_operations({"operations": operations}), 3)
+        self.assertEqual(
+            count_batch_operations({"operations": operations}, ("like", "unlike")), 1
+        )
+        self.assertEqual(
+            count_batch_operations({"operations": operations}, ("follow",)), 0
+        )
+
+    def test_malformed_body_counts_once(self):
+        for data in ([], {}, {"operations": []}, {"operations": "like"}):
+            with self.subTest(data=data):
+                self.assertEqual(count_batch_operations(data), 1)
+
+    @override_settings(API_BATCH_MAX_OPERATIONS=5)
+    def test_oversized_batch_counts_as_the_largest_accepted(self):
+        data = {"operations": [{"action": "like"}] * 50}
+        self.assertEqual(count_batch_operations(data), 5)
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    data = {
+        "when": datetime(2024, 5, 17, 8, 30, 5, 123456, tzinfo=timezone.utc),
+        "naive": datetime(2024, 5, 17, 8, 30),
+        "day": date(2024, 5, 17),
+        "time": dt_time(8, 30, 5, 5000),
+        "price": Decimal("12.50"),
+        "id": UUID(int=42),
+        "label": gettext_lazy("Post not found."),
+        "text": "caf\u00e9 \U0001f600 line\u2028para\u2029 <script>",
+        "nested": [{1: None, "ok": True, "ratio": 0.1}, (), []],
+        "big": 2**70,
+    }
+
+    def test_output_matches_the_stdlib_renderer(self):
+        expected = JSONRenderer().render(self.data)
+        self.assertEqual(FastJSONRenderer().render(self.data), expected)
+        with mock.patch.object(renderers, "orjson", None):
+            self.assertEqual(FastJSONRenderer().render(self.data), expected)
+
+    def test_indented_output_uses_the_stdlib_renderer(self):
+        context = {"indent": 2}
+        self.assertEqual(
+            FastJSONRenderer().render(self.data, renderer_context=context),
+            JSONRenderer().render(self.data, renderer_context=context),
+        )
+
+
+class StreamingJSONTests(SimpleTestCase):
+    def test_chunks_are_joined_into_one_array(self):
+        def render(chunks):
+            return b"".join(iter_json_array(chunks))
+
+        self.assertEqual(render([]), b"[]")
+        self.assertEqual(render([[], []]), b"[]")
+        self.assertEqual(
+            render([[{"id": 1}], [], [{"id": 2}, "x"]]), b'[{"id":1},{"id":2},"x"]'
+        )
+
+
+class GatherTests(SimpleTestCase):
+    async def test_functions_run_concurrently(self):
+        # Each call waits for the other, so run one after the other they fail.
+        barrier = threading.Barrier(2, timeout=5)
+
+        def meet(value):
+            barrier.wait()
+            return value
+
+        self.assertEqual(await gather(lambda: meet(1), lambda: meet(2)), [1, 2])
@@ -1,7 +1,37 @@
-from django.core.paginator import Paginator
+from django.db import IntegrityError, transaction
+
+from apps.core.pagination import KeysetPaginator
 
 
 def paginate_queryset(request, queryset, per_page=10):
-	paginator = Paginator(queryset, per_page)
-	page_number = request.GET.get("page")
-	return paginator.get_page(page_number)
+	paginator = KeysetPaginator(queryset, per_page)
+	return paginator.get_page(request.GET.get("cursor"))
+
+
+async def apaginate_queryset(request, queryset, per_page=10):
+	paginator = KeysetPaginator(queryset, per_page)
+	return await paginator.aget_page(request.GET.get("cursor"))
+
+
+def bulk_create_new(model, objs):
+	"""
+	Insert ``objs`` and return the ones that were inserted. Rows that a
+	concurrent request inserted first (a unique constraint violation) are
+	skipped: the batch is retried one row at a time, each in a savepoint.
+	Like ``bulk_create()``, this sends no signals.
+	"""
+	try:
+		with transaction.atomic():
+			return model.objects.bulk_create(objs)
+	except IntegrityError:
+		pass
+
+	created = []
+	for obj in objs:
+		try:
+			with transaction.atomic():
+				model.objects.bulk_create([obj])
+		except IntegrityError:
+			continue
+		created.append(obj)
+	return created
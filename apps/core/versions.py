@@ -0,0 +1,105 @@
+"""
+Change timestamps used to validate cached and conditional responses.
+
+- The *content version* moves whenever anything public changes: posts,
+  counters, comments, follows or profiles.
+- A user's *viewer version* moves whenever something only that user sees
+  changes: their likes, bookmarks, reposts and follows, their own profile,
+  their suggestions or their Following timeline.
+
+- A *page version* moves whenever the anonymous pages of one scope (the
+  global feed, one post, one profile) change; the *pages version* moves
+  for rare writes that can show on any page (see ``apps.core.page_cache``).
+
+All are Unix timestamps stored in the shared cache and bumped from signal
+handlers after the write commits (see ``apps.feed.signals`` and
+``apps.accounts.signals``). A missing version reads as "now", so a flushed
+cache can never bring an old version back.
+"""
+
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+CONTENT_VERSION_KEY = "version:content"
+VIEWER_VERSION_KEY = "version:viewer:{}"
+PAGES_VERSION_KEY = "version:pages"
+PAGE_VERSION_KEY = "version:page:{}"
+
+
+def _bump(key):
+    cache.set(key, time.time(), None)
+
+
+def _read(keys):
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        now = time.time()
+        for key in missing:
+            cache.add(key, now, None)
+        found.update(cache.get_many(missing))
+    return [found.get(key, time.time()) for key in keys]
+
+
+def bump_content_version():
+    _bump(CONTENT_VERSION_KEY)
+
+
+def bump_viewer_version(user_id):
+    if user_id:
+        _bump(VIEWER_VERSION_KEY.format(user_id))
+
+
+def get_versions(user=None):
+    """
+    Return ``(content_version, viewer_version)`` in one cache round trip.
+    The viewer version of anonymous users is 0.
+    """
+    if user is None or not user.is_authenticated:
+        return _read([CONTENT_VERSION_KEY])[0], 0
+    return tuple(_read([CONTENT_VERSION_KEY, VIEWER_VERSION_KEY.format(user.pk)]))
+
+
+def get_page_versions(scope):
+    """Return ``(pages_version, page_version)`` of ``scope`` in one round trip."""
+    return tuple(_read([PAGES_VERSION_KEY, PAGE_VERSION_KEY.format(scope)]))
+
+
+def make_etag(*parts):
+    """Hash ``parts`` into an ETag value (without quotes)."""
+    return hashlib.md5(
+        "|".join(str(part) for part in parts).encode(), usedforsecurity=False
+    ).hexdigest()
+
+
+def versions_changed(*user_ids, content=True):
+    """
+    Bump the content version (unless ``content`` is False) and the viewer
+    versions of ``user_ids`` once the current transaction commits.
+    """
+
+    def bump():
+        if content:
+            bump_content_version()
+        for user_id in user_ids:
+            bump_viewer_version(user_id)
+
+    transaction.on_commit(bump)
+
+
+def pages_changed(*scopes, everywhere=False):
+    """
+    Bump the page versions of ``scopes`` (and the pages version, if
+    ``everywhere``) once the current transaction commits.
+    """
+
+    def bump():
+        if everywhere:
+            _bump(PAGES_VERSION_KEY)
+        for scope in scopes:
+            _bump(PAGE_VERSION_KEY.format(scope))
+
+    transaction.on_commit(bump)
@@ -8,6 +8,7 @@ class PostAdmin(admin.ModelAdmin):
     search_fields = ("author__username", "body")
     list_filter = ("is_pinned", "created_date")
     ordering = ("-created_date",)
+    readonly_fields = Post.COUNTER_FIELDS
 
     def short_body(self, obj):
         return (obj.body[:30] + "...") if obj.body and len(obj.body) > 30 else obj.body
@@ -1,5 +1,9 @@
+from django.conf import settings
+from django.db import models
 from rest_framework import serializers
+from apps.feed.bulk import ACTIONS as INTERACTION_ACTIONS
 from apps.feed.models import Post, Comment
+from apps.feed.polling import since_date
 from apps.core.api.serializers import UserBaseSerializer
 
 
@@ -28,6 +32,63 @@ class PostBaseSerializer(serializers.ModelSerializer):
         )
 
 
+class PostListSerializer(serializers.ListSerializer):
+    """
+    Read path for lists of posts (feeds, search, lookups).
+
+    Builds the same dicts ``PostSerializer`` would, straight from the loaded
+    posts, without going through a field object per value. Authors are
+    rendered once per list. Subclasses of ``PostSerializer`` keep the
+    regular path, as they may add or change fields.
+    """
+
+    datetime_field = serializers.DateTimeField()
+
+    def to_representation(self, data):
+        if type(self.child) is not PostSerializer:
+            return super().to_representation(data)
+
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        created = self.datetime_field.to_representation
+        authors = {}
+
+        def author_of(post):
+            author = authors.get(post.author_id)
+            if author is None:
+                user = post.author
+                author = authors[post.author_id] = {
+                    "username": user.username,
+                    "name": user.name,
+                    "avatar": user.avatar,
+                }
+            return dict(author)
+
+        def base_of(post):
+            return {
+                "id": post.pk,
+                "author": author_of(post),
+                "body": None if post.body is None else str(post.body),
+                "type": post.type,
+                "created_date": created(post.created_date),
+            }
+
+        results = []
+        for post in iterable:
+            item = base_of(post)
+            parent = post.parent if post.parent_id else None
+            item["parent"] = None if parent is None else base_of(parent)
+            item["is_pinned"] = bool(post.is_pinned)
+            for field in Post.COUNTER_FIELDS:
+                item[field] = getattr(post, field, 0)
+            # Like the BooleanFields they replace, flags that were never
+            # resolved are left out.
+            for flag in ("is_liked", "is_reposted", "is_bookmarked"):
+                if hasattr(post, flag):
+                    item[flag] = bool(getattr(post, flag))
+            results.append(item)
+        return results
+
+
 class PostSerializer(PostBaseSerializer):
     """
     Optimized serializer for detailed post representation, creation, and update.
@@ -58,6 +119,7 @@ class PostSerializer(PostBaseSerializer):
             "is_reposted",
             "is_bookmarked",
         )
+        list_serializer_class = PostListSerializer
         read_only_fields = PostBaseSerializer.Meta.read_only_fields + (
             "parent",
             "is_pinned",
@@ -128,3 +190,63 @@ class CommentSerializer(serializers.ModelSerializer):
         validated_data["author"] = request.user
         validated_data["post_id"] = post_id
         return super().create(validated_data)
+
+
+class InteractionOperationSerializer(serializers.Serializer):
+    """A single like/unlike/bookmark/unbookmark operation in a batch."""
+
+    action = serializers.ChoiceField(choices=sorted(INTERACTION_ACTIONS))
+    post = serializers.IntegerField(min_value=1)
+
+
+class InteractionBatchSerializer(serializers.Serializer):
+    """
+    Input of ``POST /api/posts/interactions/batch/``: up to
+    ``API_BATCH_MAX_OPERATIONS`` operations, applied in one transaction.
+    """
+
+    operations = InteractionOperationSerializer(
+        many=True,
+        allow_empty=False,
+        max_length=settings.API_BATCH_MAX_OPERATIONS,
+    )
+
+
+class NewPostsQuerySerializer(serializers.Serializer):
+    """
+    Query of the "new posts" checks of the Following feed
+    (``GET /api/posts/following/?since_id=...`` and ``.../following/count/``).
+    """
+
+    since_id = serializers.IntegerField(min_value=1)
+
+    def validate(self, attrs):
+        """Resolve ``since_id`` to the creation time of the client's top post."""
+        attrs["since"] = since_date(attrs["since_id"])
+        if attrs["since"] is None:
+            raise serializers.ValidationError({"since_id": "Post not found."})
+        return attrs
+
+
+class NewPostsWaitSerializer(NewPostsQuerySerializer):
+    """
+    Query of the long-polling "new posts" check of the Following page
+    (``GET /feed/following/new/?since_id=...&wait=25``).
+    """
+
+    wait = serializers.FloatField(
+        min_value=0, max_value=settings.TIMELINE_POLL_MAX_WAIT, default=0
+    )
+
+
+class PostLookupSerializer(serializers.Serializer):
+    """
+    Input of the post multi-get (``GET /api/posts/?ids=...`` and
+    ``POST /api/posts/lookup/``): up to ``API_LOOKUP_MAX_IDS`` post IDs.
+    """
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.API_LOOKUP_MAX_IDS,
+    )
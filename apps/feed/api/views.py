@@ -1,18 +1,34 @@
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
-from rest_framework.filters import SearchFilter
-from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework.permissions import (
+    AllowAny,
+    IsAuthenticated,
+    IsAuthenticatedOrReadOnly,
+)
 from rest_framework.response import Response
 
-from apps.accounts.models import Follow
 from apps.feed.models import Post, Comment, Reaction, Bookmark
 from apps.core.api.serializers import NoInputSerializer
-from apps.feed.api.serializers import PostSerializer, CommentSerializer
-from apps.core.api.pagination import QwitterPagination
+from apps.feed.api.serializers import (
+    PostSerializer,
+    CommentSerializer,
+    InteractionBatchSerializer,
+    NewPostsQuerySerializer,
+    PostLookupSerializer,
+)
+from apps.feed.bulk import apply_interactions
+from apps.feed.conditional import new_posts_etag, page_etag, post_etag
+from apps.feed.lookup import lookup_posts
+from apps.feed.polling import new_posts_status
+from apps.core.api.conditional import ConditionalGetMixin
+from apps.core.api.pagination import QwitterCursorPagination
 from apps.core.api.permissions import IsOwnerOrReadOnly
 from apps.feed.api.filters import PostFilter
+from apps.feed.search import PostSearchPaginator
 from apps.core.api.throttles import (
+    BatchedThrottleMixin,
+    count_batch_operations,
     PostCreateThrottle,
     PostEditThrottle,
     PostDeleteThrottle,
@@ -27,22 +43,22 @@ from apps.core.api.throttles import (
 )
 
 
-class PostViewSet(viewsets.ModelViewSet):
+class PostViewSet(ConditionalGetMixin, BatchedThrottleMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing posts in Qwitter.
 
     Supports listing, creating, updating, deleting, and interacting with posts
     (like, bookmark, pin, following feed, and bookmarks).
+    Single posts and feed pages answer conditional GETs with 304.
     """
 
     serializer_class = PostSerializer
     permission_classes = [IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
-    pagination_class = QwitterPagination
+    pagination_class = QwitterCursorPagination
     lookup_field = "id"
 
-    filter_backends = [DjangoFilterBackend, SearchFilter]
+    filter_backends = [DjangoFilterBackend]
     filterset_class = PostFilter
-    search_fields = ["body", "author__username", "author__name"]
 
     def get_queryset(self):
         """
@@ -65,6 +81,7 @@ class PostViewSet(viewsets.ModelViewSet):
             "destroy": [PostDeleteThrottle()],
             "react": [LikeActionThrottle()],
             "bookmark": [BookmarkActionThrottle()],
+            "interactions_batch": [LikeActionThrottle(), BookmarkActionThrottle()],
             "pin": [PinActionThrottle()],
             "repost": [PostRepostThrottle()],
             "quote": [PostQuoteThrottle()],
@@ -74,6 +91,97 @@ class PostViewSet(viewsets.ModelViewSet):
             return throttle_map[self.action]
         return super().get_throttles()
 
+    def get_throttle_cost(self, request, throttle):
+        """Charge batch operations one hit each against their own scope."""
+        if self.action == "interactions_batch":
+            scopes = {
+                LikeActionThrottle: ("like", "unlike"),
+                BookmarkActionThrottle: ("bookmark", "unbookmark"),
+            }
+            return count_batch_operations(request.data, scopes[type(throttle)])
+        return super().get_throttle_cost(request, throttle)
+
+    def get_etag(self, request):
+        """ETag of single posts and feed pages."""
+        user = request.user if request.user.is_authenticated else None
+        if self.action == "retrieve":
+            return post_etag(self.kwargs.get(self.lookup_field), user)
+        if self.action == "following_count" or (
+            self.action == "following" and "since_id" in request.query_params
+        ):
+            return new_posts_etag(request.get_full_path(), user)
+
+        if self.action == "list" and not (
+            {"ids", "search"} & request.query_params.keys()
+        ):
+            posts = self.filter_queryset(self.get_queryset())
+        elif self.action == "following" and "since_id" not in request.query_params:
+            posts = self._following_posts()
+        elif self.action == "bookmarks":
+            posts = self._bookmarked_posts()
+        else:
+            return super().get_etag(request)
+        return page_etag(
+            posts,
+            self.paginator.get_page_size(request),
+            request.query_params.get(self.paginator.cursor_query_param),
+            user,
+        )
+
+    def _following_posts(self):
+        return Post.objects.feed_for_user(self.request.user)
+
+    def _bookmarked_posts(self):
+        return (
+            self.get_queryset()
+            .filter(bookmarks__user=self.request.user)
+            .order_by("-bookmarks__created_date")
+        )
+
+    def list(self, request, *args, **kwargs):
+        """
+        List posts, newest first.
+        With ``?ids=1,2,3`` returns exactly those posts instead (see ``lookup``),
+        and with ``?search=<text>`` the best matches (see ``search``).
+        """
+        if "ids" in request.query_params:
+            ids = [
+                part.strip()
+                for part in request.query_params["ids"].split(",")
+                if part.strip()
+            ]
+            return self._lookup({"ids": ids})
+        if "search" in request.query_params:
+            return self._search(request, request.query_params["search"])
+        return super().list(request, *args, **kwargs)
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="lookup",
+        permission_classes=[AllowAny],
+        serializer_class=PostLookupSerializer,
+    )
+    def lookup(self, request):
+        """
+        Fetch up to ``API_LOOKUP_MAX_IDS`` posts by ID, for ID lists too long
+        for a query string.
+        Body: {"ids": [3, 1, 2]}
+        Returns the posts in request order and the IDs that were not found.
+        """
+        return self._lookup(request.data)
+
+    def _lookup(self, data):
+        serializer = PostLookupSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        user = self.request.user if self.request.user.is_authenticated else None
+        results, missing = lookup_posts(
+            serializer.validated_data["ids"], user, self.get_serializer_context()
+        )
+        return Response(
+            {"results": results, "missing": missing}, status=status.HTTP_200_OK
+        )
+
     @action(
         detail=True,
         methods=["post"],
@@ -122,6 +230,27 @@ class PostViewSet(viewsets.ModelViewSet):
             status=status.HTTP_201_CREATED,
         )
 
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="interactions/batch",
+        permission_classes=[IsAuthenticated],
+        serializer_class=InteractionBatchSerializer,
+    )
+    def interactions_batch(self, request):
+        """
+        Like, unlike, bookmark or unbookmark up to ``API_BATCH_MAX_OPERATIONS``
+        posts at once.
+        Body: {"operations": [{"action": "like", "post": 42}, ...]}
+        Returns one result per operation: created, deleted, unchanged or failed.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = apply_interactions(
+            request.user, serializer.validated_data["operations"]
+        )
+        return Response({"success": True, "results": results}, status=status.HTTP_200_OK)
+
     @action(
         detail=True,
         methods=["post"],
@@ -156,12 +285,7 @@ class PostViewSet(viewsets.ModelViewSet):
         """
         Retrieve a paginated list of bookmarked posts for the current user.
         """
-        bookmarked_posts = (
-            self.get_queryset()
-            .filter(bookmarks__user=request.user)
-            .order_by("-bookmarks__created_date")
-        )
-        page = self.paginate_queryset(bookmarked_posts)
+        page = self.paginate_queryset(self._bookmarked_posts())
         serializer = self.get_serializer(page, many=True, context={"request": request})
         return self.get_paginated_response(serializer.data)
 
@@ -174,15 +298,60 @@ class PostViewSet(viewsets.ModelViewSet):
     def following(self, request):
         """
         Retrieve a feed of posts from users that the current user follows.
+        With ``?since_id=<id>`` returns only posts newer than that post (see
+        ``following_count``).
         """
-        following_users = Follow.objects.filter(follower=request.user).values_list(
-            "followed", flat=True
-        )
-        posts = self.get_queryset().filter(author__in=following_users)
+        if "since_id" not in request.query_params:
+            posts = self._following_posts()
+        else:
+            since = self._new_posts_since(request)
+            posts = Post.objects.feed_for_user(request.user, since=since)
+
         page = self.paginate_queryset(posts)
         serializer = self.get_serializer(page, many=True, context={"request": request})
         return self.get_paginated_response(serializer.data)
 
+    @action(
+        detail=False,
+        methods=["get"],
+        permission_classes=[IsAuthenticated],
+        url_path="following/count",
+    )
+    def following_count(self, request):
+        """
+        Count the Following feed posts newer than ``?since_id=<id>``, up to
+        ``TIMELINE_NEW_POSTS_LIMIT``, without loading them. Answers right
+        away; clients poll it every half minute or so, and get 304 with
+        ``If-None-Match`` while nothing changed. Returns
+        {"count": 3, "has_more": false}.
+        """
+        since = self._new_posts_since(request)
+        return Response(new_posts_status(request.user, since))
+
+    def _new_posts_since(self, request):
+        serializer = NewPostsQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data["since"]
+
+    @action(detail=False, methods=["get"], url_path="search")
+    def search(self, request):
+        """
+        Full-text search over post bodies, best matches first.
+        Query: ?q=<text>. Paginated by an opaque cursor.
+        """
+        return self._search(request, request.query_params.get("q", ""))
+
+    def _search(self, request, query):
+        user = request.user if request.user.is_authenticated else None
+        paginator = PostSearchPaginator(
+            query,
+            user=user,
+            per_page=self.paginator.get_page_size(request),
+        )
+        page = self.paginator.paginate(paginator, request)
+        serializer = self.get_serializer(page, many=True, context={"request": request})
+        return self.get_paginated_response(serializer.data)
+
     @action(
         detail=True,
         methods=["post"],
@@ -238,7 +407,7 @@ class PostViewSet(viewsets.ModelViewSet):
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(BatchedThrottleMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing comments on posts.
 
@@ -249,7 +418,7 @@ class CommentViewSet(viewsets.ModelViewSet):
     """
 
     serializer_class = CommentSerializer
-    pagination_class = QwitterPagination
+    pagination_class = QwitterCursorPagination
     permission_classes = [IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
     lookup_field = "id"
 
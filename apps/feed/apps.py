@@ -0,0 +1,21 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def restore_search_index(using, **kwargs):
+    from django.db import connections
+
+    from apps.feed.search import ensure_search_index
+
+    ensure_search_index(connections[using])
+
+
+class FeedConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "apps.feed"
+
+    def ready(self):
+        # Register signal handlers that keep denormalized data in sync.
+        from apps.feed import signals  # noqa: F401
+
+        post_migrate.connect(restore_search_index, sender=self)
@@ -0,0 +1,141 @@
+"""
+Async versions of the read-only feed pages, served when ``ASYNC_VIEWS`` is
+enabled and the project runs under ASGI (see ``apps.core.aio``). They render
+the same templates with the same context as ``apps.feed.views``.
+
+The live counters stream and the new posts check are always served from
+here.
+"""
+
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.core.handlers.asgi import ASGIRequest
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseBadRequest,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.urls import reverse
+
+from apps.core.aio import aresolve_user, arender, gather
+from apps.core.conditional import conditional_page
+from apps.core.page_cache import FEED_PAGES, POST_PAGES, cache_anonymous_page
+from apps.core.pagination import KeysetPaginator
+from apps.core.utils import apaginate_queryset
+from apps.feed import live
+from apps.feed.api.serializers import NewPostsWaitSerializer
+from apps.feed.models import Post, Comment
+from apps.feed.polling import await_new_posts, new_posts_status
+from apps.feed.views import COMMENTS_PAGE_SIZE
+
+
+@conditional_page
+@cache_anonymous_page(FEED_PAGES)
+async def index(request):
+    user = await aresolve_user(request)
+    posts = Post.objects.with_full_details(user=user).order_by("-created_date")
+    page_obj = await apaginate_queryset(request, posts)
+    return await arender(request, "feed/index.html", {"posts_page": page_obj})
+
+
+@conditional_page
+@cache_anonymous_page(POST_PAGES)
+async def post(request, post_id):
+    user = await aresolve_user(request)
+    current_user = user if user.is_authenticated else None
+    comments = KeysetPaginator(Comment.objects.for_post(post_id), COMMENTS_PAGE_SIZE)
+    # The post and its first comments are independent; load them side by side.
+    post, comments_page = await gather(
+        lambda: Post.objects.with_full_details(current_user).filter(pk=post_id).first(),
+        lambda: comments.get_page(request.GET.get("cursor")),
+    )
+    if post is None:
+        raise Http404("No Post matches the given query.")
+    return await arender(
+        request,
+        "feed/post.html",
+        {
+            "post": post,
+            "comments_page": comments_page,
+            "comments_url": reverse("feed:comments", args=[post.pk]),
+        },
+    )
+
+
+@login_required
+@conditional_page
+async def following(request):
+    user = await aresolve_user(request)
+    # Merges pending high fan-out posts into the timeline first.
+    posts = await sync_to_async(Post.objects.feed_for_user)(user)
+    page_obj = await apaginate_queryset(request, posts)
+    return await arender(request, "feed/following.html", {"posts_page": page_obj})
+
+
+async def new_posts(request):
+    """
+    Count the Following feed posts newer than ``?since_id=<id>`` (see
+    ``apps.feed.polling``). Under ASGI, waits up to ``?wait=<seconds>`` for
+    one to arrive; under WSGI it answers right away rather than hold a
+    worker. ``"wait"`` in the response is the wait that was honoured.
+    """
+    user = await aresolve_user(request)
+    if not user.is_authenticated:
+        return JsonResponse({"detail": "Authentication required."}, status=403)
+    serializer = NewPostsWaitSerializer(data=request.GET)
+    if not await sync_to_async(serializer.is_valid)():
+        return JsonResponse(serializer.errors, status=400)
+
+    since = serializer.validated_data["since"]
+    wait = serializer.validated_data["wait"]
+    if not isinstance(request, ASGIRequest):
+        wait = 0
+    status = {"count": 0, "has_more": False}
+    if await await_new_posts(user, since, wait):
+        status = await sync_to_async(new_posts_status)(user, since)
+    return JsonResponse({**status, "wait": wait})
+
+
+async def live_counters(request):
+    """
+    Server-Sent Events stream of the engagement counters of the posts in
+    ``?ids=1,2,3``, sent as coalesced ``counters`` events (see
+    ``apps.feed.live``). Needs ASGI: under WSGI it answers 204, which tells
+    EventSource clients not to reconnect.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    try:
+        post_ids = {int(part) for part in request.GET.get("ids", "").split(",")}
+    except ValueError:
+        return HttpResponseBadRequest("ids must be a comma-separated list of post IDs.")
+    if len(post_ids) > settings.LIVE_COUNTERS_MAX_POSTS:
+        return HttpResponseBadRequest(
+            f"At most {settings.LIVE_COUNTERS_MAX_POSTS} posts per stream."
+        )
+
+    subscription = live.get_broker().subscribe(post_ids)
+    response = StreamingHttpResponse(
+        _live_events(subscription), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    # Don't let a proxy buffer the stream.
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+async def _live_events(subscription):
+    try:
+        while True:
+            event = await subscription.get(timeout=settings.LIVE_COUNTERS_HEARTBEAT)
+            if event is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"event: counters\ndata: {json.dumps(event)}\n\n"
+    finally:
+        subscription.close()
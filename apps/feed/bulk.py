@@ -0,0 +1,104 @@
+"""
+Batched likes and bookmarks (``POST /api/posts/interactions/batch/``).
+
+A batch is validated set-wise: one query resolves every referenced post and
+one query per table finds the interactions that already exist. New rows are
+inserted with one ``bulk_create()`` (see ``apps.core.utils.bulk_create_new``)
+and removed rows with one queryset ``delete()`` per table, all in one
+transaction. A row that a concurrent like or bookmark inserted first is
+reported as unchanged.
+
+``bulk_create`` sends no ``post_save`` signals, so the rows actually
+inserted are passed, once per batch, to the functions the handlers in
+``apps.feed.signals`` call for single rows. Deletes still go through the
+regular ``post_delete`` handlers.
+"""
+
+from django.db import transaction
+
+from apps.core.utils import bulk_create_new
+from apps.feed.models import Bookmark, Post, Reaction
+from apps.feed.signals import bookmarks_changed, reactions_changed
+
+CREATED = "created"
+DELETED = "deleted"
+UNCHANGED = "unchanged"
+FAILED = "failed"
+
+# action -> (model, whether the row should exist afterwards)
+ACTIONS = {
+    "like": (Reaction, True),
+    "unlike": (Reaction, False),
+    "bookmark": (Bookmark, True),
+    "unbookmark": (Bookmark, False),
+}
+
+
+def _fail(result, detail):
+    result.update(status=FAILED, detail=detail)
+
+
+def apply_interactions(user, operations):
+    """
+    Apply ``operations`` (dicts with ``action`` and ``post``) for ``user``.
+    Returns one result dict per operation, in order.
+    """
+    results = [{"action": op["action"], "post": op["post"]} for op in operations]
+
+    # post_id -> whether it is a pure repost, which cannot be interacted with.
+    is_repost = {
+        pk: bool(parent_id) and not body
+        for pk, parent_id, body in Post.objects.filter(
+            pk__in={op["post"] for op in operations}
+        ).values_list("pk", "parent_id", "body")
+    }
+
+    # model -> {post_id: (result, should_exist)}
+    wanted = {Reaction: {}, Bookmark: {}}
+    for op, result in zip(operations, results):
+        model, should_exist = ACTIONS[op["action"]]
+        post_id = op["post"]
+        if post_id not in is_repost:
+            _fail(result, "Post not found.")
+        elif is_repost[post_id]:
+            _fail(result, "Reposts cannot be liked or bookmarked.")
+        elif post_id in wanted[model]:
+            _fail(result, "Duplicate operation for this post in the batch.")
+        else:
+            wanted[model][post_id] = (result, should_exist)
+
+    with transaction.atomic():
+        changed = {}
+        for model, targets in wanted.items():
+            existing = set(
+                model.objects.filter(user=user, post_id__in=targets).values_list(
+                    "post_id", flat=True
+                )
+            )
+            create, delete = [], []
+            for post_id, (result, should_exist) in targets.items():
+                if should_exist and post_id not in existing:
+                    create.append(post_id)
+                    result["status"] = CREATED
+                elif not should_exist and post_id in existing:
+                    delete.append(post_id)
+                    result["status"] = DELETED
+                else:
+                    result["status"] = UNCHANGED
+
+            inserted = bulk_create_new(
+                model, [model(user=user, post_id=post_id) for post_id in create]
+            )
+            created = [obj.post_id for obj in inserted]
+            for post_id in set(create).difference(created):
+                # Inserted concurrently by a single like or bookmark.
+                targets[post_id][0]["status"] = UNCHANGED
+            if delete:
+                model.objects.filter(user=user, post_id__in=delete).delete()
+            changed[model] = created
+
+        reactions_changed(user.pk, changed[Reaction], 1)
+        if changed[Bookmark]:
+            bookmarks_changed(user.pk)
+
+    return results
@@ -0,0 +1,66 @@
+"""
+ETags for conditional GETs of posts and post feeds.
+
+ETags are computed from the same narrow version rows as the post multi-get
+(see ``apps.feed.lookup``): edits, pins, counters, the parent and the
+authors' public profiles, plus the viewer version for the viewer's own
+flags. For a feed page, the page is first resolved to post IDs with a
+keys-only query. Nothing is hydrated or serialized.
+
+"New posts" checks of the Following feed need no query at all: new posts,
+fan-outs and deletes move the content version, and follows move the
+reader's viewer version.
+"""
+
+from apps.core.pagination import InvalidCursor, KeysetPaginator
+from apps.core.versions import get_versions, make_etag
+from apps.feed.lookup import VERSION_FIELDS
+from apps.feed.models import Post
+
+
+def _version_rows(post_ids):
+    rows = {
+        row[0]: row
+        for row in Post.objects.filter(pk__in=post_ids)
+        .order_by()
+        .values_list(*VERSION_FIELDS)
+    }
+    return [rows.get(post_id) for post_id in post_ids]
+
+
+def post_etag(post_id, user=None):
+    """Return the ETag of one post, or None."""
+    try:
+        post_id = int(post_id)
+    except (TypeError, ValueError):
+        return None
+    row = _version_rows([post_id])[0]
+    if row is None:
+        return None
+    viewer = get_versions(user)[1]
+    return make_etag("post", row, getattr(user, "pk", None), viewer)
+
+
+def new_posts_etag(path, user):
+    """Return the ETag of the "new posts" check at ``path`` made by ``user``."""
+    return make_etag("new", path, user.pk, *get_versions(user))
+
+
+def page_etag(queryset, per_page, cursor=None, user=None):
+    """
+    Return the ETag of one keyset page of ``queryset``, or None for an
+    invalid cursor.
+    """
+    try:
+        page = KeysetPaginator(queryset.keys_only(), per_page).page(cursor)
+    except InvalidCursor:
+        return None
+    viewer = get_versions(user)[1]
+    return make_etag(
+        "page",
+        page.has_next(),
+        page.has_previous(),
+        _version_rows([post.pk for post in page]),
+        getattr(user, "pk", None),
+        viewer,
+    )
@@ -0,0 +1,184 @@
+"""
+Batched resolution of viewer-specific post flags.
+
+Instead of correlated ``EXISTS`` subqueries per row, the flags for a whole
+page (posts plus their already-loaded parents) are answered with one
+``WHERE user = ? AND post_id IN (...)`` lookup per interaction table and
+attached to the instances as plain attributes:
+
+- ``is_liked``      — the viewer reacted to the post
+- ``is_bookmarked`` — the viewer bookmarked the post
+- ``is_reposted``   — the viewer made a pure repost of the post
+- ``is_quoted``     — the viewer quoted the post
+
+The answers are kept in a per-request ``InteractionContext`` (installed by
+``apps.feed.middleware.InteractionContextMiddleware``), so template filters
+such as ``has_liked`` or ``is_following`` read in-memory sets instead of
+running a query per call.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from apps.accounts.graph import get_graph
+
+VIEWER_FLAGS = ("is_liked", "is_bookmarked", "is_reposted", "is_quoted")
+
+# Maps user ID -> InteractionContext for the request being handled.
+_request_scope = ContextVar("interaction_context_scope", default=None)
+
+
+class InteractionContext:
+    """
+    In-memory view of one user's reactions, reposts, quotes, bookmarks and
+    follows, limited to the posts and authors visible on the current page.
+    Lookups that miss the primed sets fall back to a query for that item.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.liked = set()
+        self.bookmarked = set()
+        self.reposted = set()
+        self.quoted = set()
+        self.following = set()
+        self._known_posts = set()
+        self._known_users = set()
+        self._pending_users = set()
+
+    def prime_posts(self, post_ids):
+        """Load the user's interactions with ``post_ids`` (one query per table)."""
+        from apps.feed.models import Bookmark, Post, Reaction
+
+        missing = set(post_ids) - self._known_posts
+        if not missing:
+            return
+
+        self.liked.update(
+            Reaction.objects.filter(user=self.user, post_id__in=missing)
+            .order_by()
+            .values_list("post_id", flat=True)
+        )
+        self.bookmarked.update(
+            Bookmark.objects.filter(user=self.user, post_id__in=missing)
+            .order_by()
+            .values_list("post_id", flat=True)
+        )
+        shares = (
+            Post.objects.filter(author=self.user, parent_id__in=missing)
+            .order_by()
+            .values_list("parent_id", "body")
+        )
+        for parent_id, body in shares:
+            (self.quoted if body else self.reposted).add(parent_id)
+
+        self._known_posts |= missing
+
+    def prime_users(self, user_ids):
+        """Queue ``user_ids`` for a single follow lookup on first use."""
+        self._pending_users |= set(user_ids) - self._known_users
+
+    def _resolve_users(self):
+        from apps.accounts.models import Follow
+
+        pending, self._pending_users = self._pending_users, set()
+        self.following.update(
+            Follow.objects.filter(follower=self.user, followed_id__in=pending)
+            .order_by()
+            .values_list("followed_id", flat=True)
+        )
+        self._known_users |= pending
+
+    def _post_id(self, post):
+        post_id = getattr(post, "pk", post)
+        if post_id not in self._known_posts:
+            self.prime_posts([post_id])
+        return post_id
+
+    def has_liked(self, post):
+        return self._post_id(post) in self.liked
+
+    def has_bookmarked(self, post):
+        return self._post_id(post) in self.bookmarked
+
+    def has_reposted(self, post):
+        return self._post_id(post) in self.reposted
+
+    def has_quoted(self, post):
+        return self._post_id(post) in self.quoted
+
+    def is_following(self, target_user):
+        user_id = getattr(target_user, "pk", target_user)
+        graph = get_graph()
+        if graph is not None:
+            return graph.is_following(self.user.pk, user_id)
+        if user_id not in self._known_users:
+            self._pending_users.add(user_id)
+        if self._pending_users:
+            self._resolve_users()
+        return user_id in self.following
+
+
+@contextmanager
+def interaction_scope():
+    """Share interaction contexts between all lookups made inside the block."""
+    token = _request_scope.set({})
+    try:
+        yield
+    finally:
+        _request_scope.reset(token)
+
+
+def get_interaction_context(user):
+    """
+    Return the interaction context for ``user`` in the current request.
+    Outside a request a fresh, unshared context is returned.
+    """
+    scope = _request_scope.get()
+    if scope is None:
+        return InteractionContext(user)
+    context = scope.get(user.pk)
+    if context is None:
+        context = scope[user.pk] = InteractionContext(user)
+    return context
+
+
+def _collect(posts):
+    """Return the given posts plus any parents that are already loaded."""
+    from apps.feed.models import Post
+
+    collected = []
+    for post in posts:
+        collected.append(post)
+        if post.parent_id and Post.parent.is_cached(post) and post.parent:
+            collected.append(post.parent)
+    return collected
+
+
+def resolve_viewer_flags(posts, user):
+    """
+    Attach viewer flags to ``posts`` and their parents.
+    Runs at most three queries regardless of page size (none for anonymous
+    viewers); the post authors are queued for a lazy follow lookup.
+    """
+    posts = _collect(posts)
+    if not posts:
+        return posts
+
+    if not user or not user.is_authenticated:
+        for post in posts:
+            for flag in VIEWER_FLAGS:
+                setattr(post, flag, False)
+        return posts
+
+    context = get_interaction_context(user)
+    context.prime_posts(post.pk for post in posts)
+    context.prime_users(post.author_id for post in posts)
+
+    for post in posts:
+        post.is_liked = post.pk in context.liked
+        post.is_bookmarked = post.pk in context.bookmarked
+        post.is_reposted = post.pk in context.reposted
+        post.is_quoted = post.pk in context.quoted
+
+    return posts
@@ -0,0 +1,182 @@
+"""
+Live engagement counters, pushed to open pages with Server-Sent Events.
+
+Every counter change (see ``bump_counter`` in ``apps.feed.signals``) is
+published to the broker once its transaction commits:
+
+    live.counters_changed(post_id, "reactions_count")
+
+The broker does not forward single changes. At most once every
+``LIVE_COUNTERS_INTERVAL`` seconds it collects the posts that changed and
+have subscribers, reads their current counters with one query and hands
+each subscriber one event holding the changed counters of its own posts:
+
+    {"42": {"reactions_count": 1289}, "57": {"comments_count": 12}}
+
+Events carry current values rather than increments, so they can be merged,
+dropped or applied twice (e.g. after the viewer's own like) without
+drifting. A subscriber that reads slowly gets its pending events merged
+into one.
+
+``LocalBroker`` keeps subscriptions in this process's memory, so a stream
+only sees writes made by the same server process. Set
+``LIVE_COUNTERS_BROKER`` to a class with the same interface, backed by a
+shared pub/sub, when running several processes.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils.module_loading import import_string
+
+from apps.feed.models import Post
+
+logger = logging.getLogger(__name__)
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+class Subscription:
+    """
+    One stream's interest in a set of posts. Created inside the event loop
+    that reads it; events may be delivered from any thread.
+    """
+
+    def __init__(self, broker, post_ids):
+        self.broker = broker
+        self.post_ids = frozenset(post_ids)
+        self._loop = asyncio.get_running_loop()
+        self._ready = asyncio.Event()
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    def deliver(self, event):
+        """Queue ``event``, merging it into any event not read yet."""
+        with self._lock:
+            for post_id, counters in event.items():
+                self._pending.setdefault(post_id, {}).update(counters)
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            # The loop is gone; the stream was closed.
+            pass
+
+    async def get(self, timeout=None):
+        """Wait for the next event; return None after ``timeout`` seconds."""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self._ready.clear()
+        with self._lock:
+            event, self._pending = self._pending, {}
+        return event
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """In-process pub/sub that coalesces counter changes on a timer thread."""
+
+    def __init__(self):
+        self.interval = settings.LIVE_COUNTERS_INTERVAL
+        self._lock = threading.Lock()
+        self._changed = {}
+        self._subscribers = {}
+        self._thread = None
+
+    def publish(self, post_id, fields):
+        """Record that ``fields`` of post ``post_id`` changed."""
+        with self._lock:
+            # Nobody watches this post in this process; nothing to send.
+            if post_id in self._subscribers:
+                self._changed.setdefault(post_id, set()).update(fields)
+
+    def subscribe(self, post_ids):
+        subscription = Subscription(self, post_ids)
+        with self._lock:
+            for post_id in subscription.post_ids:
+                self._subscribers.setdefault(post_id, set()).add(subscription)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="live-counters", daemon=True
+                )
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for post_id in subscription.post_ids:
+                subscribers = self._subscribers.get(post_id)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[post_id]
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Live counter flush failed")
+            finally:
+                connections.close_all()
+
+    def flush(self):
+        """Send the counters that changed since the last flush."""
+        with self._lock:
+            changed, self._changed = self._changed, {}
+        if not changed:
+            return
+
+        rows = (
+            Post.objects.filter(pk__in=changed)
+            .order_by()
+            .values("pk", *Post.COUNTER_FIELDS)
+        )
+        counters = {
+            row["pk"]: {field: row[field] for field in changed[row["pk"]]}
+            for row in rows
+        }
+
+        events = {}
+        with self._lock:
+            for post_id, values in counters.items():
+                for subscription in self._subscribers.get(post_id, ()):
+                    events.setdefault(subscription, {})[str(post_id)] = values
+        for subscription, event in events.items():
+            subscription.deliver(event)
+
+
+def get_broker():
+    """Return this process's broker, built from ``LIVE_COUNTERS_BROKER``."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.LIVE_COUNTERS_BROKER)()
+    return _broker
+
+
+def counters_changed(post_ids, *fields):
+    """
+    Publish that ``fields`` of the posts ``post_ids`` (one ID or several)
+    changed, once the current transaction commits.
+    """
+    if isinstance(post_ids, int):
+        post_ids = [post_ids]
+    post_ids = list(post_ids)
+
+    def publish():
+        broker = get_broker()
+        for post_id in post_ids:
+            broker.publish(post_id, fields)
+
+    transaction.on_commit(publish)
@@ -0,0 +1,120 @@
+"""
+Multi-get of posts by ID (``GET /api/posts/?ids=1,2,3`` or
+``POST /api/posts/lookup/``).
+
+A lookup runs a fixed number of queries however many IDs are asked for:
+
+1. one narrow query reads the version of every requested post: the fields
+   the API renders that can change (edits, pins, counters, the parent and
+   the public profile of both authors);
+2. serialized posts are read from the cache per ``(id, version)``; only the
+   misses are loaded, with their authors and parents, and written back;
+3. viewer flags are never cached, they are resolved for the whole set with
+   one query per interaction table (see ``apps.feed.interactions``).
+
+Results come back in request order, and IDs that do not exist are reported
+as ``missing``.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.feed.interactions import get_interaction_context
+from apps.feed.models import Post
+
+CACHE_PREFIX = "post-api"
+
+VERSION_FIELDS = (
+    "pk",
+    "created_date",
+    "edited_date",
+    "is_pinned",
+    *Post.COUNTER_FIELDS,
+    "author__username",
+    "author__name",
+    "author__image",
+    "parent_id",
+    "parent__edited_date",
+    "parent__author__username",
+    "parent__author__name",
+    "parent__author__image",
+)
+
+VIEWER_FLAGS = ("is_liked", "is_reposted", "is_bookmarked")
+
+
+def _cache_key(row):
+    version = hashlib.md5(
+        "|".join(str(value) for value in row).encode(), usedforsecurity=False
+    ).hexdigest()
+    return f"{CACHE_PREFIX}:{row[0]}:{version}"
+
+
+def _serialize(post_ids, context):
+    """Serialize ``post_ids`` without viewer flags. Returns ``{id: data}``."""
+    from apps.feed.api.serializers import PostSerializer
+
+    posts = list(
+        Post.objects.filter(pk__in=post_ids).with_author().with_parent().order_by()
+    )
+    for post in posts:
+        for flag in VIEWER_FLAGS:
+            setattr(post, flag, False)
+    data = PostSerializer(posts, many=True, context=context).data
+    return {post.pk: item for post, item in zip(posts, data)}
+
+
+def _viewer_flags(post_ids, user):
+    """Return ``{flag: set of post IDs}`` for ``user`` (empty when anonymous)."""
+    if not user or not user.is_authenticated:
+        return dict.fromkeys(VIEWER_FLAGS, frozenset())
+    context = get_interaction_context(user)
+    context.prime_posts(post_ids)
+    return {
+        "is_liked": context.liked,
+        "is_reposted": context.reposted,
+        "is_bookmarked": context.bookmarked,
+    }
+
+
+def lookup_posts(ids, user=None, context=None):
+    """
+    Return ``(results, missing)`` for the post IDs in ``ids``: the serialized
+    posts in request order (duplicates dropped) and the IDs that were not found.
+    ``context`` is passed to the serializer.
+    """
+    ids = list(dict.fromkeys(ids))
+    keys = {
+        row[0]: _cache_key(row)
+        for row in Post.objects.filter(pk__in=ids)
+        .order_by()
+        .values_list(*VERSION_FIELDS)
+    }
+
+    cached = cache.get_many(keys.values())
+    serialized = {
+        post_id: cached[key] for post_id, key in keys.items() if key in cached
+    }
+    misses = [post_id for post_id in keys if post_id not in serialized]
+    if misses:
+        loaded = _serialize(misses, context or {})
+        cache.set_many(
+            {keys[post_id]: data for post_id, data in loaded.items()},
+            getattr(settings, "POST_LOOKUP_CACHE_TIMEOUT", 60 * 60),
+        )
+        serialized.update(loaded)
+
+    flags = _viewer_flags(list(serialized), user)
+    results, missing = [], []
+    for post_id in ids:
+        data = serialized.get(post_id)
+        if data is None:
+            missing.append(post_id)
+            continue
+        data = dict(data)
+        for flag, post_ids in flags.items():
+            data[flag] = post_id in post_ids
+        results.append(data)
+    return results, missing
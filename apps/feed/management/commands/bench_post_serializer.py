@@ -0,0 +1,109 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework import serializers
+
+from apps.accounts.models import User
+from apps.feed.api.serializers import PostSerializer
+from apps.feed.models import Post
+
+
+def _synthetic_posts(count, seed):
+    """
+    Build ``count`` unsaved posts with authors, parents, counters and viewer
+    flags, covering originals, quotes, reposts, avatars and empty bodies.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    authors = [
+        User(
+            pk=i,
+            username=f"user{i}",
+            name=f"User {i}" if i % 7 else "",
+            image=f"https://example.com/{i}.png" if i % 3 == 0 else None,
+        )
+        for i in range(1, 51)
+    ]
+    posts = []
+    for pk in range(1, count + 1):
+        parent = rng.choice(posts) if posts and rng.random() < 0.3 else None
+        if parent is not None and parent.is_repost:
+            parent = None
+        body = "" if parent is not None and rng.random() < 0.5 else f"post {pk} " * 5
+        post = Post(
+            pk=pk,
+            author=rng.choice(authors),
+            parent=parent,
+            body=body,
+            created_date=now - timedelta(seconds=pk, microseconds=pk),
+            is_pinned=rng.random() < 0.05,
+        )
+        for field in Post.COUNTER_FIELDS:
+            setattr(post, field, rng.randint(0, 500))
+        for flag in ("is_liked", "is_reposted", "is_bookmarked"):
+            setattr(post, flag, rng.random() < 0.2)
+        posts.append(post)
+    return posts
+
+
+def _regular(posts):
+    return serializers.ListSerializer(posts, child=PostSerializer()).data
+
+
+def _fast(posts):
+    return PostSerializer(posts, many=True).data
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the throughput (posts/sec) of the list read path of "
+        "PostSerializer with the regular serializer. Their output is checked "
+        "to match by the apps.feed tests."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--posts",
+            type=int,
+            default=1000,
+            help="Posts serialized per run (default: 1000).",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Timed runs per path; the best is reported (default: 5).",
+        )
+        parser.add_argument(
+            "--seed", type=int, default=0, help="Random seed (default: 0)."
+        )
+        parser.add_argument(
+            "--database",
+            action="store_true",
+            help="Serialize the newest posts in the database instead.",
+        )
+
+    def handle(self, *args, **options):
+        if options["database"]:
+            posts = list(
+                Post.objects.with_full_details(None)
+                .order_by("-created_date")[: options["posts"]]
+            )
+        else:
+            posts = _synthetic_posts(options["posts"], options["seed"])
+        if not posts:
+            raise CommandError("No posts to serialize.")
+
+        for name, func in (("regular", _regular), ("fast", _fast)):
+            best = float("inf")
+            for _ in range(options["repeat"]):
+                began = time.perf_counter()
+                func(posts)
+                best = min(best, time.perf_counter() - began)
+            self.stdout.write(
+                f"{name + ':':<9}{len(posts) / best:>12,.0f} posts/sec "
+                f"({best * 1000:.1f} ms per {len(posts):,})"
+            )
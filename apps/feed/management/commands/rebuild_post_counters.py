@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.core.versions import bump_content_version
+from apps.feed.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the denormalized reaction, comment, repost and quote counters "
+        "on every post from the underlying rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Number of posts to recount per transaction (default: 5000).",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        last_id = 0
+        total = 0
+
+        while True:
+            ids = list(
+                Post.objects.filter(pk__gt=last_id)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+
+            with transaction.atomic():
+                total += Post.objects.filter(pk__in=ids).rebuild_counters()
+            last_id = ids[-1]
+
+        bump_content_version()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt counters for {total} posts."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from apps.feed.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the post full-text search index (the FTS5 table and its "
+        "triggers on SQLite, the GIN index on PostgreSQL)."
+    )
+
+    def handle(self, *args, **options):
+        rebuild_search_index(connection)
+        self.stdout.write(self.style.SUCCESS("Rebuilt the post search index."))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from apps.accounts.models import User
+from apps.feed.timeline import rebuild_timeline
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the materialized Following timelines from the follow graph. "
+        "Also caps each inbox at TIMELINE_MAX_LENGTH entries."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "usernames",
+            nargs="*",
+            help="Only rebuild the timelines of these users (default: all users).",
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options["usernames"]:
+            users = users.filter(username__in=[u.lower() for u in options["usernames"]])
+
+        total = 0
+        for user_id in users.values_list("pk", flat=True).iterator():
+            rebuild_timeline(user_id)
+            total += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {total} timelines."))
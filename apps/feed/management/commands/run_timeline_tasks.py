@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.feed.timeline import retry_tasks
+
+
+class Command(BaseCommand):
+    help = (
+        "Run timeline tasks (fan-out, backfills, ...) that were dispatched but "
+        "never finished, e.g. because the worker restarted. Run periodically "
+        "(e.g. every minute from cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--min-age",
+            type=float,
+            default=settings.TIMELINE_TASK_RETRY_AFTER,
+            help="Only run tasks dispatched at least this many seconds ago.",
+        )
+        parser.add_argument(
+            "--max-attempts",
+            type=int,
+            default=settings.TIMELINE_TASK_MAX_ATTEMPTS,
+            help="Skip tasks that already failed this many times.",
+        )
+
+    def handle(self, *args, **options):
+        succeeded, failed = retry_tasks(options["min_age"], options["max_attempts"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Ran {succeeded} timeline tasks ({failed} failed).")
+        )
@@ -1,149 +1,211 @@
 from django.db import models
-from django.db.models import Count, Exists, OuterRef, Q, Prefetch
+from django.db.models import Count, IntegerField, OuterRef, Prefetch, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.query import ModelIterable
 
-from apps.accounts.models import Follow
+from apps.feed.interactions import resolve_viewer_flags
 
 
 class PostQuerySet(models.QuerySet):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._viewer = None
+        self._resolve_viewer_flags = False
+        self._two_phase = False
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._viewer = self._viewer
+        clone._resolve_viewer_flags = self._resolve_viewer_flags
+        clone._two_phase = self._two_phase
+        return clone
+
+    def _fetch_all(self):
+        fetching = self._result_cache is None and issubclass(
+            self._iterable_class, ModelIterable
+        )
+        paged = self.query.is_sliced and self.query.order_by
+        if fetching and self._two_phase and paged:
+            self._result_cache = self._fetch_page_by_ids()
+            self._prefetch_done = True
+        else:
+            super()._fetch_all()
+        if fetching and self._resolve_viewer_flags:
+            resolve_viewer_flags(self._result_cache, self._viewer)
+
+    def _fetch_page_by_ids(self):
+        """
+        Phase 1: select only the ordered page of IDs (plus annotation values,
+        e.g. pagination keys) without joins or prefetches.
+        Phase 2: load just those rows with related objects, in the same order.
+        """
+        annotations = list(self.query.annotation_select)
+
+        narrow = self._chain()
+        narrow.query.select_related = False
+        narrow._prefetch_related_lookups = ()
+        rows = list(narrow.values_list("pk", *annotations))
+        if not rows:
+            return []
+
+        hydrate = self.model._default_manager.filter(
+            pk__in=[row[0] for row in rows]
+        ).order_by()
+        hydrate.query.select_related = self.query.select_related
+        hydrate.query.deferred_loading = self.query.deferred_loading
+        hydrate = hydrate.prefetch_related(*self._prefetch_related_lookups)
+        by_id = {obj.pk: obj for obj in hydrate}
+
+        results = []
+        for pk, *values in rows:
+            obj = by_id.get(pk)
+            if obj is None:
+                # Deleted between the two phases.
+                continue
+            for name, value in zip(annotations, values):
+                setattr(obj, name, value)
+            results.append(obj)
+        return results
+
+    def two_phase(self):
+        """
+        Fetch sliced, ordered results in two steps: first the page of IDs from
+        a narrow index scan, then only those posts with their relations.
+        Keeps joins and prefetches off the rows the database has to sort.
+        """
+        clone = self._chain()
+        clone._two_phase = True
+        return clone
+
     def by_user(self, user):
         """Get posts by a specific user."""
         return self.filter(author=user)
 
     def with_counts(self):
         """
-        Annotate posts with reaction, comment, and repost counts.
-        Solves N+1 query problem for count properties.
-        """
-        return self.annotate(
-            reactions_count=Count("reactions", distinct=True),
-            comments_count=Count("comments", distinct=True),
-            reposts_count=Count(
-                "reposts",
-                filter=Q(reposts__body="") | Q(reposts__body__isnull=True),
-                distinct=True,
-            ),
-            quotes_count=Count(
-                "reposts",
-                filter=~Q(reposts__body="") & ~Q(reposts__body__isnull=True),
-                distinct=True,
-            ),
-        )
+        Reaction, comment, repost and quote counts are stored on the post
+        itself and kept in sync by ``apps.feed.signals``, so no aggregation
+        is needed. Kept for API compatibility with existing callers.
+        """
+        return self
 
-    def with_user_interactions(self, user):
+    def rebuild_counters(self):
         """
-        Annotate whether the given user has liked or bookmarked each post.
-        Returns: is_liked (bool), is_bookmarked (bool)
+        Recompute the stored counters from the underlying rows.
+        Returns the number of posts updated.
         """
-        if not user or not user.is_authenticated:
-            return self.annotate(
-                is_liked=models.Value(False, output_field=models.BooleanField()),
-                is_reposted=models.Value(False, output_field=models.BooleanField()),
-                is_bookmarked=models.Value(False, output_field=models.BooleanField()),
+        from apps.feed.models import Comment, Reaction
+
+        def count_of(model, fk, condition=Q()):
+            subquery = (
+                model.objects.filter(condition, **{fk: OuterRef("pk")})
+                .order_by()
+                .values(fk)
+                .annotate(total=Count("pk"))
+                .values("total")
             )
-
-        from apps.feed.models import Bookmark, Post, Reaction
-
-        return self.annotate(
-            is_liked=Exists(Reaction.objects.filter(post=OuterRef("pk"), user=user)),
-            is_bookmarked=Exists(
-                Bookmark.objects.filter(post=OuterRef("pk"), user=user)
-            ),
-            is_reposted=Exists(
-                Post.objects.filter(parent=OuterRef("pk"), author=user, body="")
-                | Post.objects.filter(
-                    parent=OuterRef("pk"), author=user, body__isnull=True
-                )
-            ),
+            return Coalesce(Subquery(subquery, output_field=IntegerField()), 0)
+
+        share = Q(body="") | Q(body__isnull=True)
+        return self.update(
+            reactions_count=count_of(Reaction, "post"),
+            comments_count=count_of(Comment, "post"),
+            reposts_count=count_of(self.model, "parent", share),
+            quotes_count=count_of(self.model, "parent", ~share),
         )
 
+    def with_user_interactions(self, user):
+        """
+        Resolve whether the given user has liked, bookmarked, reposted or
+        quoted each post (and its parent) once the page is fetched.
+        Uses one ``post_id IN (...)`` query per interaction table instead of
+        per-row subqueries. See ``apps.feed.interactions``.
+        Returns: is_liked, is_bookmarked, is_reposted, is_quoted (bool)
+        """
+        clone = self._chain()
+        clone._viewer = user
+        clone._resolve_viewer_flags = True
+        return clone
+
     def with_author(self):
         """Prefetch author to avoid additional queries."""
         return self.select_related("author")
 
     def with_parent(self, user=None):
         """
-        Prefetch parent post with counts and user interactions.
-        """
-        # Build the parent queryset with annotations
-        parent_qs = self.model.objects.select_related("author").annotate(
-            reactions_count=Count("reactions", distinct=True),
-            comments_count=Count("comments", distinct=True),
-            reposts_count=Count(
-                "reposts",
-                filter=Q(reposts__body="") | Q(reposts__body__isnull=True),
-                distinct=True,
-            ),
-            quotes_count=Count(
-                "reposts",
-                filter=~Q(reposts__body="") & ~Q(reposts__body__isnull=True),
-                distinct=True,
-            ),
-        )
-
-        from apps.feed.models import Bookmark, Post, Reaction
-
-        # Add user interactions if user provided
-        if user and user.is_authenticated:
-
-            parent_qs = parent_qs.annotate(
-                is_liked=Exists(
-                    Reaction.objects.filter(post=OuterRef("pk"), user=user)
-                ),
-                is_bookmarked=Exists(
-                    Bookmark.objects.filter(post=OuterRef("pk"), user=user)
-                ),
-                is_reposted=Exists(
-                    Post.objects.filter(parent=OuterRef("pk"), author=user).filter(
-                        Q(body="") | Q(body__isnull=True)
-                    )
-                ),
-                is_quoted=Exists(
-                    Post.objects.filter(parent=OuterRef("pk"), author=user).exclude(
-                        Q(body="") | Q(body__isnull=True)
-                    )
-                ),
-            )
-        else:
-            parent_qs = parent_qs.annotate(
-                is_liked=models.Value(False, output_field=models.BooleanField()),
-                is_bookmarked=models.Value(False, output_field=models.BooleanField()),
-                is_reposted=models.Value(False, output_field=models.BooleanField()),
-                is_quoted=models.Value(False, output_field=models.BooleanField()),
-            )
-
-        # Use Prefetch to replace parent relationship with annotated queryset
+        Prefetch parent post with its author.
+        Viewer flags for parents are resolved together with the posts
+        by ``with_user_interactions()``.
+        """
+        parent_qs = self.model.objects.select_related("author")
         return self.prefetch_related(Prefetch("parent", queryset=parent_qs))
 
     def with_full_details(self, user=None):
         """
         Full optimization for post detail/feed views.
         Includes: author, parent, counts, user interactions.
+        Paginated results are loaded with ``two_phase()``.
         """
-        qs = self.with_author().with_counts()
-
-        # Add parent with its own counts/interactions
-        if user:
-            qs = qs.with_parent(user).with_user_interactions(user)
-        else:
-            qs = qs.with_parent()
-
-        return qs
+        return (
+            self.two_phase()
+            .with_author()
+            .with_counts()
+            .with_parent(user)
+            .with_user_interactions(user)
+        )
 
-    def feed_for_user(self, user):
+    def keys_only(self):
+        """
+        Undo ``with_full_details()``: no joins, prefetches or viewer flags and
+        only the primary key loaded. Used to find which posts a page holds
+        without loading them.
+        """
+        clone = self._chain()
+        clone._two_phase = False
+        clone._resolve_viewer_flags = False
+        clone._viewer = None
+        clone.query.select_related = False
+        clone._prefetch_related_lookups = ()
+        return clone.only("pk")
+
+    def feed_for_user(self, user, since=None):
         """
-        Optimized feed query for a specific user's following.
-        Use this for the "Following" feed view.
+        "Following" feed read from the user's materialized timeline inbox.
+        Entries are written on post/follow (see ``apps.feed.timeline``), so this
+        is a range scan over ``(user, -created_date)`` followed by hydration.
+        Posts of followed high fan-out authors, which are not written to the
+        inbox, are merged in by the query itself; nothing is stored on read.
+        With ``since``, only posts created after that time are included.
         """
+        from apps.feed.models import TimelineEntry
+        from apps.feed.timeline import high_fanout_authors
+
+        author_ids = high_fanout_authors(user)
+        if not author_ids:
+            entries = {"timeline_entries__user": user}
+            if since is not None:
+                entries["timeline_entries__created_date__gt"] = since
+            return (
+                self.filter(**entries)
+                .with_full_details(user)
+                .order_by("-timeline_entries__created_date")
+            )
 
-        followed_users = Follow.objects.filter(follower=user).values_list(
-            "followed", flat=True
-        )
+        inbox = TimelineEntry.objects.filter(user=user).values("post_id")
+        posts = self.filter(Q(pk__in=inbox) | Q(author_id__in=author_ids))
+        if since is not None:
+            posts = posts.filter(created_date__gt=since)
+        return posts.with_full_details(user).order_by("-created_date")
 
-        return (
-            self.filter(author__in=followed_users)
-            .with_full_details(user)
-            .order_by("-created_date")
-        )
+    def hydrate(self, ids, user=None):
+        """
+        Load full details for the given post IDs, preserving their order.
+        IDs that no longer exist are skipped.
+        """
+        ids = list(ids)
+        posts = self.filter(pk__in=ids).with_full_details(user)
+        by_id = {post.pk: post for post in posts}
+        return [by_id[pk] for pk in ids if pk in by_id]
 
     def bookmarked_by(self, user):
         """Get posts bookmarked by a specific user, ordered by bookmark date."""
@@ -164,6 +226,12 @@ class PostManager(models.Manager):
     def with_counts(self):
         return self.get_queryset().with_counts()
 
+    def rebuild_counters(self):
+        return self.get_queryset().rebuild_counters()
+
+    def two_phase(self):
+        return self.get_queryset().two_phase()
+
     def with_user_interactions(self, user):
         return self.get_queryset().with_user_interactions(user)
 
@@ -176,8 +244,14 @@ class PostManager(models.Manager):
     def with_full_details(self, user=None):
         return self.get_queryset().with_full_details(user)
 
-    def feed_for_user(self, user):
-        return self.get_queryset().feed_for_user(user)
+    def keys_only(self):
+        return self.get_queryset().keys_only()
+
+    def feed_for_user(self, user, since=None):
+        return self.get_queryset().feed_for_user(user, since)
+
+    def hydrate(self, ids, user=None):
+        return self.get_queryset().hydrate(ids, user)
 
     def bookmarked_by(self, user):
         return self.get_queryset().bookmarked_by(user)
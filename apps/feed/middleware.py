@@ -0,0 +1,30 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from apps.feed.interactions import interaction_scope
+
+
+class InteractionContextMiddleware:
+    """
+    Scope viewer interaction lookups (see ``apps.feed.interactions``) to a
+    single request, so a rendered page resolves them once and template
+    filters answer from memory.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with interaction_scope():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with interaction_scope():
+            return await self.get_response(request)
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.3 on 2026-10-16 23:52
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count(model, fk, condition=Q()):
+    subquery = (
+        model.objects.filter(condition, **{fk: OuterRef("pk")})
+        .order_by()
+        .values(fk)
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    return Coalesce(Subquery(subquery, output_field=IntegerField()), 0)
+
+
+def backfill_counters(apps, schema_editor):
+    Post = apps.get_model("feed", "Post")
+    Reaction = apps.get_model("feed", "Reaction")
+    Comment = apps.get_model("feed", "Comment")
+
+    share = Q(body="") | Q(body__isnull=True)
+    Post.objects.update(
+        reactions_count=_count(Reaction, "post"),
+        comments_count=_count(Comment, "post"),
+        reposts_count=_count(Post, "parent", share),
+        quotes_count=_count(Post, "parent", ~share),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of comments on the post (maintained by signals).'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='quotes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of quotes of the post (maintained by signals).'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='reactions_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of reactions on the post (maintained by signals).'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='reposts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of pure reposts of the post (maintained by signals).'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
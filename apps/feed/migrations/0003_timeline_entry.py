@@ -0,0 +1,65 @@
+# Generated by Django 5.2.3 on 2026-10-16 23:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# TIMELINE_MAX_LENGTH when this migration was written; migrations must not
+# depend on the settings of whichever deploy happens to run them.
+TIMELINE_MAX_LENGTH = 800
+
+
+def backfill_timelines(apps, schema_editor):
+    """Build every inbox from existing follows, like ``rebuild_timeline()``."""
+    Follow = apps.get_model("accounts", "Follow")
+    Post = apps.get_model("feed", "Post")
+    TimelineEntry = apps.get_model("feed", "TimelineEntry")
+
+    follower_ids = (
+        Follow.objects.order_by("follower_id")
+        .values_list("follower_id", flat=True)
+        .distinct()
+    )
+    for user_id in follower_ids.iterator():
+        followed_ids = Follow.objects.filter(follower_id=user_id).values("followed_id")
+        posts = (
+            Post.objects.filter(author__in=followed_ids)
+            .order_by("-created_date")
+            .values_list("pk", "created_date")[:TIMELINE_MAX_LENGTH]
+        )
+        TimelineEntry.objects.bulk_create(
+            [
+                TimelineEntry(user_id=user_id, post_id=post_id, created_date=created)
+                for post_id, created in posts
+            ],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('feed', '0002_post_engagement_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_date', models.DateTimeField(help_text='Creation time of the post, copied for index-only ordering.')),
+                ('post', models.ForeignKey(help_text="Post delivered to the user's feed.", on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='feed.post')),
+                ('user', models.ForeignKey(help_text='User whose Following feed contains the post.', on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Timeline Entry',
+                'verbose_name_plural': 'Timeline Entries',
+                'ordering': ['-created_date'],
+                'indexes': [models.Index(fields=['user', '-created_date'], name='feed_timeli_user_id_f06252_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'post'), name='unique_timeline_entry')],
+            },
+        ),
+        migrations.RunPython(backfill_timelines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-16 23:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0003_timeline_entry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-created_date', '-id'], name='feed_post_created_453399_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+def install(apps, schema_editor):
+    from apps.feed.search import install_search_index
+
+    install_search_index(schema_editor.connection)
+
+
+def remove(apps, schema_editor):
+    from apps.feed.search import remove_search_index
+
+    remove_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("feed", "0004_post_created_date_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(install, remove),
+    ]
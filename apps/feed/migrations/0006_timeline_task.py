@@ -0,0 +1,28 @@
+# Generated by Django 5.2.3 on 2026-10-17 01:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0005_post_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.CharField(help_text='Dotted path of the function to call.', max_length=200)),
+                ('args', models.JSONField(default=list, help_text='Positional arguments.')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, help_text='Number of failed runs.')),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Timeline Task',
+                'verbose_name_plural': 'Timeline Tasks',
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -1,5 +1,5 @@
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
 
 from apps.accounts.models import User
 from apps.core.models import ExtendedTimeStampedModel, TimeStampedModel
@@ -34,14 +34,42 @@ class Post(ExtendedTimeStampedModel):
         default=False,
         help_text="Mark the post as pinned to appear at the top of user's profile.",
     )
+    reactions_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Number of reactions on the post (maintained by signals).",
+    )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Number of comments on the post (maintained by signals).",
+    )
+    reposts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Number of pure reposts of the post (maintained by signals).",
+    )
+    quotes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Number of quotes of the post (maintained by signals).",
+    )
 
     objects = PostManager()
 
+    COUNTER_FIELDS = (
+        "reactions_count",
+        "comments_count",
+        "reposts_count",
+        "quotes_count",
+    )
+
     class Meta:
         verbose_name = "Post"
         verbose_name_plural = "Posts"
         ordering = ["-created_date"]
         indexes = [
+            models.Index(fields=["-created_date", "-id"]),
             models.Index(fields=["author", "-created_date"]),
             models.Index(fields=["parent", "-created_date"]),
             models.Index(fields=["author", "-is_pinned", "-created_date"]),
@@ -96,7 +124,17 @@ class Post(ExtendedTimeStampedModel):
 
     def save(self, *args, **kwargs):
         self.full_clean()
-        super().save(*args, **kwargs)
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            # Counters are only ever changed with F() updates; never write back
+            # the (possibly stale) in-memory values when editing a post.
+            kwargs["update_fields"] = [
+                f.name
+                for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.COUNTER_FIELDS
+            ]
+        # Keep the row write and the counter updates sent via post_save together.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     @property
     def is_original(self):
@@ -164,7 +202,9 @@ class Comment(ExtendedTimeStampedModel):
 
     def save(self, *args, **kwargs):
         self.full_clean()
-        super().save(*args, **kwargs)
+        # Keep the row write and the counter updates sent via post_save together.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
 
 class Reaction(TimeStampedModel):
@@ -201,7 +241,9 @@ class Reaction(TimeStampedModel):
 
     def save(self, *args, **kwargs):
         self.full_clean()
-        super().save(*args, **kwargs)
+        # Keep the row write and the counter updates sent via post_save together.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
 
 class Bookmark(TimeStampedModel):
@@ -242,3 +284,69 @@ class Bookmark(TimeStampedModel):
     def save(self, *args, **kwargs):
         self.full_clean()
         super().save(*args, **kwargs)
+
+
+class TimelineEntry(models.Model):
+    """
+    Materialized "Following" feed entry: one row per (reader, post) pair,
+    written when a followed user posts, reposts or quotes.
+    ``created_date`` mirrors the post's creation time so the inbox can be
+    read with a single range scan over ``(user, -created_date)``.
+    """
+
+    user = models.ForeignKey(
+        User,
+        related_name="timeline",
+        on_delete=models.CASCADE,
+        help_text="User whose Following feed contains the post.",
+    )
+    post = models.ForeignKey(
+        Post,
+        related_name="timeline_entries",
+        on_delete=models.CASCADE,
+        help_text="Post delivered to the user's feed.",
+    )
+    created_date = models.DateTimeField(
+        help_text="Creation time of the post, copied for index-only ordering."
+    )
+
+    class Meta:
+        verbose_name = "Timeline Entry"
+        verbose_name_plural = "Timeline Entries"
+        ordering = ["-created_date"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "post"], name="unique_timeline_entry"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["user", "-created_date"]),
+        ]
+
+    def __str__(self):
+        return f"Post #{self.post_id} in @{self.user}'s timeline"
+
+
+class TimelineTask(models.Model):
+    """
+    Timeline task (fan-out, backfill, ...) waiting to run. Stored in the
+    transaction of the write that caused it and deleted once it ran, so work
+    lost with a worker is picked up again by ``run_timeline_tasks``.
+    """
+
+    task = models.CharField(
+        max_length=200, help_text="Dotted path of the function to call."
+    )
+    args = models.JSONField(default=list, help_text="Positional arguments.")
+    attempts = models.PositiveSmallIntegerField(
+        default=0, help_text="Number of failed runs."
+    )
+    created_date = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Timeline Task"
+        verbose_name_plural = "Timeline Tasks"
+        ordering = ["id"]
+
+    def __str__(self):
+        return f"{self.task}{tuple(self.args)!r}"
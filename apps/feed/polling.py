@@ -0,0 +1,88 @@
+"""
+"New posts since" checks for the Following feed.
+
+A client showing the feed remembers its top post and asks whether anything
+newer arrived. The check is a range scan over the reader's timeline inbox
+index ``(user, -created_date)`` that never touches the posts themselves, plus
+one over ``(author, -created_date)`` for followed high fan-out authors, so it
+stays cheap while nothing changed. Checks only read.
+
+Waiting for new posts (long polling) repeats the check every
+``TIMELINE_POLL_INTERVAL`` seconds, but only after the content version (see
+``apps.core.versions``) moved: new posts and completed fan-outs bump it, so
+an idle wait costs one cache read per interval. The wait sleeps on the event
+loop, so it is only offered by the async ``new_posts`` view under ASGI; a
+sync worker never sleeps on a poll.
+"""
+
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from apps.core.versions import get_versions
+from apps.feed.models import Post, TimelineEntry
+from apps.feed.timeline import high_fanout_authors
+
+
+def since_date(post_id):
+    """Return the creation time of post ``post_id``, or None if it is gone."""
+    return (
+        Post.objects.filter(pk=post_id).values_list("created_date", flat=True).first()
+    )
+
+
+def new_post_ids(user, since, limit):
+    """
+    Return IDs of the newest posts (at most ``limit`` per source) in
+    ``user``'s Following feed created after ``since``: inbox entries plus
+    posts of high fan-out authors, which are merged at read time.
+    """
+    post_ids = set(
+        TimelineEntry.objects.filter(user=user, created_date__gt=since)
+        .order_by("-created_date")
+        .values_list("post_id", flat=True)[:limit]
+    )
+    author_ids = high_fanout_authors(user)
+    if author_ids:
+        post_ids.update(
+            Post.objects.filter(author__in=author_ids, created_date__gt=since)
+            .order_by("-created_date")
+            .values_list("pk", flat=True)[:limit]
+        )
+    return post_ids
+
+
+def has_new_posts(user, since):
+    """Return whether ``user``'s Following feed has posts newer than ``since``."""
+    return bool(new_post_ids(user, since, 1))
+
+
+def new_posts_status(user, since):
+    """
+    Return ``{"count": ..., "has_more": ...}`` for the posts newer than
+    ``since``, counting at most ``TIMELINE_NEW_POSTS_LIMIT``.
+    """
+    limit = settings.TIMELINE_NEW_POSTS_LIMIT
+    count = len(new_post_ids(user, since, limit + 1))
+    return {"count": min(count, limit), "has_more": count > limit}
+
+
+async def await_new_posts(user, since, wait):
+    """
+    Return True as soon as ``user``'s Following feed has posts newer than
+    ``since``, or False once ``wait`` seconds passed without any.
+    """
+    deadline = time.monotonic() + wait
+    seen = None
+    while True:
+        content, _viewer = await sync_to_async(get_versions)()
+        if content != seen:
+            seen = content
+            if await sync_to_async(has_new_posts)(user, since):
+                return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        await asyncio.sleep(min(settings.TIMELINE_POLL_INTERVAL, remaining))
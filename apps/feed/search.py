@@ -0,0 +1,267 @@
+"""
+Full-text search over post bodies.
+
+The index lives in the database and is kept in sync by the database itself,
+so every write path (views, API, admin, bulk updates, cascades) is covered:
+
+- PostgreSQL: a generated ``search_vector tsvector`` column on ``feed_post``
+  with a GIN index; results are ranked with ``ts_rank``.
+- SQLite: an external-content FTS5 table, ``feed_post_fts``, maintained by
+  insert/update/delete triggers on ``feed_post``; results are ranked with
+  ``bm25``.
+
+Pages are selected by a ``(score, id)`` keyset cursor, where a lower score
+is a better match, and then hydrated with ``Post.objects.hydrate``.
+
+Other databases have no index: every word must appear in the body
+(``icontains``), all matches score the same and the newest come first.
+
+SQLite drops triggers when Django rebuilds ``feed_post`` during a later
+migration; ``ensure_search_index`` runs after every ``migrate`` to restore
+them and ``rebuild_search_index`` re-indexes from scratch.
+"""
+
+import base64
+import json
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Value
+
+from apps.core.pagination import InvalidCursor, KeysetPage
+
+POSTGRES_INSTALL = [
+    """
+    ALTER TABLE feed_post ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (to_tsvector('english', coalesce(body, ''))) STORED
+    """,
+    "CREATE INDEX feed_post_search_idx ON feed_post USING GIN (search_vector)",
+]
+POSTGRES_REMOVE = [
+    "DROP INDEX IF EXISTS feed_post_search_idx",
+    "ALTER TABLE feed_post DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_INSTALL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS feed_post_fts USING fts5(
+        body, content='feed_post', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS feed_post_fts_insert AFTER INSERT ON feed_post
+    BEGIN
+        INSERT INTO feed_post_fts (rowid, body) VALUES (new.id, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS feed_post_fts_delete AFTER DELETE ON feed_post
+    BEGIN
+        INSERT INTO feed_post_fts (feed_post_fts, rowid, body)
+        VALUES ('delete', old.id, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS feed_post_fts_update AFTER UPDATE OF body ON feed_post
+    BEGIN
+        INSERT INTO feed_post_fts (feed_post_fts, rowid, body)
+        VALUES ('delete', old.id, old.body);
+        INSERT INTO feed_post_fts (rowid, body) VALUES (new.id, new.body);
+    END
+    """,
+]
+SQLITE_TRIGGERS = (
+    "feed_post_fts_insert",
+    "feed_post_fts_delete",
+    "feed_post_fts_update",
+)
+SQLITE_REBUILD = "INSERT INTO feed_post_fts (feed_post_fts) VALUES ('rebuild')"
+SQLITE_REMOVE = [
+    "DROP TRIGGER IF EXISTS feed_post_fts_insert",
+    "DROP TRIGGER IF EXISTS feed_post_fts_delete",
+    "DROP TRIGGER IF EXISTS feed_post_fts_update",
+    "DROP TABLE IF EXISTS feed_post_fts",
+]
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+# ============================================================================
+# INDEX MANAGEMENT
+# ============================================================================
+
+
+def _execute(conn, statements):
+    with conn.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def install_search_index(conn):
+    """Create the search index for the connection's database and fill it."""
+    if conn.vendor == "postgresql":
+        _execute(conn, POSTGRES_INSTALL)
+    elif conn.vendor == "sqlite":
+        _execute(conn, SQLITE_INSTALL + [SQLITE_REBUILD])
+
+
+def remove_search_index(conn):
+    if conn.vendor == "postgresql":
+        _execute(conn, POSTGRES_REMOVE)
+    elif conn.vendor == "sqlite":
+        _execute(conn, SQLITE_REMOVE)
+
+
+def rebuild_search_index(conn):
+    """Re-index every post (SQLite); PostgreSQL only needs its index rebuilt."""
+    if conn.vendor == "postgresql":
+        _execute(conn, ["REINDEX INDEX feed_post_search_idx"])
+    elif conn.vendor == "sqlite":
+        _execute(conn, SQLITE_INSTALL + [SQLITE_REBUILD])
+
+
+def ensure_search_index(conn):
+    """Restore the SQLite triggers if a table rebuild dropped them."""
+    if conn.vendor != "sqlite":
+        return
+    names = ("feed_post_fts",) + SQLITE_TRIGGERS
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name IN (%s, %s, %s, %s)", names
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+    if "feed_post_fts" in existing and len(existing) < len(names):
+        rebuild_search_index(conn)
+
+
+# ============================================================================
+# QUERIES
+# ============================================================================
+
+
+def _sqlite_match(query):
+    """Turn free text into an FTS5 query that requires every word."""
+    return " ".join(f'"{word}"' for word in WORD_RE.findall(query))
+
+
+def _matches_sql(conn, query):
+    """
+    Return ``(sql, params)`` selecting ``id, score`` for every post matching
+    ``query``, or None when the query has no searchable words.
+    """
+    if conn.vendor == "postgresql":
+        if not WORD_RE.search(query):
+            return None
+        return (
+            "SELECT p.id, -ts_rank(p.search_vector, q)::double precision AS score "
+            "FROM feed_post p, websearch_to_tsquery('english', %s) q "
+            "WHERE p.search_vector @@ q",
+            [query],
+        )
+    if conn.vendor == "sqlite":
+        match = _sqlite_match(query)
+        if not match:
+            return None
+        return (
+            "SELECT rowid AS id, bm25(feed_post_fts) AS score "
+            "FROM feed_post_fts WHERE feed_post_fts MATCH %s",
+            [match],
+        )
+
+    from apps.feed.models import Post
+
+    words = WORD_RE.findall(query)
+    if not words:
+        return None
+    posts = Post.objects.order_by()
+    for word in words:
+        posts = posts.filter(body__icontains=word)
+    posts = posts.annotate(score=Value(0.0, output_field=FloatField()))
+    return posts.values_list("id", "score").query.sql_with_params()
+
+
+class PostSearchPaginator:
+    """
+    Rank posts matching ``query`` and paginate them by ``(score, id)``.
+    Exposes the same ``page()``/``get_page()`` interface as ``KeysetPaginator``.
+
+    Example:
+        page = PostSearchPaginator("django orm", user=request.user).page(cursor)
+    """
+
+    def __init__(self, query, user=None, per_page=10):
+        self.query = query.strip()
+        self.user = user
+        self.per_page = per_page
+
+    def _fetch(self, after=None, reverse=False):
+        matches = _matches_sql(connection, self.query)
+        if matches is None:
+            return []
+
+        match_sql, params = matches
+        sql = f"SELECT id, score FROM ({match_sql}) matches"
+        params = list(params)
+        if after is not None:
+            # Forward: worse score, or same score and older post.
+            op, id_op = ("<", ">") if reverse else (">", "<")
+            sql += f" WHERE score {op} %s OR (score = %s AND id {id_op} %s)"
+            params += [after[0], after[0], after[1]]
+        if reverse:
+            sql += " ORDER BY score DESC, id ASC LIMIT %s"
+        else:
+            sql += " ORDER BY score ASC, id DESC LIMIT %s"
+        params.append(self.per_page + 1)
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def _hydrate(self, rows):
+        from apps.feed.models import Post
+
+        scores = dict(rows)
+        posts = Post.objects.hydrate(scores, self.user)
+        for post in posts:
+            post.search_score = scores[post.pk]
+        return posts
+
+    # ------------------------------------------------------------------
+    # Cursor encoding
+    # ------------------------------------------------------------------
+
+    def encode_cursor(self, post, reverse=False):
+        payload = json.dumps({"s": post.search_score, "i": post.pk, "r": reverse})
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            return (float(payload["s"]), int(payload["i"])), bool(payload["r"])
+        except Exception as exc:
+            raise InvalidCursor("Invalid cursor.") from exc
+
+    # ------------------------------------------------------------------
+    # Pages
+    # ------------------------------------------------------------------
+
+    def page(self, cursor=None):
+        """Return the page of results after (or before) ``cursor``."""
+        after, reverse = self.decode_cursor(cursor) if cursor else (None, False)
+        rows = self._fetch(after, reverse)
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+
+        if reverse:
+            rows.reverse()
+            return KeysetPage(self._hydrate(rows), self, True, has_more)
+        return KeysetPage(self._hydrate(rows), self, has_more, after is not None)
+
+    def get_page(self, cursor=None):
+        """Like ``page()``, but fall back to the first page on a bad cursor."""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
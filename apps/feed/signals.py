@@ -0,0 +1,250 @@
+"""
+Signal handlers that keep denormalized feed data in sync:
+
+- the engagement counters on ``Post`` (``reactions_count``, ``comments_count``,
+  ``reposts_count``, ``quotes_count``), always updated with ``F()`` expressions
+  and published to live streams (see ``apps.feed.live``);
+- the authors' ``posts_count`` and ``likes_count`` in ``UserStats``
+  (see ``apps.accounts.stats``);
+- the materialized Following timeline (see ``apps.feed.timeline``; follows
+  are handled in ``apps.accounts.signals``);
+- the content and viewer versions that validate conditional responses
+  and the page versions of the anonymous page cache (see
+  ``apps.core.versions`` and ``apps.core.page_cache``).
+
+Handlers listen to ``post_save``/``post_delete`` so every write path is
+covered: web views, API viewsets, the admin and cascading deletes. Rows
+inserted with ``bulk_create`` send no signals; the batch endpoints call the
+same ``*_changed`` functions the handlers use instead.
+"""
+
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from apps.accounts.stats import bump_stats
+from apps.core.page_cache import FEED_PAGES, POST_PAGES, USER_PAGES
+from apps.core.versions import pages_changed, versions_changed
+from apps.feed import live, timeline
+from apps.feed.models import Bookmark, Comment, Post, Reaction
+
+
+def _is_share(body):
+    """Return True if a post body denotes a pure repost (no text)."""
+    return not body
+
+
+def bump_counter(post_ids, field, delta):
+    """
+    Atomically add ``delta`` to ``field`` on a post (one ID or several),
+    never going below zero.
+    """
+    if isinstance(post_ids, int):
+        post_ids = [post_ids]
+    post_ids = [post_id for post_id in post_ids if post_id]
+    if not post_ids or not delta:
+        return
+    Post.objects.filter(pk__in=post_ids).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
+    live.counters_changed(post_ids, field)
+    _counter_pages_changed(post_ids)
+
+
+def _counter_pages_changed(post_ids):
+    """
+    Refresh the cached anonymous pages that show the posts' counters: the
+    feed, the posts' own pages and their authors' profiles.
+    """
+    authors = set(
+        Post.objects.filter(pk__in=post_ids).values_list("author__username", flat=True)
+    )
+    pages_changed(
+        FEED_PAGES,
+        *(POST_PAGES.format(post_id=post_id) for post_id in post_ids),
+        *(USER_PAGES.format(username=username) for username in authors),
+    )
+
+
+def _share_counter(body):
+    return "reposts_count" if _is_share(body) else "quotes_count"
+
+
+# ============================================================================
+# REACTIONS
+# ============================================================================
+
+
+def reactions_changed(user_id, post_ids, delta):
+    """
+    Side effects of ``user_id`` liking (``delta`` 1) or unliking (-1)
+    ``post_ids``: the posts' counters, the user's ``likes_count`` and the
+    response versions. Shared by the handlers below and by the batch
+    endpoint (see ``apps.feed.bulk``), whose inserts send no signals.
+    """
+    post_ids = list(post_ids)
+    if not post_ids:
+        return
+    bump_counter(post_ids, "reactions_count", delta)
+    bump_stats(user_id, "likes_count", delta * len(post_ids))
+    versions_changed(user_id)
+
+
+@receiver(post_save, sender=Reaction, dispatch_uid="feed_reaction_created")
+def reaction_created(sender, instance, created, **kwargs):
+    if created:
+        reactions_changed(instance.user_id, [instance.post_id], 1)
+
+
+@receiver(post_delete, sender=Reaction, dispatch_uid="feed_reaction_deleted")
+def reaction_deleted(sender, instance, **kwargs):
+    reactions_changed(instance.user_id, [instance.post_id], -1)
+
+
+# ============================================================================
+# BOOKMARKS
+# ============================================================================
+
+
+def bookmarks_changed(user_id):
+    """Side effects of ``user_id`` adding or removing bookmarks."""
+    # Bookmarks are private: only the bookmarking user's responses change.
+    versions_changed(user_id, content=False)
+
+
+@receiver(post_save, sender=Bookmark, dispatch_uid="feed_bookmark_created")
+def bookmark_created(sender, instance, created, **kwargs):
+    if created:
+        bookmarks_changed(instance.user_id)
+
+
+@receiver(post_delete, sender=Bookmark, dispatch_uid="feed_bookmark_deleted")
+def bookmark_deleted(sender, instance, **kwargs):
+    bookmarks_changed(instance.user_id)
+
+
+# ============================================================================
+# COMMENTS
+# ============================================================================
+
+
+@receiver(post_save, sender=Comment, dispatch_uid="feed_comment_created")
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        bump_counter(instance.post_id, "comments_count", 1)
+
+
+@receiver(post_delete, sender=Comment, dispatch_uid="feed_comment_deleted")
+def comment_deleted(sender, instance, **kwargs):
+    bump_counter(instance.post_id, "comments_count", -1)
+
+
+# ============================================================================
+# AUTHOR STATS
+# ============================================================================
+
+
+@receiver(post_save, sender=Post, dispatch_uid="feed_post_stats_created")
+def post_stats_created(sender, instance, created, **kwargs):
+    if created:
+        bump_stats(instance.author_id, "posts_count", 1)
+
+
+@receiver(post_delete, sender=Post, dispatch_uid="feed_post_stats_deleted")
+def post_stats_deleted(sender, instance, **kwargs):
+    bump_stats(instance.author_id, "posts_count", -1)
+
+
+# ============================================================================
+# REPOSTS & QUOTES
+# ============================================================================
+
+
+@receiver(pre_save, sender=Post, dispatch_uid="feed_post_share_type")
+def remember_share_type(sender, instance, **kwargs):
+    """
+    Record the stored body of an existing repost/quote before it is edited,
+    so a quote edited down to an empty body moves between counters.
+    """
+    instance._stored_body = None
+    if instance.parent_id and not instance._state.adding:
+        instance._stored_body = (
+            Post.objects.filter(pk=instance.pk).values_list("body", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Post, dispatch_uid="feed_post_shared")
+def post_shared(sender, instance, created, **kwargs):
+    if not instance.parent_id:
+        return
+
+    if created:
+        bump_counter(instance.parent_id, _share_counter(instance.body), 1)
+        return
+
+    stored_body = getattr(instance, "_stored_body", None)
+    if _is_share(stored_body) != _is_share(instance.body):
+        bump_counter(instance.parent_id, _share_counter(stored_body), -1)
+        bump_counter(instance.parent_id, _share_counter(instance.body), 1)
+
+
+@receiver(post_delete, sender=Post, dispatch_uid="feed_post_unshared")
+def post_unshared(sender, instance, **kwargs):
+    if instance.parent_id:
+        bump_counter(instance.parent_id, _share_counter(instance.body), -1)
+
+
+# ============================================================================
+# FOLLOWING TIMELINE
+# ============================================================================
+
+
+@receiver(post_save, sender=Post, dispatch_uid="feed_post_fan_out")
+def post_fan_out(sender, instance, created, **kwargs):
+    if created:
+        timeline.dispatch(timeline.fan_out_post, instance.pk)
+
+
+# ============================================================================
+# RESPONSE VERSIONS
+# ============================================================================
+
+
+@receiver(post_save, sender=Post, dispatch_uid="feed_post_versions_saved")
+@receiver(post_delete, sender=Post, dispatch_uid="feed_post_versions_deleted")
+def post_changed(sender, instance, **kwargs):
+    versions_changed(instance.author_id)
+
+
+@receiver(post_save, sender=Comment, dispatch_uid="feed_comment_versions_saved")
+@receiver(post_delete, sender=Comment, dispatch_uid="feed_comment_versions_deleted")
+def comment_changed(sender, instance, **kwargs):
+    versions_changed()
+
+
+# ============================================================================
+# ANONYMOUS PAGES
+# ============================================================================
+
+
+@receiver(post_save, sender=Post, dispatch_uid="feed_post_pages_saved")
+def post_pages_saved(sender, instance, created, **kwargs):
+    if created:
+        pages_changed(
+            FEED_PAGES, USER_PAGES.format(username=instance.author.username)
+        )
+    else:
+        # Edited posts also show as parents of other posts, anywhere.
+        pages_changed(everywhere=True)
+
+
+@receiver(post_delete, sender=Post, dispatch_uid="feed_post_pages_deleted")
+def post_pages_deleted(sender, instance, **kwargs):
+    pages_changed(everywhere=True)
+
+
+@receiver(post_save, sender=Comment, dispatch_uid="feed_comment_pages_saved")
+@receiver(post_delete, sender=Comment, dispatch_uid="feed_comment_pages_deleted")
+def comment_pages_changed(sender, instance, **kwargs):
+    pages_changed(POST_PAGES.format(post_id=instance.post_id))
@@ -1,3 +1,1155 @@
-from django.test import TestCase
+import asyncio
+import json
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Exists, OuterRef, Q
+from django.http import Http404
+from django.template.loader import render_to_string
+from django.test import AsyncRequestFactory, RequestFactory, override_settings
+from django.test.signals import template_rendered
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from apps.accounts import async_views as account_async_views
+from apps.accounts import views as account_views
+from apps.accounts.models import Follow, User, UserStats
+from apps.core import page_cache
+from apps.core.pagination import InvalidCursor, KeysetPaginator
+from apps.core.templatetags import entry_tags
+from apps.core.testing import TestCase, TransactionTestCase, make_user
+from apps.feed import async_views, bulk, live, polling, timeline, views
+from apps.feed.api.serializers import NewPostsQuerySerializer, PostSerializer
+from apps.feed.interactions import (
+    VIEWER_FLAGS,
+    get_interaction_context,
+    interaction_scope,
+)
+from apps.feed.lookup import lookup_posts
+from apps.feed.search import PostSearchPaginator
+from apps.feed.views import COMMENTS_PAGE_SIZE
+from apps.feed.models import (
+    Bookmark,
+    Comment,
+    Post,
+    Reaction,
+    TimelineEntry,
+    TimelineTask,
+)
+
+
+class InteractionBatchTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user("reader")
+        self.author = make_user("author")
+        self.post = Post.objects.create(author=self.author, body="first")
+        self.other = Post.objects.create(author=self.author, body="second")
+
+    def apply(self, *operations):
+        results = bulk.apply_interactions(
+            self.user,
+            [{"action": action, "post": post_id} for action, post_id in operations],
+        )
+        return [result["status"] for result in results]
+
+    def reactions_count(self, post):
+        post.refresh_from_db(fields=["reactions_count"])
+        return post.reactions_count
+
+    def test_like_and_unlike(self):
+        statuses = self.apply(("like", self.post.pk), ("bookmark", self.other.pk))
+        self.assertEqual(statuses, [bulk.CREATED, bulk.CREATED])
+        self.assertEqual(self.reactions_count(self.post), 1)
+        self.assertTrue(Bookmark.objects.filter(user=self.user, post=self.other))
+        self.assertEqual(UserStats.objects.get(user=self.user).likes_count, 1)
+
+        statuses = self.apply(("like", self.post.pk), ("unlike", self.other.pk))
+        self.assertEqual(statuses, [bulk.UNCHANGED, bulk.UNCHANGED])
+
+        self.assertEqual(self.apply(("unlike", self.post.pk)), [bulk.DELETED])
+        self.assertEqual(self.reactions_count(self.post), 0)
+        self.assertEqual(UserStats.objects.get(user=self.user).likes_count, 0)
+
+    def test_batch_has_the_same_effects_as_single_writes(self):
+        def state(user, posts):
+            counters = [
+                Post.objects.values_list(*Post.COUNTER_FIELDS).get(pk=post.pk)
+                for post in posts
+            ]
+            stats = UserStats.objects.values(*UserStats.COUNTER_FIELDS).get(user=user)
+            return counters, stats
+
+        single = make_user("single")
+        posts, copies = (
+            [Post.objects.create(author=self.author, body=body) for body in "abc"]
+            for _ in range(2)
+        )
+        Reaction.objects.create(user=single, post=posts[0])
+        Reaction.objects.create(user=single, post=posts[1])
+        Bookmark.objects.create(user=single, post=posts[2])
+        Reaction.objects.filter(user=single, post=posts[1]).delete()
+
+        self.apply(
+            ("like", copies[0].pk), ("like", copies[1].pk), ("bookmark", copies[2].pk)
+        )
+        self.apply(("unlike", copies[1].pk))
+        self.assertEqual(state(self.user, copies), state(single, posts))
+
+    def test_invalid_operations_fail(self):
+        repost = Post.objects.create(author=self.user, parent=self.post, body="")
+        statuses = self.apply(
+            ("like", 999_999),
+            ("like", repost.pk),
+            ("like", self.post.pk),
+            ("unlike", self.post.pk),
+        )
+        self.assertEqual(
+            statuses, [bulk.FAILED, bulk.FAILED, bulk.CREATED, bulk.FAILED]
+        )
+
+    def test_concurrent_like_is_not_counted_twice(self):
+        insert = bulk.bulk_create_new
+
+        def racing_insert(model, objs):
+            # A single like lands between the existence check and the insert.
+            if model is Reaction:
+                Reaction.objects.create(user=self.user, post=self.post)
+            return insert(model, objs)
+
+        with mock.patch.object(bulk, "bulk_create_new", racing_insert):
+            statuses = self.apply(("like", self.post.pk), ("like", self.other.pk))
+
+        self.assertEqual(statuses, [bulk.UNCHANGED, bulk.CREATED])
+        self.assertEqual(self.reactions_count(self.post), 1)
+        self.assertEqual(self.reactions_count(self.other), 1)
+        self.assertEqual(UserStats.objects.get(user=self.user).likes_count, 2)
+
+    def test_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post(
+            "/api/posts/interactions/batch/",
+            {"operations": [{"action": "like", "post": self.post.pk}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"][0]["status"], bulk.CREATED)
+
+        response = client.post(
+            "/api/posts/interactions/batch/",
+            {"operations": [{"action": "smile", "post": self.post.pk}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class NewPostsTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user("reader")
+        self.author = make_user("author")
+        Follow.objects.create(follower=self.user, followed=self.author)
+        self.top = Post.objects.create(author=self.author, body="seen")
+        self.client.force_login(self.user)
+
+    def test_api_count_answers_right_away(self):
+        # Posts are fanned out to their followers' timelines on commit.
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(author=self.author, body="new")
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get(
+            "/api/posts/following/count/", {"since_id": self.top.pk, "wait": 25}
+        )
+        self.assertEqual(response.json(), {"count": 1, "has_more": False})
+
+    def test_api_checks_answer_304_while_nothing_changed(self):
+        def count(response):
+            data = response.json()
+            return data["count"] if "count" in data else len(data["results"])
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for url in ("/api/posts/following/count/", "/api/posts/following/"):
+            with self.subTest(url=url):
+                query = {"since_id": self.top.pk}
+                response = client.get(url, query)
+                self.assertEqual(count(response), 0)
+                etag = response.headers["ETag"]
+                with self.assertNumQueries(0):
+                    response = client.get(url, query, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+                with self.captureOnCommitCallbacks(execute=True):
+                    Post.objects.create(author=self.author, body="new")
+                response = client.get(url, query, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(count(response), 1)
+                Post.objects.filter(body="new").delete()
+
+    def test_query_resolves_the_top_post(self):
+        serializer = NewPostsQuerySerializer(data={"since_id": self.top.pk})
+        self.assertTrue(serializer.is_valid())
+        self.assertEqual(serializer.validated_data["since"], self.top.created_date)
+
+        for since_id, error in ((999_999, "Post not found."), (0, None), ("x", None)):
+            with self.subTest(since_id=since_id):
+                serializer = NewPostsQuerySerializer(data={"since_id": since_id})
+                self.assertFalse(serializer.is_valid())
+                self.assertIn("since_id", serializer.errors)
+                if error:
+                    self.assertEqual(serializer.errors["since_id"], [error])
+
+    @override_settings(TIMELINE_NEW_POSTS_LIMIT=2)
+    def test_page_check_counts_inbox_and_high_fanout_posts(self):
+        celebrity = make_user("celebrity")
+        Follow.objects.create(follower=self.user, followed=celebrity)
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(author=self.author, body="fanned out")
+        with override_settings(TIMELINE_FANOUT_MAX_FOLLOWERS=0):
+            Post.objects.create(author=celebrity, body="merged on read")
+            response = self.client.get(
+                "/feed/following/new/", {"since_id": self.top.pk}
+            )
+            self.assertEqual(
+                response.json(), {"count": 2, "has_more": False, "wait": 0}
+            )
+
+            Post.objects.create(author=celebrity, body="one more")
+            response = self.client.get(
+                "/feed/following/new/", {"since_id": self.top.pk}
+            )
+            self.assertEqual(response.json(), {"count": 2, "has_more": True, "wait": 0})
+
+    def test_no_wait_under_wsgi(self):
+        with mock.patch("apps.feed.polling.asyncio.sleep") as sleep:
+            response = self.client.get(
+                "/feed/following/new/", {"since_id": self.top.pk, "wait": 25}
+            )
+        sleep.assert_not_called()
+        self.assertEqual(response.json(), {"count": 0, "has_more": False, "wait": 0})
+
+    async def test_wait_under_asgi(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(
+            "/feed/following/new/", {"since_id": self.top.pk, "wait": 0.2}
+        )
+        self.assertEqual(
+            response.json(), {"count": 0, "has_more": False, "wait": 0.2}
+        )
+
+    def test_unknown_post_is_a_client_error(self):
+        response = self.client.get("/feed/following/new/", {"since_id": 999_999})
+        self.assertEqual(response.status_code, 400)
+        self.client.logout()
+        response = self.client.get("/feed/following/new/", {"since_id": self.top.pk})
+        self.assertEqual(response.status_code, 403)
+
+
+class LiveCountersTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = make_user("author")
+        self.post = Post.objects.create(author=self.author, body="hello")
+        self.other = Post.objects.create(author=self.author, body="other")
+        # Flushes are run by the tests rather than on the timer thread.
+        patcher = mock.patch.object(live.LocalBroker, "_run")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.broker = live.LocalBroker()
+        patcher = mock.patch.object(live, "_broker", self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def react(self, post):
+        user = make_user(f"fan{Reaction.objects.count()}")
+        with self.captureOnCommitCallbacks(execute=True):
+            Reaction.objects.create(user=user, post=post)
+
+    async def test_changes_are_coalesced_into_current_values(self):
+        subscription = self.broker.subscribe([self.post.pk])
+        await sync_to_async(self.react)(self.post)
+        await sync_to_async(self.react)(self.post)
+        # Nobody watches the other post; its change is not even recorded.
+        await sync_to_async(self.react)(self.other)
+        self.assertEqual(self.broker._changed, {self.post.pk: {"reactions_count"}})
+
+        await sync_to_async(self.broker.flush)()
+        event = await subscription.get(timeout=1)
+        self.assertEqual(event, {str(self.post.pk): {"reactions_count": 2}})
+        self.assertIsNone(await subscription.get(timeout=0.01))
+
+        subscription.close()
+        self.assertEqual(self.broker._subscribers, {})
+
+    def test_no_stream_under_wsgi(self):
+        response = self.client.get("/feed/posts/live/", {"ids": self.post.pk})
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.broker._subscribers, {})
+
+    @override_settings(LIVE_COUNTERS_HEARTBEAT=0.01)
+    async def test_stream_sends_counters_events_and_keep_alives(self):
+        response = await self.async_client.get(
+            "/feed/posts/live/", {"ids": f"{self.post.pk},{self.other.pk}"}
+        )
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b": keep-alive\n\n")
+
+        await sync_to_async(self.react)(self.other)
+        await sync_to_async(self.broker.flush)()
+        event = {str(self.other.pk): {"reactions_count": 1}}
+        self.assertEqual(
+            await anext(stream),
+            f"event: counters\ndata: {json.dumps(event)}\n\n".encode(),
+        )
+
+        # A client disconnect cancels the pending read, which ends the stream.
+        read = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        read.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await read
+        self.assertEqual(self.broker._subscribers, {})
+
+
+@override_settings(TIMELINE_MAX_LENGTH=2)
+class TimelineTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user("reader")
+        self.author = make_user("author")
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.create(follower=self.user, followed=self.author)
+
+    def timeline(self):
+        return list(
+            TimelineEntry.objects.filter(user=self.user).values_list(
+                "post_id", flat=True
+            )
+        )
+
+    def test_fan_out_trims_the_inbox(self):
+        posts = []
+        for body in ("one", "two", "three"):
+            with self.captureOnCommitCallbacks(execute=True):
+                posts.append(Post.objects.create(author=self.author, body=body))
+        self.assertEqual(self.timeline(), [posts[2].pk, posts[1].pk])
+
+    def test_trim_caps_every_inbox_of_a_batch(self):
+        other = make_user("other")
+        posts = [
+            Post.objects.create(author=self.author, body=body)
+            for body in ("one", "two", "three")
+        ]
+        entries = [(post.pk, post.created_date) for post in posts]
+        timeline._insert([self.user.pk, other.pk], entries)
+        timeline.trim_timelines([self.user.pk, other.pk])
+        self.assertEqual(self.timeline(), [posts[2].pk, posts[1].pk])
+        self.assertEqual(TimelineEntry.objects.filter(user=other).count(), 2)
+
+    @override_settings(TIMELINE_FANOUT_MAX_FOLLOWERS=0)
+    def test_high_fanout_posts_are_merged_on_read_without_writes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            seen = Post.objects.create(author=self.author, body="seen")
+            new = Post.objects.create(author=self.author, body="new")
+
+        self.assertEqual(self.timeline(), [])
+        feed = Post.objects.feed_for_user(self.user)
+        self.assertEqual([post.pk for post in feed], [new.pk, seen.pk])
+        self.assertEqual(
+            polling.new_posts_status(self.user, seen.created_date),
+            {"count": 1, "has_more": False},
+        )
+        self.assertEqual(self.timeline(), [])
+
+    def test_lost_tasks_are_retried(self):
+        with mock.patch.object(timeline, "run_task"):
+            with self.captureOnCommitCallbacks(execute=True):
+                post = Post.objects.create(author=self.author, body="lost")
+        self.assertEqual(self.timeline(), [])
+
+        call_command("run_timeline_tasks", min_age=0, stdout=StringIO())
+        self.assertEqual(self.timeline(), [post.pk])
+        self.assertFalse(TimelineTask.objects.exists())
+
+    def test_failed_tasks_are_kept(self):
+        with mock.patch.object(timeline, "trim_timelines", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                with self.captureOnCommitCallbacks(execute=True):
+                    Post.objects.create(author=self.author, body="failed")
+        self.assertEqual(TimelineTask.objects.get().attempts, 1)
+        self.assertEqual(timeline.retry_tasks(min_age=0, max_attempts=1), (0, 0))
+        self.assertEqual(timeline.retry_tasks(min_age=0, max_attempts=2), (1, 0))
+
+
+class AsyncPageTests(TransactionTestCase):
+    """The async pages must render the same templates with the same context."""
+
+    def setUp(self):
+        super().setUp()
+        self.reader = make_user("reader")
+        self.author = make_user("author")
+        Follow.objects.create(follower=self.reader, followed=self.author)
+        self.posts = [
+            Post.objects.create(author=self.author, body=f"post {i}")
+            for i in range(12)
+        ]
+        self.post = self.posts[-1]
+        for i in range(3):
+            Comment.objects.create(author=self.reader, post=self.post, body=f"{i}")
+        Reaction.objects.create(user=self.reader, post=self.post)
+
+    def request(self, factory, path, user):
+        request = factory.get(path)
+        request.user = user
+
+        async def auser():
+            return user
+
+        request.auser = auser
+        return request
+
+    def summarize(self, context):
+        summary = {"template": context.template.origin.template_name}
+        if context.get("posts_page") is not None:
+            page = context["posts_page"]
+            summary["posts"] = [post.pk for post in page], page.next_cursor
+        if context.get("comments_page") is not None:
+            summary["comments"] = [comment.pk for comment in context["comments_page"]]
+        if context.get("post") is not None:
+            post = context["post"]
+            summary["post"] = post.pk, post.reactions_count, post.is_liked
+        if context.get("profile_user") is not None:
+            user = context["profile_user"]
+            summary["profile"] = (
+                user.pk,
+                user.followers_count,
+                user.posts_count,
+                getattr(user, "is_following", None),
+            )
+        return summary
+
+    async def render(self, view, path, user=None, **kwargs):
+        """Return the status code and a summary of the page's context."""
+        user = user or self.reader
+        contexts = []
+
+        def record(sender, context, **kwargs):
+            if not contexts:
+                contexts.append(self.summarize(context))
+
+        template_rendered.connect(record)
+        try:
+            if iscoroutinefunction(view):
+                request = self.request(AsyncRequestFactory(), path, user)
+                response = await view(request, **kwargs)
+            else:
+                request = self.request(RequestFactory(), path, user)
+                response = await sync_to_async(view)(request, **kwargs)
+        finally:
+            template_rendered.disconnect(record)
+        return response.status_code, contexts[0]
+
+    async def assertSamePage(self, name, path, user=None, **kwargs):
+        sync_view = getattr(views, name, None) or getattr(account_views, name)
+        async_view = getattr(async_views, name, None) or getattr(
+            account_async_views, name
+        )
+        expected = await self.render(sync_view, path, user, **kwargs)
+        self.assertEqual(await self.render(async_view, path, user, **kwargs), expected)
+        return expected
+
+    async def test_pages_match_the_sync_views(self):
+        status, context = await self.assertSamePage("index", "/feed/")
+        self.assertEqual(len(context["posts"][0]), 10)
+        await self.assertSamePage("index", f"/feed/?cursor={context['posts'][1]}")
+        await self.assertSamePage("following", "/feed/following/")
+        await self.assertSamePage(
+            "post", f"/feed/posts/{self.post.pk}/", post_id=self.post.pk
+        )
+        status, context = await self.assertSamePage(
+            "profile", "/profile/author/", username="author"
+        )
+        self.assertEqual(context["profile"][1:], (1, 12, True))
+
+    async def test_missing_pages(self):
+        status, _context = await self.assertSamePage(
+            "profile", "/profile/nobody/", username="nobody"
+        )
+        self.assertEqual(status, 404)
+        for view in (views.post, async_views.post):
+            with self.assertRaises(Http404):
+                await self.render(view, "/feed/posts/999999/", post_id=999_999)
+
+
+class CommentPageTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = make_user("author")
+        self.post = Post.objects.create(author=self.author, body="hello")
+        comments = Comment.objects.bulk_create(
+            Comment(author=self.author, post=self.post, body=f"comment {i}")
+            for i in range(COMMENTS_PAGE_SIZE * 2 + 5)
+        )
+        self.newest_first = [comment.pk for comment in reversed(comments)]
+        self.client.force_login(self.author)
+
+    def test_comments_are_loaded_a_page_at_a_time(self):
+        response = self.client.get(f"/feed/posts/{self.post.pk}/")
+        page = response.context["comments_page"]
+        pages = [[comment.pk for comment in page]]
+        url = response.context["comments_url"]
+        self.assertContains(response, f'data-src="{url}?cursor={page.next_cursor}"')
+        while page.has_next():
+            response = self.client.get(url, {"cursor": page.next_cursor})
+            page = response.context["comments_page"]
+            pages.append([comment.pk for comment in page])
+
+        self.assertEqual(
+            [len(page) for page in pages], [COMMENTS_PAGE_SIZE, COMMENTS_PAGE_SIZE, 5]
+        )
+        self.assertEqual(sum(pages, []), self.newest_first)
+        self.assertNotContains(response, "load-comments")
+
+    def test_post_page_queries_do_not_grow_with_the_comments(self):
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(f"/feed/posts/{self.post.pk}/")
+            return len(queries)
+
+        count_queries()
+        before = count_queries()
+        Comment.objects.bulk_create(
+            Comment(author=self.author, post=self.post, body="more") for _ in range(50)
+        )
+        self.assertEqual(count_queries(), before)
+
+
+class ViewerFlagTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = make_user("viewer")
+        authors = [make_user(f"author{i}") for i in range(3)]
+        posts = [
+            Post.objects.create(author=authors[i % 3], body=f"post {i}")
+            for i in range(12)
+        ]
+        Reaction.objects.create(user=cls.viewer, post=posts[0])
+        Reaction.objects.create(user=cls.viewer, post=posts[3])
+        Reaction.objects.create(user=authors[0], post=posts[1])
+        Bookmark.objects.create(user=cls.viewer, post=posts[3])
+        Bookmark.objects.create(user=cls.viewer, post=posts[5])
+        Post.objects.create(author=cls.viewer, parent=posts[0], body="")
+        Post.objects.create(author=cls.viewer, parent=posts[5], body="quoted")
+        Post.objects.create(author=authors[1], parent=posts[3], body="")
+        Post.objects.create(author=authors[2], parent=posts[5], body="theirs")
+
+    def expected_flags(self, user):
+        # The per-row EXISTS subqueries the batched resolver replaced.
+        share = Q(body="") | Q(body__isnull=True)
+        mine = Post.objects.filter(parent=OuterRef("pk"), author=user)
+        rows = Post.objects.annotate(
+            is_liked=Exists(Reaction.objects.filter(post=OuterRef("pk"), user=user)),
+            is_bookmarked=Exists(
+                Bookmark.objects.filter(post=OuterRef("pk"), user=user)
+            ),
+            is_reposted=Exists(mine.filter(share)),
+            is_quoted=Exists(mine.exclude(share)),
+        ).values_list("pk", *VIEWER_FLAGS)
+        return {pk: tuple(flags) for pk, *flags in rows}
+
+    def flags(self, posts):
+        flags = {}
+        for post in posts:
+            flags[post.pk] = tuple(getattr(post, flag) for flag in VIEWER_FLAGS)
+            if post.parent_id:
+                parent = post.parent
+                flags[parent.pk] = tuple(getattr(parent, f) for f in VIEWER_FLAGS)
+        return flags
+
+    def test_flags_match_exists_subqueries(self):
+        expected = self.expected_flags(self.viewer)
+        posts = Post.objects.with_full_details(self.viewer).order_by("-created_date")
+        self.assertEqual(self.flags(posts), expected)
+        self.assertTrue(any(flags[2] for flags in expected.values()))
+        self.assertTrue(any(flags[3] for flags in expected.values()))
+
+    def test_anonymous_flags_are_false_without_queries(self):
+        posts = list(Post.objects.with_full_details(None))
+        with self.assertNumQueries(0):
+            flags = self.flags(posts)
+        self.assertEqual(set(flags.values()), {(False,) * len(VIEWER_FLAGS)})
+
+    def test_query_count_does_not_grow_with_the_page(self):
+        def count_queries(size):
+            posts = Post.objects.with_full_details(self.viewer).order_by("-pk")
+            with CaptureQueriesContext(connection) as queries:
+                self.flags(posts[:size])
+            return len(queries)
+
+        self.assertEqual(count_queries(3), count_queries(15))
+
+
+class InteractionContextTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = make_user("viewer")
+        cls.authors = [make_user(f"author{i}") for i in range(3)]
+        cls.posts = [
+            Post.objects.create(author=cls.authors[i % 3], body=f"post {i}")
+            for i in range(6)
+        ]
+        Follow.objects.create(follower=cls.viewer, followed=cls.authors[1])
+        Reaction.objects.create(user=cls.viewer, post=cls.posts[0])
+        Bookmark.objects.create(user=cls.viewer, post=cls.posts[1])
+        Post.objects.create(author=cls.viewer, parent=cls.posts[2], body="")
+        Post.objects.create(author=cls.viewer, parent=cls.posts[3], body="quote")
+
+    def answers(self, post):
+        return (
+            entry_tags.has_liked(self.viewer, post),
+            entry_tags.has_reposted(self.viewer, post),
+            entry_tags.has_bookmarked(self.viewer, post),
+            entry_tags.is_following(self.viewer, post.author),
+        )
+
+    def expected(self, post):
+        return (
+            Reaction.objects.filter(user=self.viewer, post=post).exists(),
+            Post.objects.filter(author=self.viewer, parent=post, body="").exists(),
+            Bookmark.objects.filter(user=self.viewer, post=post).exists(),
+            Follow.objects.filter(follower=self.viewer, followed=post.author).exists(),
+        )
+
+    def test_filters_answer_from_the_primed_page(self):
+        with interaction_scope():
+            posts = list(Post.objects.with_full_details(self.viewer)[:20])
+            with self.assertNumQueries(1):
+                # Authors are resolved together on the first follow lookup.
+                answers = [self.answers(post) for post in posts]
+        self.assertEqual(answers, [self.expected(post) for post in posts])
+
+    def test_misses_fall_back_to_a_query(self):
+        with interaction_scope():
+            context = get_interaction_context(self.viewer)
+            self.assertIs(get_interaction_context(self.viewer), context)
+            # One query per interaction table for a post that was not primed.
+            with self.assertNumQueries(3):
+                self.assertTrue(entry_tags.has_liked(self.viewer, self.posts[0]))
+            with self.assertNumQueries(0):
+                self.assertFalse(entry_tags.has_reposted(self.viewer, self.posts[0]))
+            with self.assertNumQueries(1):
+                self.assertTrue(entry_tags.is_following(self.viewer, self.authors[1]))
+            with self.assertNumQueries(0):
+                self.assertTrue(entry_tags.is_following(self.viewer, self.authors[1]))
+        self.assertIsNot(get_interaction_context(self.viewer), context)
+
+    def test_anonymous_and_self_lookups_need_no_query(self):
+        anonymous = AnonymousUser()
+        with self.assertNumQueries(0):
+            self.assertFalse(entry_tags.has_liked(anonymous, self.posts[0]))
+            self.assertFalse(entry_tags.is_following(anonymous, self.authors[1]))
+            self.assertFalse(entry_tags.is_following(self.viewer, self.viewer))
+
+    def test_page_queries_do_not_grow_with_the_posts(self):
+        self.client.force_login(self.viewer)
+
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get("/feed/")
+            return len(queries)
+
+        count_queries()
+        before = count_queries()
+        for post in self.posts[:3]:
+            Post.objects.create(author=self.authors[2], parent=post, body="more")
+        self.assertEqual(count_queries(), before)
+
+
+class PostCardCacheTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = make_user("author")
+        self.reader = make_user("reader")
+        self.original = Post.objects.create(author=self.author, body="original")
+        self.quote = Post.objects.create(
+            author=self.author, parent=self.original, body="quote"
+        )
+
+    def load(self, post, user=None):
+        return Post.objects.with_full_details(user).get(pk=post.pk)
+
+    def version(self, post):
+        return entry_tags.post_card_version(self.load(post))
+
+    def render(self, post, user):
+        return render_to_string("components/post.html", {"post": post, "user": user})
+
+    def test_version_changes_with_everything_the_card_shows(self):
+        def edit(post, **fields):
+            for name, value in fields.items():
+                setattr(post, name, value)
+            post.save()
+
+        changes = {
+            "edit": lambda: edit(self.quote, body="edited"),
+            "pin": lambda: edit(self.quote, is_pinned=True),
+            "counter": lambda: Reaction.objects.create(
+                user=self.reader, post=self.quote
+            ),
+            "embedded edit": lambda: edit(self.original, body="edited"),
+            "embedded counter": lambda: Post.objects.create(
+                author=self.reader, parent=self.original
+            ),
+            "author profile": lambda: edit(self.author, name="New name"),
+        }
+        version = self.version(self.quote)
+        self.assertEqual(self.version(self.quote), version)
+        for change, apply in changes.items():
+            with self.subTest(change=change):
+                apply()
+                self.assertNotEqual(self.version(self.quote), version)
+                version = self.version(self.quote)
+
+    def test_cards_are_shared_between_viewers(self):
+        Reaction.objects.create(user=self.reader, post=self.quote)
+        html = self.render(self.load(self.quote, self.reader), self.reader)
+        post = self.load(self.quote, self.author)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.render(post, self.author), html)
+
+        # The viewer's own state is sent next to the shared cards.
+        def state(user):
+            script = entry_tags.viewer_state({"user": user}, [self.quote])
+            return json.loads(script.split(">", 1)[1].rsplit("<", 1)[0])
+
+        self.assertEqual(state(self.reader)["liked"], [self.quote.pk])
+        self.assertEqual(state(self.author)["liked"], [])
+
+    def test_edited_posts_are_rendered_again(self):
+        self.client.force_login(self.reader)
+        self.assertContains(self.client.get("/feed/"), "quote")
+        self.quote.body = "edited body"
+        self.quote.save()
+        self.assertContains(self.client.get("/feed/"), "edited body")
+
+
+class TwoPhaseQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = make_user("reader")
+        authors = [make_user(f"author{i}") for i in range(3)]
+        posts = Post.objects.bulk_create(
+            Post(author=authors[i % 3], body=f"post {i}") for i in range(14)
+        )
+        # Ties are broken by the primary key in both phases.
+        Post.objects.filter(pk__in=[post.pk for post in posts[:5]]).update(
+            created_date=timezone.now()
+        )
+        for i, post in enumerate(posts):
+            Post.objects.create(author=authors[0], parent=post, body="")
+            if i % 3:
+                Bookmark.objects.create(user=cls.reader, post=post)
+            for fan in authors[: i % 4]:
+                Reaction.objects.create(user=fan, post=post)
+
+    def assertSamePages(self, queryset, sizes=(4, 4, 20)):
+        start = 0
+        for size in sizes:
+            window = slice(start, start + size)
+            expected = list(queryset.values_list("pk", flat=True)[window])
+            posts = queryset.with_full_details(self.reader)[window]
+            self.assertEqual([post.pk for post in posts], expected)
+            start += size
+
+    def test_pages_match_a_single_phase_query(self):
+        for ordering in (
+            ("-created_date", "-pk"),
+            ("-reactions_count", "pk"),
+            ("author__username", "-pk"),
+        ):
+            with self.subTest(ordering=ordering):
+                self.assertSamePages(Post.objects.order_by(*ordering))
+        self.assertSamePages(Post.objects.bookmarked_by(self.reader))
+
+    def test_keyset_pages_match_a_single_phase_query(self):
+        def walk(queryset):
+            pages, cursor = [], None
+            while True:
+                page = KeysetPaginator(queryset, per_page=4).page(cursor)
+                pages.append([post.pk for post in page])
+                cursor = page.next_cursor
+                if cursor is None:
+                    return pages
+
+        posts = Post.objects.order_by("-created_date")
+        self.assertEqual(walk(posts.with_full_details(self.reader)), walk(posts))
+
+    def test_page_is_hydrated_with_a_fixed_number_of_queries(self):
+        posts = Post.objects.with_full_details(self.reader).filter(parent__isnull=False)
+        # Page of IDs, posts with authors, parents, and one per flag table.
+        with self.assertNumQueries(6):
+            page = list(posts.order_by("-pk")[:10])
+        with self.assertNumQueries(0):
+            for post in page:
+                post.author.username
+                post.parent.author.username
+                post.parent.is_liked
+                post.is_bookmarked
+
+
+class PostLookupTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.viewer = make_user("viewer")
+        author = make_user("author")
+        self.posts = [
+            Post.objects.create(author=author, body=f"post {i}") for i in range(4)
+        ]
+        self.quote = Post.objects.create(
+            author=author, parent=self.posts[0], body="quote"
+        )
+        Reaction.objects.create(user=self.viewer, post=self.posts[2])
+        Bookmark.objects.create(user=self.viewer, post=self.quote)
+        self.api = APIClient()
+        self.api.force_authenticate(self.viewer)
+
+    def lookup(self, ids):
+        return self.api.post("/api/posts/lookup/", {"ids": ids}, format="json")
+
+    def test_results_keep_request_order_and_report_missing_ids(self):
+        ids = [self.quote.pk, 999_999, self.posts[2].pk, self.quote.pk]
+        by_post = self.lookup(ids).json()
+        by_query = self.api.get("/api/posts/", {"ids": ",".join(map(str, ids))}).json()
+        self.assertEqual(by_post, by_query)
+        self.assertEqual(
+            [post["id"] for post in by_post["results"]],
+            [self.quote.pk, self.posts[2].pk],
+        )
+        self.assertEqual(by_post["missing"], [999_999])
+
+    def test_results_match_the_post_serializer(self):
+        ids = [post.pk for post in (self.quote, *self.posts)]
+        results = self.lookup(ids).json()["results"]
+        posts = Post.objects.hydrate(ids, self.viewer)
+        expected = PostSerializer(posts, many=True).data
+        renderer = JSONRenderer()
+        self.assertEqual(
+            json.loads(renderer.render(results)), json.loads(renderer.render(expected))
+        )
+
+    def test_cached_posts_are_not_loaded_again(self):
+        ids = [post.pk for post in (self.quote, *self.posts)]
+        self.lookup(ids)
+        # Versions, then one query per interaction table.
+        with self.assertNumQueries(4):
+            lookup_posts(ids, self.viewer)
+
+        self.posts[1].body = "edited"
+        self.posts[1].save()
+        results, _missing = lookup_posts(ids, self.viewer)
+        self.assertEqual(results[2]["body"], "edited")
+
+    def test_invalid_lists_are_rejected(self):
+        too_many = list(range(1, settings.API_LOOKUP_MAX_IDS + 2))
+        for ids in ([], ["x"], [0], too_many):
+            with self.subTest(ids=ids[:3]):
+                self.assertEqual(self.lookup(ids).status_code, 400)
+
+
+class PostListSerializerTests(TestCase):
+    """The list read path must render exactly what PostSerializer does."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = make_user("viewer")
+        cls.author = make_user("author")
+        cls.author.image = "https://example.com/author.png"
+        cls.author.save()
+        nameless = make_user("nameless")
+        nameless.name = ""
+        nameless.save()
+
+        original = Post.objects.create(author=cls.author, body="original")
+        quote = Post.objects.create(author=nameless, parent=original, body="quote")
+        Post.objects.create(author=cls.viewer, parent=original, body="")
+        Post.objects.create(author=nameless, parent=quote, body="")
+        Post.objects.create(author=cls.author, body="pinned", is_pinned=True)
+        Reaction.objects.create(user=cls.viewer, post=original)
+        Bookmark.objects.create(user=cls.viewer, post=quote)
+
+    def assertSameJSON(self, posts):
+        posts = list(posts)
+        regular = serializers.ListSerializer(posts, child=PostSerializer()).data
+        fast = PostSerializer(posts, many=True).data
+        renderer = JSONRenderer()
+        for expected, actual in zip(regular, fast, strict=True):
+            self.assertEqual(renderer.render(actual), renderer.render(expected))
+
+    def test_viewer(self):
+        self.assertSameJSON(Post.objects.with_full_details(self.viewer))
+
+    def test_anonymous_viewer(self):
+        self.assertSameJSON(Post.objects.with_full_details(None))
+
+    def test_missing_viewer_flags(self):
+        self.assertSameJSON(Post.objects.select_related("author", "parent__author"))
+
+
+class CounterSignalTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user("reader")
+        self.author = make_user("author")
+        self.post = Post.objects.create(author=self.author, body="original")
+
+    def counters(self):
+        self.post.refresh_from_db(fields=Post.COUNTER_FIELDS)
+        return {field: getattr(self.post, field) for field in Post.COUNTER_FIELDS}
+
+    def test_counters_follow_writes(self):
+        reaction = Reaction.objects.create(user=self.user, post=self.post)
+        comment = Comment.objects.create(author=self.user, post=self.post, body="hi")
+        repost = Post.objects.create(author=self.user, parent=self.post, body="")
+        quote = Post.objects.create(author=self.user, parent=self.post, body="so")
+        self.assertEqual(
+            self.counters(),
+            {
+                "reactions_count": 1,
+                "comments_count": 1,
+                "reposts_count": 1,
+                "quotes_count": 1,
+            },
+        )
+
+        reaction.delete()
+        comment.delete()
+        repost.delete()
+        quote.delete()
+        self.assertEqual(set(self.counters().values()), {0})
+
+    def test_editing_a_quote_moves_it_between_counters(self):
+        quote = Post.objects.create(author=self.user, parent=self.post, body="so")
+        quote.body = ""
+        quote.save()
+        counters = self.counters()
+        self.assertEqual((counters["reposts_count"], counters["quotes_count"]), (1, 0))
+
+    def test_cascading_deletes_and_rebuild_agree(self):
+        Reaction.objects.create(user=self.user, post=self.post)
+        Post.objects.create(author=self.author, parent=self.post, body="")
+        Post.objects.create(author=self.user, parent=self.post, body="")
+        # Deleting the user cascades to their reaction and repost.
+        self.user.delete()
+        counters = self.counters()
+
+        Post.objects.update(reactions_count=9, reposts_count=9)
+        Post.objects.rebuild_counters()
+        self.assertEqual(self.counters(), counters)
+        self.assertEqual(counters["reactions_count"], 0)
+        self.assertEqual(counters["reposts_count"], 1)
+
+    def test_counters_never_go_negative(self):
+        reaction = Reaction.objects.create(user=self.user, post=self.post)
+        Post.objects.filter(pk=self.post.pk).update(reactions_count=0)
+        reaction.delete()
+        self.assertEqual(self.counters()["reactions_count"], 0)
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = make_user("author")
+        cls.posts = Post.objects.bulk_create(
+            Post(author=author, body=f"post {i}") for i in range(7)
+        )
+        # Ties on created_date are broken by the primary key.
+        now = timezone.now()
+        Post.objects.filter(pk__in=[post.pk for post in cls.posts[:4]]).update(
+            created_date=now
+        )
+
+    def paginator(self):
+        return KeysetPaginator(Post.objects.order_by("-created_date"), per_page=3)
+
+    def walk(self, cursor=None, backwards=False):
+        pages = []
+        while True:
+            page = self.paginator().page(cursor)
+            pages.append([post.pk for post in page])
+            cursor = page.previous_cursor if backwards else page.next_cursor
+            if cursor is None:
+                return pages
+
+    def test_pages_cover_every_row_once(self):
+        expected = list(
+            Post.objects.order_by("-created_date", "-pk").values_list("pk", flat=True)
+        )
+        pages = self.walk()
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual(sum(pages, []), expected)
+
+        last = self.paginator().page(self.paginator().page().next_cursor)
+        self.assertTrue(last.has_previous())
+        self.assertEqual(self.walk(last.previous_cursor, backwards=True), [pages[0]])
+
+    def test_new_rows_do_not_shift_pages(self):
+        second = self.walk()[1]
+        cursor = self.paginator().page().next_cursor
+        Post.objects.create(author=self.posts[0].author, body="newer")
+        page = self.paginator().page(cursor)
+        self.assertEqual([post.pk for post in page], second)
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(InvalidCursor):
+            self.paginator().page("not-a-cursor")
+        self.assertEqual(len(self.paginator().get_page("not-a-cursor")), 3)
+
+        response = APIClient().get("/api/posts/", {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 404)
+
+
+class PostSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = make_user("author")
+        cls.match = Post.objects.create(author=author, body="Django ORM tips")
+        cls.other = Post.objects.create(author=author, body="Django templates")
+        Post.objects.create(author=author, body="Nothing to see")
+
+    def search(self, query):
+        return [post.pk for post in PostSearchPaginator(query).page()]
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self.search("django orm"), [self.match.pk])
+        self.assertCountEqual(self.search("DJANGO"), [self.match.pk, self.other.pk])
+        self.assertEqual(self.search("  ?! "), [])
+
+    def test_other_databases_fall_back_to_icontains(self):
+        with mock.patch.object(connection, "vendor", "other"):
+            self.assertEqual(self.search("django orm"), [self.match.pk])
+            # Without a rank, the newest matches come first.
+            self.assertEqual(self.search("django"), [self.other.pk, self.match.pk])
+
+    def test_list_search_uses_the_index(self):
+        response = APIClient().get("/api/posts/", {"search": "orm tips"})
+        self.assertEqual(
+            [post["id"] for post in response.json()["results"]], [self.match.pk]
+        )
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.reader = make_user("reader")
+        self.author = make_user("author")
+        self.post = Post.objects.create(author=self.author, body="hello")
+        self.api = APIClient()
+        self.api.force_authenticate(self.reader)
+        self.client.force_login(self.reader)
+
+    def write(self, func, *args, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return func(*args, **kwargs)
+
+    def assertRevalidates(self, client, url):
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Last-Modified", response.headers)
+        etag = response.headers["ETag"]
+        self.assertEqual(client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # A write in the same second as the response still changes the ETag.
+        self.write(Reaction.objects.create, user=self.author, post=self.post)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+        # If-Modified-Since alone never yields a 304.
+        since = "Fri, 01 Jan 2100 00:00:00 GMT"
+        self.assertEqual(client.get(url, HTTP_IF_MODIFIED_SINCE=since).status_code, 200)
+
+    def test_api(self):
+        self.assertRevalidates(self.api, f"/api/posts/{self.post.pk}/")
+
+    def test_pages(self):
+        self.assertRevalidates(self.client, f"/feed/posts/{self.post.pk}/")
+
+
+class AnonymousPageCacheTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = make_user("author")
+        self.post = Post.objects.create(author=self.author, body="first")
+        self.other = Post.objects.create(author=self.author, body="second")
+        self.url = f"/feed/posts/{self.post.pk}/"
+
+    def write(self, func, *args, **kwargs):
+        # Versions are bumped once the write commits.
+        with self.captureOnCommitCallbacks(execute=True):
+            return func(*args, **kwargs)
+
+    def comment(self, post, body):
+        return Comment.objects.create(author=self.author, post=post, body=body)
+
+    def assertCached(self, url):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def assertRendered(self, url, text):
+        with mock.patch.object(page_cache, "_store", wraps=page_cache._store) as store:
+            response = self.client.get(url)
+        store.assert_called_once()
+        self.assertContains(response, text)
+
+    def test_writes_only_invalidate_their_scope(self):
+        other_url = f"/feed/posts/{self.other.pk}/"
+        self.client.get(self.url)
+        self.client.get(other_url)
+
+        self.write(self.comment, self.other, "x")
+        self.assertCached(self.url)
+        self.assertRendered(other_url, "x")
+
+        self.write(Reaction.objects.create, user=self.author, post=self.other)
+        self.assertCached(self.url)
+        self.assertRendered(other_url, "x")
+
+        self.client.get("/feed/")
+        self.write(self.comment, self.post, "hi")
+        self.assertRendered(self.url, "hi")
+        self.assertCached(other_url)
+
+        self.write(Post.objects.create, author=self.author, body="third")
+        self.assertRendered("/feed/", "third")
+        self.assertCached(self.url)
+
+    def test_reactions_refresh_the_pages_showing_their_counters(self):
+        count = '<span class="ml-1" data-postid="{}" data-counter="reactions_count">{}'
+        profile = f"/profile/{self.author.username}/"
+        for url in (self.url, "/feed/", profile):
+            self.client.get(url)
+
+        reader = make_user("reader")
+        self.write(Reaction.objects.create, user=reader, post=self.post)
+        for url in (self.url, "/feed/", profile):
+            with self.subTest(url=url):
+                self.assertRendered(url, count.format(self.post.pk, 1))
+
+    def test_edits_invalidate_every_page(self):
+        self.client.get(self.url)
+        self.client.get("/feed/")
+        self.other.body = "edited"
+        self.write(self.other.save)
+        self.assertRendered(self.url, "first")
+        self.assertRendered("/feed/", "edited")
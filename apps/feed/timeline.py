@@ -0,0 +1,251 @@
+"""
+Fan-out-on-write timeline store for the "Following" feed.
+
+Every post (original, repost or quote) is copied into the ``TimelineEntry``
+inbox of each follower of its author. Following a user backfills their
+recent posts, unfollowing removes them again and deleting a post cascades.
+Inboxes are capped at ``TIMELINE_MAX_LENGTH`` entries, with one set-based
+DELETE per batch of followers delivered to.
+
+Authors with more than ``TIMELINE_FANOUT_MAX_FOLLOWERS`` followers are not
+fanned out on write; their recent posts are merged into the reader's feed
+at read time (see ``PostQuerySet.feed_for_user()``) without being stored.
+
+Writes are recorded as ``TimelineTask`` rows in the transaction that causes
+them and run once it commits: on a small background thread pool unless
+``TIMELINE_FANOUT_ASYNC`` is disabled. Tasks lost with a worker (restart,
+crash) stay in the table and are retried by the ``run_timeline_tasks``
+command, so every task must be safe to run twice.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from apps.accounts.graph import get_graph
+from apps.accounts.models import Follow, UserStats
+from apps.core.versions import versions_changed
+from apps.feed.models import Post, TimelineEntry, TimelineTask
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+HIGH_FANOUT_CACHE_TIMEOUT = 300
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, "TIMELINE_FANOUT_WORKERS", 2),
+            thread_name_prefix="timeline-fanout",
+        )
+    return _executor
+
+
+def _run(task):
+    try:
+        run_task(task)
+    except Exception:
+        logger.exception("Timeline task %s failed", task)
+    finally:
+        # Worker threads own their connections; release them between tasks.
+        connections.close_all()
+
+
+def dispatch(func, *args):
+    """
+    Run a timeline task once the current transaction commits.
+    ``func`` must be a module-level function and ``args`` JSON-serializable.
+    Tasks run in the background unless ``TIMELINE_FANOUT_ASYNC`` is False.
+    """
+    task = TimelineTask.objects.create(
+        task=f"{func.__module__}.{func.__qualname__}", args=list(args)
+    )
+    if getattr(settings, "TIMELINE_FANOUT_ASYNC", True):
+        transaction.on_commit(lambda: _get_executor().submit(_run, task))
+    else:
+        transaction.on_commit(lambda: run_task(task))
+
+
+def run_task(task):
+    """Run a stored ``TimelineTask`` and delete it; a failed task is kept."""
+    try:
+        import_string(task.task)(*task.args)
+    except Exception:
+        TimelineTask.objects.filter(pk=task.pk).update(attempts=F("attempts") + 1)
+        raise
+    TimelineTask.objects.filter(pk=task.pk).delete()
+
+
+def retry_tasks(min_age, max_attempts):
+    """
+    Run the stored tasks older than ``min_age`` seconds that failed fewer
+    than ``max_attempts`` times, oldest first. Younger tasks are left to the
+    workers that dispatched them. Returns ``(succeeded, failed)`` counts.
+    """
+    cutoff = timezone.now() - timedelta(seconds=min_age)
+    tasks = TimelineTask.objects.filter(
+        created_date__lt=cutoff, attempts__lt=max_attempts
+    )
+    succeeded = failed = 0
+    for task in tasks.iterator():
+        try:
+            run_task(task)
+        except Exception:
+            logger.exception("Timeline task %s failed", task)
+            failed += 1
+        else:
+            succeeded += 1
+    return succeeded, failed
+
+
+def _max_followers():
+    return getattr(settings, "TIMELINE_FANOUT_MAX_FOLLOWERS", None)
+
+
+def _insert(user_ids, posts):
+    """Bulk insert ``(post_id, created_date)`` pairs for the given users."""
+    entries = [
+        TimelineEntry(user_id=user_id, post_id=post_id, created_date=created_date)
+        for user_id in user_ids
+        for post_id, created_date in posts
+    ]
+    TimelineEntry.objects.bulk_create(entries, batch_size=1000, ignore_conflicts=True)
+
+
+# ============================================================================
+# WRITE PATH
+# ============================================================================
+
+
+def fan_out_post(post_id):
+    """Deliver a new post to the inbox of every follower of its author."""
+    post = Post.objects.filter(pk=post_id).values("author_id", "created_date").first()
+    if post is None:
+        return
+
+    followers = Follow.objects.filter(followed_id=post["author_id"])
+    limit = _max_followers()
+    if (
+        limit is not None
+        and UserStats.objects.filter(
+            user_id=post["author_id"], followers_count__gt=limit
+        ).exists()
+    ):
+        # High fan-out author: readers pull these posts in at read time.
+        return
+
+    follower_ids = followers.values_list("follower_id", flat=True).iterator()
+    batch = []
+    for follower_id in follower_ids:
+        batch.append(follower_id)
+        if len(batch) >= 1000:
+            _deliver(batch, post_id, post["created_date"])
+            batch = []
+    if batch:
+        _deliver(batch, post_id, post["created_date"])
+    # Followers' feeds changed after the post itself was committed.
+    versions_changed()
+
+
+def _deliver(user_ids, post_id, created_date):
+    _insert(user_ids, [(post_id, created_date)])
+    trim_timelines(user_ids)
+
+
+def backfill_follow(follower_id, followed_id):
+    """Copy the followed user's most recent posts into the follower's inbox."""
+    posts = (
+        Post.objects.filter(author_id=followed_id)
+        .order_by("-created_date")
+        .values_list("pk", "created_date")[: settings.TIMELINE_BACKFILL_SIZE]
+    )
+    _insert([follower_id], list(posts))
+    trim_timelines([follower_id])
+    versions_changed(follower_id, content=False)
+
+
+def remove_follow(follower_id, followed_id):
+    """Drop the unfollowed user's posts from the follower's inbox."""
+    TimelineEntry.objects.filter(
+        user_id=follower_id, post__author_id=followed_id
+    ).delete()
+    versions_changed(follower_id, content=False)
+
+
+def trim_timelines(user_ids):
+    """Cap the inboxes of ``user_ids`` at ``TIMELINE_MAX_LENGTH`` entries."""
+    overflow = (
+        TimelineEntry.objects.filter(user_id__in=user_ids)
+        .annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=F("user_id"),
+                order_by=F("created_date").desc(),
+            )
+        )
+        .filter(position__gt=settings.TIMELINE_MAX_LENGTH)
+        .values("pk")
+    )
+    TimelineEntry.objects.filter(pk__in=overflow).delete()
+
+
+def rebuild_timeline(user_id):
+    """Recreate a user's inbox from the posts of everyone they follow."""
+    followed_ids = Follow.objects.filter(follower_id=user_id).values("followed_id")
+    posts = (
+        Post.objects.filter(author__in=followed_ids)
+        .order_by("-created_date")
+        .values_list("pk", "created_date")[: settings.TIMELINE_MAX_LENGTH]
+    )
+    with transaction.atomic():
+        TimelineEntry.objects.filter(user_id=user_id).delete()
+        _insert([user_id], list(posts))
+        versions_changed(user_id, content=False)
+
+
+# ============================================================================
+# READ PATH
+# ============================================================================
+
+
+def high_fanout_authors(user):
+    """
+    Return IDs of users followed by ``user`` whose posts are not fanned out,
+    to be merged into the reader's feed at read time.
+    Read from the follow graph when enabled; otherwise cached per reader,
+    since follower counts move slowly around the cutoff.
+    """
+    limit = _max_followers()
+    if limit is None:
+        return []
+
+    graph = get_graph()
+    if graph is not None:
+        return [
+            author_id
+            for author_id in graph.following(user.pk)
+            if graph.follower_count(author_id) > limit
+        ]
+
+    def compute():
+        followed_ids = Follow.objects.filter(follower=user).values("followed_id")
+        return list(
+            UserStats.objects.filter(
+                user_id__in=followed_ids, followers_count__gt=limit
+            ).values_list("user_id", flat=True)
+        )
+
+    return cache.get_or_set(
+        f"timeline:high-fanout:{user.pk}", compute, HIGH_FANOUT_CACHE_TIMEOUT
+    )
@@ -1,20 +1,28 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
 
 app_name = "feed"
 
+# Read-only pages have async versions for ASGI deployments.
+pages = async_views if settings.ASYNC_VIEWS else views
+
 urlpatterns = [
-    path("", views.index, name="index"),
-    path("following/", views.following, name="following"),
-    path("posts/<int:post_id>/", views.post, name="post"),
+    path("", pages.index, name="index"),
+    path("following/", pages.following, name="following"),
+    path("following/new/", async_views.new_posts, name="new_posts"),
+    path("posts/<int:post_id>/", pages.post, name="post"),
     path("posts/<int:post_id>/repost/", views.repost, name="repost"),
     path("posts/<int:post_id>/quote", views.quote, name="quote"),
     path("posts/<int:post_id>/comment/", views.comment, name="comment"),
+    path("posts/<int:post_id>/comments/", views.comments, name="comments"),
     path("posts/<int:post_id>/edit/", views.edit_post, name="edit_post"),
     path("posts/<int:post_id>/delete/", views.delete_post, name="delete_post"),
     path("posts/<int:post_id>/react/", views.react, name="react"),
     path("posts/<int:post_id>/bookmark/", views.bookmark, name="bookmark"),
     path("posts/<int:post_id>/pin/", views.pin_post, name="pin_post"),
     path("posts/new/", views.new_post, name="new_post"),
+    path("posts/live/", async_views.live_counters, name="live_counters"),
     path("bookmarks/", views.bookmarks, name="bookmarks"),
+    path("search/", views.search, name="search"),
 ]
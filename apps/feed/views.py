@@ -4,33 +4,87 @@ from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.urls import reverse
 import json
 
+from apps.core.conditional import conditional_page
+from apps.core.page_cache import FEED_PAGES, POST_PAGES, cache_anonymous_page
 from apps.core.utils import paginate_queryset
 from apps.feed.models import Post, Comment, Reaction, Bookmark
+from apps.feed.search import PostSearchPaginator
 
+COMMENTS_PAGE_SIZE = 20
 
+
+@conditional_page
+@cache_anonymous_page(FEED_PAGES)
 def index(request):
     posts = Post.objects.with_full_details(user=request.user).order_by("-created_date")
     page_obj = paginate_queryset(request, posts)
     return render(request, "feed/index.html", {"posts_page": page_obj})
 
 
+@conditional_page
+@cache_anonymous_page(POST_PAGES)
 def post(request, post_id):
     current_user = request.user if request.user.is_authenticated else None
     post = get_object_or_404(Post.objects.with_full_details(current_user), pk=post_id)
-    comments = Comment.objects.for_post(post)
-    return render(request, "feed/post.html", {"post": post, "comments": comments})
+    comments_page = paginate_queryset(
+        request, Comment.objects.for_post(post), per_page=COMMENTS_PAGE_SIZE
+    )
+    return render(
+        request,
+        "feed/post.html",
+        {
+            "post": post,
+            "comments_page": comments_page,
+            "comments_url": reverse("feed:comments", args=[post.pk]),
+        },
+    )
+
+
+@conditional_page
+@cache_anonymous_page(POST_PAGES)
+def comments(request, post_id):
+    """
+    One page of a post's comments, newest first, as an HTML fragment.
+    Loaded by the post page as the reader scrolls through its comments.
+    """
+    comments_page = paginate_queryset(
+        request, Comment.objects.for_post(post_id), per_page=COMMENTS_PAGE_SIZE
+    )
+    return render(
+        request,
+        "components/comments_page.html",
+        {
+            "comments_page": comments_page,
+            "comments_url": reverse("feed:comments", args=[post_id]),
+        },
+    )
 
 
 @login_required
+@conditional_page
 def following(request):
     posts = Post.objects.feed_for_user(request.user)
     page_obj = paginate_queryset(request, posts)
     return render(request, "feed/following.html", {"posts_page": page_obj})
 
 
+@conditional_page
+def search(request):
+    query = request.GET.get("q", "").strip()
+    page_obj = None
+    if query:
+        paginator = PostSearchPaginator(query, user=request.user)
+        page_obj = paginator.get_page(request.GET.get("cursor"))
+    return render(
+        request, "feed/search.html", {"posts_page": page_obj, "search_query": query}
+    )
+
+
 @login_required
+@conditional_page
 def bookmarks(request):
     posts = Post.objects.bookmarked_by(request.user).with_full_details(request.user)
     page_obj = paginate_queryset(request, posts)
@@ -181,11 +235,12 @@ def react(request, post_id):
     else:
         action = "Liked"
 
+    post.refresh_from_db(fields=["reactions_count"])
     return JsonResponse(
         {
             "status": "201",
             "action": action,
-            "postReactionsCount": post.reactions.count(),
+            "postReactionsCount": post.reactions_count,
         }
     )
 
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 from datetime import timedelta
@@ -33,6 +34,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "apps.feed.middleware.InteractionContextMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -65,14 +67,97 @@ ASGI_APPLICATION = "qwitter.asgi.application"
 DATABASES = {}
 
 
+# Shared by all worker processes on the host (see apps/core/cache.py), so
+# throttle counters and cached fragments are not per-process. Throttle
+# counters get their own file, where only expired entries are ever removed:
+# culling them early would reset clients' rates.
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "LOCATION": "qwitter-throttle",
-    }
+        "BACKEND": "apps.core.cache.SQLiteCache",
+        "LOCATION": os.getenv(
+            "DJANGO_CACHE_LOCATION",
+            os.path.join(tempfile.gettempdir(), "qwitter-cache.sqlite3"),
+        ),
+        "OPTIONS": {"MAX_ENTRIES": 200_000},
+    },
+    "throttle": {
+        "BACKEND": "apps.core.cache.SQLiteCache",
+        "LOCATION": os.getenv(
+            "DJANGO_THROTTLE_CACHE_LOCATION",
+            os.path.join(tempfile.gettempdir(), "qwitter-throttle.sqlite3"),
+        ),
+        "OPTIONS": {"MAX_ENTRIES": None},
+    },
 }
 
 
+# Following timeline (fan-out on write, see apps/feed/timeline.py)
+TIMELINE_FANOUT_ASYNC = True
+TIMELINE_FANOUT_WORKERS = 2
+TIMELINE_FANOUT_MAX_FOLLOWERS = 10_000
+TIMELINE_BACKFILL_SIZE = 200
+TIMELINE_MAX_LENGTH = 800
+# Dispatched timeline tasks still pending after this many seconds are retried
+# by the run_timeline_tasks command, up to this many failed attempts.
+TIMELINE_TASK_RETRY_AFTER = 60
+TIMELINE_TASK_MAX_ATTEMPTS = 5
+# "New posts since" polling of the Following feed (see apps/feed/polling.py):
+# longest long-poll wait, seconds between checks, and most new posts counted.
+TIMELINE_POLL_MAX_WAIT = 25
+TIMELINE_POLL_INTERVAL = 1.0
+TIMELINE_NEW_POSTS_LIMIT = 99
+
+# "Who to follow" suggestions stored per user (see apps/accounts/suggestions.py)
+FOLLOW_SUGGESTIONS_LIMIT = 20
+
+# In-memory follow graph, one copy per process (see apps/accounts/graph.py).
+# Off by default: each worker loads the whole Follow table on first use and
+# holds about 17 bytes per follow (~800 MiB at 50M follows). Enable only on
+# hosts with that much memory per worker to spare.
+FOLLOW_GRAPH_ENABLED = False
+FOLLOW_GRAPH_SYNC_INTERVAL = 1.0
+
+# Rendered post cards are cached per post version (see entry_tags.post_card_version).
+POST_CARD_CACHE_TIMEOUT = 60 * 60
+
+# Pages rendered for anonymous visitors are shared through the cache for this
+# long, per page scope version (see apps/core/page_cache.py). Counters of
+# posts shown outside their feed, post and author pages (e.g. reposts on
+# other profiles) can be this many seconds old.
+ANONYMOUS_PAGE_CACHE_TIMEOUT = 60
+
+# Live engagement counters over Server-Sent Events (see apps/feed/live.py): the
+# broker class, seconds between coalesced updates, seconds between keep-alive
+# comments, and most posts one stream may watch.
+LIVE_COUNTERS_BROKER = "apps.feed.live.LocalBroker"
+LIVE_COUNTERS_INTERVAL = 1.0
+LIVE_COUNTERS_HEARTBEAT = 15
+LIVE_COUNTERS_MAX_POSTS = 100
+
+# Serve the feed, post and profile pages from async views (apps/*/async_views.py);
+# only worthwhile under an ASGI server such as uvicorn.
+ASYNC_VIEWS = os.getenv("DJANGO_ASYNC_VIEWS", "").lower() in ("1", "true", "yes")
+
+# Worker threads per process that async views run independent queries on
+# (see apps/core/aio.py); each holds one database connection.
+ASYNC_GATHER_WORKERS = 8
+
+# Seconds database connections are kept open for reuse; 0 closes them after
+# every request.
+DATABASE_CONN_MAX_AGE = int(os.getenv("DATABASE_CONN_MAX_AGE", "60"))
+
+# Largest number of operations accepted by the batch interaction/follow endpoints.
+API_BATCH_MAX_OPERATIONS = 100
+
+# Multi-get of posts by ID (see apps/feed/lookup.py): largest number of IDs per
+# request, and how long serialized posts are cached per post version.
+API_LOOKUP_MAX_IDS = 300
+POST_LOOKUP_CACHE_TIMEOUT = 60 * 60
+
+# Rows serialized per chunk by streamed list responses (see apps/core/api/streaming.py).
+API_STREAM_CHUNK_SIZE = 500
+
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework_simplejwt.authentication.JWTAuthentication",
@@ -81,9 +166,13 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "apps.core.api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.AnonRateThrottle",
+        "apps.core.api.throttles.AnonRateThrottle",
         "apps.core.api.throttles.AdminExemptUserRateThrottle",
     ],
     "DEFAULT_THROTTLE_RATES": {
@@ -0,0 +1,56 @@
+// A post page renders its first comments; the rest are fetched page by page,
+// as HTML fragments, when the reader scrolls to the end of the list.
+export function initComments() {
+	const list = document.querySelector(".comments")
+	if (!list) {
+		return
+	}
+
+	const observer = new IntersectionObserver(entries => {
+		entries.forEach(entry => {
+			if (entry.isIntersecting) {
+				loadMore(list, entry.target, observer)
+			}
+		})
+	}, { rootMargin: "300px" })
+
+	list.addEventListener("click", (e) => {
+		const btn = e.target.closest("button.load-comments")
+		if (btn) {
+			loadMore(list, btn, observer)
+		}
+	})
+
+	const more = list.querySelector("button.load-comments")
+	if (more) {
+		observer.observe(more)
+	}
+}
+
+function loadMore(list, btn, observer) {
+	if (btn.disabled) {
+		return
+	}
+	observer.unobserve(btn)
+	btn.disabled = true
+
+	fetch(btn.dataset.src)
+		.then(res => {
+			if (!res.ok) {
+				throw new Error(res.statusText)
+			}
+			return res.text()
+		})
+		.then(html => {
+			btn.remove()
+			list.insertAdjacentHTML("beforeend", html)
+			const more = list.querySelector("button.load-comments")
+			if (more) {
+				observer.observe(more)
+			}
+		})
+		.catch(() => {
+			// Leave the button for the reader to retry.
+			btn.disabled = false
+		})
+}
@@ -0,0 +1,29 @@
+// Engagement counters of the posts on the page are kept current through a
+// Server-Sent Events stream; the server sends coalesced updates about once a
+// second, holding the new values of the counters that changed.
+const MAX_POSTS = 100
+
+export function initLiveCounters() {
+	if (!window.EventSource) {
+		return
+	}
+
+	const ids = [...new Set(
+		[...document.querySelectorAll("[data-counter][data-postid]")].map(el => el.dataset.postid)
+	)].slice(0, MAX_POSTS)
+	if (ids.length === 0) {
+		return
+	}
+
+	const source = new EventSource(`/feed/posts/live/?ids=${ids.join(",")}`)
+	source.addEventListener("counters", (e) => {
+		const posts = JSON.parse(e.data)
+		Object.entries(posts).forEach(([postId, counters]) => {
+			Object.entries(counters).forEach(([counter, value]) => {
+				document.querySelectorAll(`[data-postid="${postId}"][data-counter="${counter}"]`).forEach(el => {
+					el.textContent = value
+				})
+			})
+		})
+	})
+}
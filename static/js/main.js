@@ -2,10 +2,18 @@ import { initTheme } from "./theme.js";
 import { initToasts } from "./toasts.js";
 import { initPostActions } from "./posts.js";
 import { initProfileActions } from "./profile.js";
+import { applyViewerState } from "./viewer.js";
+import { initNewPostsBanner } from "./timeline.js";
+import { initLiveCounters } from "./live.js";
+import { initComments } from "./comments.js";
 
 document.addEventListener("DOMContentLoaded", function () {
 	initTheme();
+	applyViewerState();
 	initToasts();
 	initPostActions();
 	initProfileActions();
+	initNewPostsBanner();
+	initLiveCounters();
+	initComments();
 });
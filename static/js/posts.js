@@ -79,10 +79,10 @@ function react(el) {
 			}
 			else {
 				if (res.action == "Liked") {
-					el.innerHTML = `<i class="fa-solid fa-heart liked"></i> <span class="ml-1">${res.postReactionsCount}</span>`
+					el.innerHTML = `<i class="fa-solid fa-heart liked"></i> <span class="ml-1" data-postid="${postId}" data-counter="reactions_count">${res.postReactionsCount}</span>`
 				}
 				else {
-					el.innerHTML = `<i class="fa-regular fa-heart"></i> <span class="ml-1">${res.postReactionsCount}</span>`
+					el.innerHTML = `<i class="fa-regular fa-heart"></i> <span class="ml-1" data-postid="${postId}" data-counter="reactions_count">${res.postReactionsCount}</span>`
 				}
 			}
 		})
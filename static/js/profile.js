@@ -4,6 +4,66 @@ export function initProfileActions() {
 			connect(e.target.dataset.username)
 		})
 	})
+
+	initConnections()
+}
+
+// Follower/following lists are fetched page by page when their modal opens.
+function initConnections() {
+	document.querySelectorAll(".connections[data-src]").forEach(list => {
+		const modal = list.closest(".modal")
+		const observer = new IntersectionObserver(entries => {
+			entries.forEach(entry => {
+				if (entry.isIntersecting) {
+					loadMore(list, entry.target, observer)
+				}
+			})
+		}, { root: list })
+
+		modal.addEventListener("show.bs.modal", () => {
+			if (!list.dataset.loaded) {
+				list.dataset.loaded = "true"
+				loadConnections(list, list.dataset.src, observer, true)
+			}
+		})
+
+		list.addEventListener("click", (e) => {
+			const btn = e.target.closest("button.load-connections")
+			if (btn) {
+				loadMore(list, btn, observer)
+			}
+		})
+	})
+}
+
+function loadMore(list, btn, observer) {
+	observer.unobserve(btn)
+	btn.remove()
+	loadConnections(list, btn.dataset.src, observer, false)
+}
+
+function loadConnections(list, url, observer, replace) {
+	fetch(url)
+		.then(res => {
+			if (!res.ok) {
+				throw new Error(res.statusText)
+			}
+			return res.text()
+		})
+		.then(html => {
+			if (replace) {
+				list.innerHTML = ""
+			}
+			list.insertAdjacentHTML("beforeend", html)
+			const more = list.querySelector("button.load-connections")
+			if (more) {
+				observer.observe(more)
+			}
+		})
+		.catch(() => {
+			delete list.dataset.loaded
+			list.insertAdjacentHTML("beforeend", '<p class="text-muted text-center m-0">Could not load this list.</p>')
+		})
 }
 
 function connect(username) {
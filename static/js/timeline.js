@@ -0,0 +1,60 @@
+// The Following page polls for posts newer than its top post and offers to
+// show them, instead of the reader reloading to check. Under ASGI the server
+// holds each check open until a post arrives (long polling); otherwise it
+// answers right away and the page checks again every RECHECK_DELAY.
+const WAIT_SECONDS = 25
+const RECHECK_DELAY = 30000
+
+export function initNewPostsBanner() {
+	const banner = document.getElementById("newPostsBanner")
+	if (!banner) {
+		return
+	}
+
+	banner.addEventListener("click", () => {
+		window.location.assign(banner.dataset.href)
+	})
+	checkNewPosts(banner)
+}
+
+function checkNewPosts(banner) {
+	const url = `${banner.dataset.pollurl}?since_id=${banner.dataset.sinceid}&wait=${WAIT_SECONDS}`
+	fetch(url)
+		.then(res => {
+			if (res.status >= 400 && res.status < 500) {
+				// Retrying won't help (e.g. the top post was deleted); stop polling.
+				return null
+			}
+			if (!res.ok) {
+				throw new Error(res.statusText)
+			}
+			return res.json()
+		})
+		.then(data => {
+			if (!data) {
+				return
+			}
+			if (data.count > 0) {
+				showBanner(banner, data)
+				if (data.has_more) {
+					return
+				}
+			}
+			if (data.count === 0 && data.wait > 0) {
+				// The server waited and nothing arrived; ask again right away.
+				checkNewPosts(banner)
+				return
+			}
+			setTimeout(() => checkNewPosts(banner), RECHECK_DELAY)
+		})
+		.catch(() => {
+			setTimeout(() => checkNewPosts(banner), RECHECK_DELAY)
+		})
+}
+
+function showBanner(banner, data) {
+	const count = data.has_more ? `${data.count}+` : data.count
+	const noun = data.count === 1 && !data.has_more ? "post" : "posts"
+	banner.textContent = `Show ${count} new ${noun}`
+	banner.classList.remove("d-none")
+}
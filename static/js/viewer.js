@@ -0,0 +1,58 @@
+const relativeTime = new Intl.RelativeTimeFormat("en", { numeric: "auto" });
+
+const UNITS = [
+	["year", 60 * 60 * 24 * 365],
+	["month", 60 * 60 * 24 * 30],
+	["week", 60 * 60 * 24 * 7],
+	["day", 60 * 60 * 24],
+	["hour", 60 * 60],
+	["minute", 60],
+	["second", 1],
+];
+
+// Post cards are cached and shared by every user, so anything that depends on
+// the viewer (or on the current time) is applied here on page load.
+export function applyViewerState() {
+	const stateEl = document.getElementById("viewer-state");
+	if (stateEl) {
+		const state = JSON.parse(stateEl.textContent);
+		markButtons("button.like", state.liked, "fa-regular fa-heart", "fa-solid fa-heart liked");
+		markButtons("button.repost", state.reposted, "fa-solid fa-retweet", "fa-solid fa-retweet reposted");
+		markButtons("button.bookmark", state.bookmarked, "fa-regular fa-bookmark", "fa-solid fa-bookmark bookmarked");
+		showOwnerControls(state.userId);
+	}
+
+	document.querySelectorAll(".post-header time[datetime]").forEach(el => {
+		el.textContent = timeSince(new Date(el.getAttribute("datetime")));
+	});
+}
+
+function markButtons(selector, postIds, fromClass, toClass) {
+	const ids = new Set(postIds);
+	document.querySelectorAll(selector).forEach(btn => {
+		if (ids.has(parseInt(btn.dataset.postid))) {
+			const icon = btn.querySelector("i");
+			icon.className = icon.className.replace(fromClass, toClass);
+		}
+	});
+}
+
+function showOwnerControls(userId) {
+	document.querySelectorAll(".owner-only").forEach(el => {
+		if (userId !== null && parseInt(el.dataset.authorid) === userId) {
+			el.hidden = false;
+		}
+		else {
+			el.remove();
+		}
+	});
+}
+
+function timeSince(date) {
+	const seconds = Math.round((date - Date.now()) / 1000);
+	for (const [unit, size] of UNITS) {
+		if (Math.abs(seconds) >= size || unit === "second") {
+			return relativeTime.format(Math.round(seconds / size), unit);
+		}
+	}
+}